@@ -1,6 +1,6 @@
 from acasmart.data.db import get_connection
 from acasmart.data.migrator import run_migrations
-from acasmart.data.repos.settings_repo import ensure_bool_setting
+from acasmart.data.repos.settings_repo import ensure_bool_setting, load_settings_cache
 import os
 import sqlite3
 import shutil
@@ -31,6 +31,7 @@ def initialize_database():
 
     # ۲) ساخت جداول و اجرای مهاجرت‌های نسخه‌بندی‌شده (با بکاپ و بازگردانی در صورت خطا)
     run_migrations()
+    load_settings_cache()  # تنظیمات یک‌بار خوانده و در حافظه نگه داشته می‌شوند
 
     # ۳) حالا که جداول تضمین شدند، سراغ تنظیمات برو
     ensure_bool_setting("sms_enabled", default=True) 
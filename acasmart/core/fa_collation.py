@@ -1,6 +1,6 @@
 # fa_collation.py
 import re
-from functools import lru_cache, cmp_to_key
+from functools import lru_cache
 from typing import List, Tuple, Optional
 
 try:
@@ -33,9 +33,56 @@ def _normalize_fa(s: str) -> str:
 def _norm_cached(s: str) -> str:
     return _normalize_fa(s)
 
+# هر جزء کلید یک جفت (نوع, مقدار) است: فاصله کمترین رتبه را دارد («آرش رضایی» قبل از
+# «آرشام»)، دنبالهٔ ارقام با مقدار عددی‌اش مقایسه می‌شود («کلاس 2» قبل از «کلاس 10»)، مثل
+# حالت عددیِ QCollator که پیش‌تر ترتیب فهرست‌ها را تعیین می‌کرد.
+_KEY_SPACE, _KEY_NUMBER, _KEY_CHAR = 0, 1, 2
+_KEY_TOKENS = re.compile(r"(\s+)|(\d+)|(.)", re.S)
+
+@lru_cache(maxsize=10000)
+def fa_sort_key(s: str) -> Tuple[int, ...]:
+    """کلید مرتب‌سازی فارسی (ترتیب الفبای _FA_ORDER، بدون حساسیت به حروف بزرگ/کوچک،
+    فاصله پیش از هر حرف، ارقام به‌صورت عدد)."""
+    key = []
+    for space, digits, ch in _KEY_TOKENS.findall(_norm_cached(s or "").casefold()):
+        if space:
+            key += (_KEY_SPACE, 0)
+        elif digits:
+            key += (_KEY_NUMBER, int(digits))  # int() ارقام فارسی/عربی را هم می‌خواند
+        else:
+            key += (_KEY_CHAR, _FA_INDEX.get(ch, 1000 + ord(ch)))
+    return tuple(key)
+
+def normalize_for_search(s: str) -> str:
+    """شکلِ جست‌وجوپذیرِ متن: نرمال‌سازی فارسی، ارقام لاتین و حروف کوچک (ستون name_norm)."""
+    return _normalize_fa(str(s or "")).translate(_DIGIT_TRANS).casefold()
+
+def fa_collate(a: str, b: str) -> int:
+    """Collation «FA» برای SQLite (در db._configure روی هر اتصال ثبت می‌شود)."""
+    ka, kb = fa_sort_key(a), fa_sort_key(b)
+    return (ka > kb) - (ka < kb)
+
+class _QtSortKey:
+    """QCollatorSortKey با عملگرهای مقایسه، تا در key= و تاپل‌ها قابل استفاده باشد."""
+    __slots__ = ("_k",)
+
+    def __init__(self, k) -> None:
+        self._k = k
+
+    def __lt__(self, other) -> bool:
+        return self._k.compare(other._k) < 0
+
+    def __eq__(self, other) -> bool:
+        return self._k.compare(other._k) == 0
+
 class PersianCollator:
-    """مرتب‌ساز فارسی با QCollator (اگر موجود بود) و فالبک سفارشی."""
+    """مرتب‌ساز فارسی با QCollator (اگر موجود بود) و فالبک سفارشی.
+
+    مرتب‌سازی کلیدمحور است: برای هر رشته یک بار کلید ساخته و cache می‌شود
+    (QCollator.sortKey یا تاپلِ ترتیب‌های _FA_INDEX)، نه مقایسهٔ دوبه‌دو با cmp_to_key.
+    """
     def __init__(self) -> None:
+        self.sort_key = lru_cache(maxsize=20000)(self._make_sort_key)
         self._coll: Optional["QCollator"] = None
         if QCollator is not None and QLocale is not None:
             try:
@@ -48,28 +95,26 @@ class PersianCollator:
             except Exception:
                 self._coll = None
 
-    def compare(self, a: str, b: str) -> int:
-        a_n, b_n = _norm_cached(a), _norm_cached(b)
+    def _make_sort_key(self, s: str):
         if self._coll:
-            return self._coll.compare(a_n, b_n)
-        # فالبک: مقایسه بر اساس نگاشت الفبایی
-        ka = tuple(_FA_INDEX.get(ch, 1000 + ord(ch)) for ch in a_n)
-        kb = tuple(_FA_INDEX.get(ch, 1000 + ord(ch)) for ch in b_n)
-        return (ka > kb) - (ka < kb)
+            return _QtSortKey(self._coll.sortKey(_norm_cached(s)))
+        # فالبک: نگاشت الفبایی (همان ترتیبِ COLLATE FA در SQLite)
+        return fa_sort_key(s)
+
+    def compare(self, a: str, b: str) -> int:
+        ka, kb = self.sort_key(a), self.sort_key(b)
+        return (kb < ka) - (ka < kb)
 
     def contains(self, text: str, pattern: str) -> bool:
         return _norm_cached(pattern) in _norm_cached(text)
 
+    def sort_strings(self, items):
+        return sorted(items, key=lambda s: self.sort_key(str(s)))
+
     def sort_records(self, records: List[Tuple], name_index: int = 1, tiebreak_index: Optional[int] = None):
-        def _cmp(x, y):
-            c = self.compare(str(x[name_index]), str(y[name_index]))
-            if c != 0:
-                return c
-            if tiebreak_index is not None:
-                tx, ty = x[tiebreak_index], y[tiebreak_index]
-                return (tx > ty) - (tx < ty)
-            return 0
-        return sorted(records, key=cmp_to_key(_cmp))
+        if tiebreak_index is None:
+            return sorted(records, key=lambda r: self.sort_key(str(r[name_index])))
+        return sorted(records, key=lambda r: (self.sort_key(str(r[name_index])), r[tiebreak_index]))
 
 # singleton آماده برای استفاده ساده
 fa_collator = PersianCollator()
@@ -0,0 +1,112 @@
+"""Keyed interval index for weekly-slot conflict checks.
+
+Half-open ``[start, end)`` intervals (minutes from midnight) grouped by a key such as
+``(teacher_id, weekday)``. Each key keeps its intervals sorted by start, so an overlap
+query is a bisect plus a look-back bounded by the key's longest interval — O(log n)
+for the schedules this app sees, instead of a linear scan over every active term.
+``overlapping_pairs()`` is the bulk sweep-line pass used by the conflict audit, and
+``merge_intervals()`` / ``free_starts()`` turn busy slots into bookable start times.
+"""
+import heapq
+from bisect import bisect_left, insort
+
+
+class IntervalIndex:
+    """Intervals grouped by key; each interval carries a unique ident (e.g. a term id)."""
+
+    def __init__(self):
+        self._items = {}    # key -> sorted list of (start, end, ident)
+        self._where = {}    # ident -> (key, start, end)
+        self._max_len = {}  # key -> longest interval ever added (bounds the look-back)
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, ident):
+        return ident in self._where
+
+    def keys(self):
+        return list(self._items)
+
+    def intervals(self, key):
+        """[(start, end, ident), ...] under key, in start order."""
+        return list(self._items.get(key, ()))
+
+    def add(self, key, start, end, ident):
+        """Insert (or move) ident's interval. Empty intervals are ignored."""
+        self.discard(ident)
+        if end <= start:
+            return
+        insort(self._items.setdefault(key, []), (start, end, ident))
+        self._where[ident] = (key, start, end)
+        if end - start > self._max_len.get(key, 0):
+            self._max_len[key] = end - start
+
+    def discard(self, ident):
+        where = self._where.pop(ident, None)
+        if where is None:
+            return
+        key, start, end = where
+        items = self._items[key]
+        del items[bisect_left(items, (start, end, ident))]
+        if not items:
+            del self._items[key]
+            del self._max_len[key]
+
+    def overlapping(self, key, start, end, exclude=None):
+        """Idents under key whose interval overlaps [start, end), in start order."""
+        items = self._items.get(key)
+        if not items or end <= start:
+            return []
+        # anything overlapping starts before `end` and no earlier than start - longest
+        lo = bisect_left(items, (start - self._max_len[key],))
+        hi = bisect_left(items, (end,))
+        return [
+            ident for s, e, ident in items[lo:hi]
+            if e > start and ident != exclude
+        ]
+
+    def overlapping_pairs(self):
+        """Sweep-line pass: yield (key, ident_a, ident_b) for every overlapping pair.
+
+        O(n log n + pairs): per key, intervals arrive in start order and a heap of
+        active ends drops the ones finished before the next start.
+        """
+        for key, items in self._items.items():
+            active = []  # heap of (end, ident)
+            for start, end, ident in items:
+                while active and active[0][0] <= start:
+                    heapq.heappop(active)
+                for _, other in active:
+                    yield key, other, ident
+                heapq.heappush(active, (end, ident))
+
+
+def merge_intervals(*sorted_lists):
+    """Union of several start-sorted [(start, end, ...)] lists as disjoint [(start, end)], one pass."""
+    merged = []
+    for item in heapq.merge(*sorted_lists):
+        start, end = item[0], item[1]
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(s, e) for s, e in merged]
+
+
+def free_starts(busy, window_start, window_end, duration, step=15):
+    """Start minutes t (on a `step` grid from window_start) with [t, t+duration) inside the
+    window and clear of every disjoint, sorted busy interval."""
+    starts = []
+    t = window_start
+    for b_start, b_end in list(busy) + [(window_end, window_end)]:
+        while t + duration <= min(b_start, window_end):
+            starts.append(t)
+            t += step
+        if b_end > t:
+            # jump past the busy block, staying on the grid
+            t += -(-(b_end - t) // step) * step
+        if t + duration > window_end:
+            break
+    return starts
@@ -2,13 +2,43 @@
 
 Pure scheduling logic over Shamsi/Jalali dates: a term's lessons fall on a weekly
 base pattern (every 7 days from start_date, same weekday). Dates are the app's
-canonical "YYYY-MM-DD" Shamsi strings. All arithmetic goes through jdatetime by
-converting to Gregorian, adding a timedelta, and converting back (robust across
-Jalali month lengths and leap years).
+canonical "YYYY-MM-DD" Shamsi strings.
+
+Arithmetic runs on *day ordinals* (the proleptic Gregorian ordinal, as in
+``datetime.date.toordinal()``), so a day difference is a subtraction and a weekday
+is ``(ordinal + 6) % 7``. Shamsi strings map to ordinals through a precomputed
+table of Farvardin-1 ordinals for 1350–1500 plus the fixed month offsets (months
+1–6 have 31 days, 7–11 have 30, Esfand the rest of the year), so conversion is
+O(1) with no jdatetime round-trip. Dates outside the table fall back to jdatetime.
+
+The scalar functions below are thin wrappers over the ordinal helpers; the batch
+functions take sequences (thousands of terms at once) and return NumPy arrays when
+NumPy is available, plain lists otherwise. ``expand_timetable`` turns terms plus their
+attendance into the concrete lessons of a date range (week/month calendars, exports).
 """
 import datetime
+from bisect import bisect_right
+from functools import lru_cache
+
 import jdatetime
 
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+_FIRST_YEAR = 1350
+_LAST_YEAR = 1500
+_MONTH_OFFSETS = (0, 31, 62, 93, 124, 155, 186, 216, 246, 276, 306, 336)
+# Ordinal of 1 Farvardin for every year in range, plus the year after the last one
+# (so the length of the last year's Esfand is known).
+_YEAR_START = [
+    jdatetime.date(y, 1, 1).togregorian().toordinal()
+    for y in range(_FIRST_YEAR, _LAST_YEAR + 2)
+]
+_MIN_ORDINAL = _YEAR_START[0]
+_MAX_ORDINAL = _YEAR_START[-1] - 1
+
 
 def _to_greg(shamsi_date: str) -> datetime.date:
     return jdatetime.date.fromisoformat(str(shamsi_date).strip()).togregorian()
@@ -18,9 +48,53 @@ def _to_shamsi(greg: datetime.date) -> str:
     return jdatetime.date.fromgregorian(date=greg).isoformat()
 
 
+@lru_cache(maxsize=8192)
+def to_ordinal(shamsi_date: str) -> int:
+    """Day ordinal of a "YYYY-MM-DD" Shamsi date (Gregorian proleptic ordinal)."""
+    s = str(shamsi_date).strip()
+    if len(s) == 10 and s[4] == "-" and s[7] == "-":
+        try:
+            y, m, d = int(s[:4]), int(s[5:7]), int(s[8:])
+        except ValueError:
+            y = None
+        if y is not None and _FIRST_YEAR <= y <= _LAST_YEAR and 1 <= m <= 12 and d >= 1:
+            start = _YEAR_START[y - _FIRST_YEAR]
+            month_len = (31 if m <= 6 else 30) if m < 12 else (
+                _YEAR_START[y - _FIRST_YEAR + 1] - start - _MONTH_OFFSETS[11])
+            if d <= month_len:
+                return start + _MONTH_OFFSETS[m - 1] + d - 1
+    # outside the table, or malformed: let jdatetime decide (and raise on bad input)
+    return _to_greg(s).toordinal()
+
+
+def ordinal_or_none(shamsi_date):
+    """to_ordinal() for storage: None for a NULL/empty or unparsable date instead of raising.
+
+    Used by the repos to keep the integer ``*_ord`` columns (migration v8) next to
+    the Shamsi text dates they mirror.
+    """
+    if not shamsi_date:
+        return None
+    try:
+        return to_ordinal(shamsi_date)
+    except (TypeError, ValueError):
+        return None
+
+
+def from_ordinal(ordinal: int) -> str:
+    """"YYYY-MM-DD" Shamsi string for a day ordinal."""
+    ordinal = int(ordinal)
+    if not (_MIN_ORDINAL <= ordinal <= _MAX_ORDINAL):
+        return _to_shamsi(datetime.date.fromordinal(ordinal))
+    yi = bisect_right(_YEAR_START, ordinal) - 1
+    doy = ordinal - _YEAR_START[yi]
+    m = bisect_right(_MONTH_OFFSETS, doy)
+    return f"{_FIRST_YEAR + yi:04d}-{m:02d}-{doy - _MONTH_OFFSETS[m - 1] + 1:02d}"
+
+
 def days_between(start_shamsi: str, end_shamsi: str) -> int:
     """Signed day count from start to end (end - start). Negative if end precedes start."""
-    return (_to_greg(end_shamsi) - _to_greg(start_shamsi)).days
+    return to_ordinal(end_shamsi) - to_ordinal(start_shamsi)
 
 
 def is_weekly_occurrence(start_shamsi: str, date_shamsi: str) -> bool:
@@ -33,23 +107,29 @@ def occurrence_dates(start_shamsi: str, count: int):
     """The first `count` weekly occurrence dates (Shamsi strings) starting at start_shamsi."""
     if count <= 0:
         return []
-    g = _to_greg(start_shamsi)
-    return [_to_shamsi(g + datetime.timedelta(days=7 * i)) for i in range(count)]
+    o = to_ordinal(start_shamsi)
+    return [from_ordinal(o + 7 * i) for i in range(count)]
 
 
 def add_weeks(start_shamsi: str, weeks: int) -> str:
     """Shamsi date `weeks` weeks after start_shamsi."""
-    return _to_shamsi(_to_greg(start_shamsi) + datetime.timedelta(days=7 * weeks))
+    return from_ordinal(to_ordinal(start_shamsi) + 7 * weeks)
 
 
 # Persian weekday names keyed by Gregorian weekday() (Monday=0) — matches the
 # attendance window's mapping so class.day strings line up.
 _WEEKDAY_FA = {0: "دوشنبه", 1: "سه‌شنبه", 2: "چهارشنبه", 3: "پنجشنبه", 4: "جمعه", 5: "شنبه", 6: "یکشنبه"}
+_WEEKDAY_BY_NAME = {name: wd for wd, name in _WEEKDAY_FA.items()}
+
+
+def weekday_of_ordinal(ordinal: int) -> int:
+    """Gregorian weekday() (Monday=0) of a day ordinal."""
+    return (int(ordinal) + 6) % 7
 
 
 def weekday_fa(shamsi_date: str) -> str:
     """Persian weekday name for a Shamsi date."""
-    return _WEEKDAY_FA[_to_greg(shamsi_date).weekday()]
+    return _WEEKDAY_FA[weekday_of_ordinal(to_ordinal(shamsi_date))]
 
 
 def first_on_or_after(shamsi_date: str, weekday_name: str) -> str:
@@ -59,11 +139,161 @@ def first_on_or_after(shamsi_date: str, weekday_name: str) -> str:
     occurrences land on the class day. Returns shamsi_date unchanged if weekday_name
     is unknown.
     """
-    if weekday_name not in _WEEKDAY_FA.values():
+    target = _WEEKDAY_BY_NAME.get(weekday_name)
+    if target is None:
         return shamsi_date
-    g = _to_greg(shamsi_date)
-    for i in range(7):
-        d = g + datetime.timedelta(days=i)
-        if _WEEKDAY_FA[d.weekday()] == weekday_name:
-            return _to_shamsi(d)
-    return shamsi_date
+    o = to_ordinal(shamsi_date)
+    return from_ordinal(o + (target - weekday_of_ordinal(o)) % 7)
+
+
+# --------------------------- batch (vectorised) API ---------------------------
+
+def _array(values):
+    return np.asarray(values, dtype=np.int64) if np is not None else [int(v) for v in values]
+
+
+def to_ordinals(shamsi_dates):
+    """Day ordinals for a sequence of Shamsi strings (int64 array, or list without NumPy)."""
+    return _array([to_ordinal(s) for s in shamsi_dates])
+
+
+def from_ordinals(ordinals):
+    """Shamsi strings for a sequence (or array) of day ordinals."""
+    return [from_ordinal(o) for o in ordinals]
+
+
+def occurrence_flags(start_dates, date_shamsi):
+    """For every term start, whether date_shamsi is one of its weekly occurrences.
+
+    start_dates: Shamsi strings or day ordinals. Returns a bool array (list without NumPy).
+    """
+    starts = _ordinals_of(start_dates)
+    target = to_ordinal(date_shamsi)
+    if np is not None:
+        delta = target - starts
+        return (delta >= 0) & (delta % 7 == 0)
+    return [(target - s) >= 0 and (target - s) % 7 == 0 for s in starts]
+
+
+def occurrence_ordinals(start_dates, count):
+    """The first `count` weekly occurrence ordinals of every term: shape (n_terms, count)."""
+    starts = _ordinals_of(start_dates)
+    if np is not None:
+        return starts[:, None] + 7 * np.arange(max(0, int(count)), dtype=np.int64)[None, :]
+    return [[s + 7 * i for i in range(max(0, int(count)))] for s in starts]
+
+
+def next_occurrence_ordinals(start_dates, on_or_after_shamsi):
+    """Per term, the ordinal of its first weekly occurrence on or after the given date."""
+    starts = _ordinals_of(start_dates)
+    target = to_ordinal(on_or_after_shamsi)
+    if np is not None:
+        return np.where(starts >= target, starts, target + (starts - target) % 7)
+    return [s if s >= target else target + (s - target) % 7 for s in starts]
+
+
+def weekdays_of_ordinals(ordinals):
+    """Gregorian weekday() (Monday=0) for every ordinal."""
+    if np is not None:
+        return (np.asarray(ordinals, dtype=np.int64) + 6) % 7
+    return [(int(o) + 6) % 7 for o in ordinals]
+
+
+def _ordinals_of(dates):
+    """Accept Shamsi strings or ordinals (sequence or array) and return ordinals."""
+    if np is not None and isinstance(dates, np.ndarray) and dates.dtype.kind in "iu":
+        return dates.astype(np.int64, copy=False)
+    values = list(dates)
+    if values and isinstance(values[0], str):
+        return to_ordinals(values)
+    return _array(values)
+
+
+# ----------------------------- timetable engine ------------------------------
+
+TIMETABLE_COLUMNS = ("date_ord", "term_id", "seq", "status")
+
+
+def expand_timetable(terms, records, date_from, date_to, today=None):
+    """Expand terms into concrete lessons for the Shamsi range [date_from, date_to], in one batch.
+
+    terms:   iterable of (term_id, start_date, sessions_limit); start_date as Shamsi or ordinal.
+    records: iterable of (term_id, date, status) attendance rows of those terms (Shamsi or
+             ordinal dates). Pass all of a term's records: they all count toward the limit.
+    today:   Shamsi or ordinal "now" (defaults to the current date); planned lessons start here.
+
+    Recorded rows are never dropped. Present/absent records are the held lessons, numbered
+    1..held in date order in `seq` (same rule as the roster: held = recorded present + absent);
+    canceled records are kept with seq 0. The remaining `sessions_limit - held` lessons are
+    planned on the term's weekly occurrences (start + 7n) that fall after its last record and
+    on or after today, numbered held+1..limit with status None. Past occurrences with no record
+    are not lessons: they neither appear nor consume the limit.
+
+    Returns a columnar dict (see TIMETABLE_COLUMNS) sorted by (date_ord, term_id):
+    date_ord / term_id / seq as int arrays (lists without NumPy) and status as a list of
+    'present' / 'absent' / 'canceled' / None (planned, not recorded yet).
+
+    Recorded lessons past a gap of unrecorded weeks survive (limit 4, present in weeks 5
+    and 6, today = week 10):
+
+    >>> s = to_ordinal("1403-01-04")
+    >>> t = expand_timetable([(1, s, 4)], [(1, s + 35, "present"), (1, s + 42, "present")],
+    ...                      s, s + 200, today=s + 70)
+    >>> [(int(d - s) // 7, int(q), st) for d, q, st in zip(t["date_ord"], t["seq"], t["status"])]
+    [(5, 1, 'present'), (6, 2, 'present'), (10, 3, None), (11, 4, None)]
+    """
+    lo, hi = _as_ordinal(date_from), _as_ordinal(date_to)
+    today = _as_ordinal(today) if today is not None else datetime.date.today().toordinal()
+    by_term = {}
+    for term_id, day, status in records:
+        day = _as_ordinal(day)
+        if day is not None:
+            by_term.setdefault(term_id, {})[day] = status
+
+    out = []
+    for term_id, start, limit in terms:
+        start = _as_ordinal(start)
+        limit = int(limit or 0)
+        if start is None:
+            continue
+        recorded = by_term.get(term_id, {})
+        held = 0
+        for day in sorted(recorded):
+            status = recorded[day]
+            seq = 0
+            if status != "canceled":
+                held += 1
+                seq = held
+            if lo <= day <= hi:
+                out.append((day, term_id, seq, status))
+
+        # planned lessons: weekly occurrences after the last record and from today on
+        remaining = limit - held
+        if remaining <= 0:
+            continue
+        first = max(start, today, (max(recorded) + 1) if recorded else start)
+        day = first + (start - first) % 7  # first occurrence on or after `first`
+        seq = held
+        while remaining > 0 and day <= hi:
+            seq += 1
+            remaining -= 1
+            if day >= lo:
+                out.append((day, term_id, seq, None))
+            day += 7
+    out.sort(key=lambda r: (r[0], r[1]))
+
+    return {
+        "date_ord": _array([r[0] for r in out]),
+        "term_id": _array([r[1] for r in out]),
+        "seq": _array([r[2] for r in out]),
+        "status": [r[3] for r in out],
+    }
+
+
+def _as_ordinal(day):
+    """Shamsi string or ordinal → ordinal (None stays None)."""
+    if day is None:
+        return None
+    if isinstance(day, str):
+        return ordinal_or_none(day)
+    return int(day)
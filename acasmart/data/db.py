@@ -1,17 +1,190 @@
+"""SQLite connection management.
+
+Connections are pooled per thread: ``get_connection()`` hands out an already
+configured connection (row factory, PRAGMAs, statement cache) and takes it back
+when the caller is done with it, instead of reconnecting and re-issuing the
+PRAGMAs on every repo call.
+
+Existing call sites keep working unchanged:
+
+- ``with get_connection() as conn:`` commits/rolls back exactly like a plain
+  sqlite3 connection, then returns the connection to the pool on exit.
+- ``conn = get_connection(); ...; conn.close()`` returns it to the pool on close.
+- ``with tx() as conn:`` is unchanged (commit, rollback on error, release).
+
+For a batch of related writes (e.g. a whole class-day of attendance) use
+``with unit_of_work() as conn:``: everything runs in one ``BEGIN IMMEDIATE``
+transaction on one connection, so the batch pays for a single commit/fsync.
+
+A connection is never shared by two callers at once: nested repo calls on the
+same thread check out a second connection, exactly as before. sqlite3
+connections are bound to the thread that opened them, so each thread has its
+own pool. ``close_pool()`` must be called before the database file is replaced
+on disk (restore from backup), so no stale handle keeps pointing at the old file.
+Background workers use their own thread's pool and call ``release_thread_connections()``
+when done, so no connection is ever shared with the GUI thread.
+
+Every connection registers the ``FA`` collation (Persian alphabet order,
+``core.fa_collation``). Name indexes use it (migration v9), so writes to those tables
+need a connection from here — a bare ``sqlite3.connect`` can read but not modify them.
+"""
 import sqlite3
+import threading
+import weakref
 from contextlib import contextmanager
+from acasmart.core.fa_collation import fa_collate
 from acasmart.paths import DB_PATH
 
+# Idle connections kept per thread; extras are really closed on release.
+POOL_SIZE_PER_THREAD = 4
+# Per-connection prepared-statement cache (sqlite3's default is 128).
+STATEMENT_CACHE_SIZE = 256
 
-def get_connection():
-    conn = sqlite3.connect(DB_PATH)
+_local = threading.local()
+_lock = threading.Lock()
+_generation = 0
+_all_connections = weakref.WeakSet()
+_stats = {"opened": 0, "reused": 0, "closed": 0}
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose ``close()`` and ``with`` exit return it to the pool."""
+
+    _pool_generation = 0
+    _checked_out = False
+
+    def close(self):
+        _release(self)
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            return super().__exit__(exc_type, exc, tb)
+        finally:
+            _release(self)
+
+    def _really_close(self):
+        with _lock:
+            _stats["closed"] += 1
+            _all_connections.discard(self)
+        sqlite3.Connection.close(self)
+
+
+def _configure(conn):
     conn.row_factory = sqlite3.Row
+    # Persian name order inside SQLite: ORDER BY name COLLATE FA (and the v9 indexes need it)
+    conn.create_collation("FA", fa_collate)
     conn.execute("PRAGMA foreign_keys = ON")
     conn.execute("PRAGMA journal_mode = WAL")
     conn.execute("PRAGMA synchronous = NORMAL")
+
+
+def connect(path=None, **kwargs):
+    """Open a new configured, *unpooled* connection (e.g. for a one-off file or a migration)."""
+    kwargs.setdefault("cached_statements", STATEMENT_CACHE_SIZE)
+    conn = sqlite3.connect(str(path or DB_PATH), **kwargs)
+    _configure(conn)
+    return conn
+
+
+def _idle():
+    idle = getattr(_local, "idle", None)
+    if idle is None:
+        idle = _local.idle = []
+    return idle
+
+
+def get_connection():
+    """Check out a configured connection from this thread's pool (opening one if none is idle)."""
+    idle = _idle()
+    while idle:
+        conn = idle.pop()
+        if conn._pool_generation != _generation:
+            conn._really_close()
+            continue
+        conn._checked_out = True
+        with _lock:
+            _stats["reused"] += 1
+        return conn
+
+    conn = sqlite3.connect(
+        str(DB_PATH), factory=PooledConnection, cached_statements=STATEMENT_CACHE_SIZE
+    )
+    _configure(conn)
+    conn._pool_generation = _generation
+    conn._checked_out = True
+    with _lock:
+        _stats["opened"] += 1
+        _all_connections.add(conn)
     return conn
 
 
+def _release(conn):
+    """Return a checked-out connection to its thread's pool (or close it if it can't be reused)."""
+    if not conn._checked_out:
+        return  # double close / close after with-exit: harmless, like sqlite3
+    conn._checked_out = False
+    try:
+        if conn.in_transaction:
+            conn.rollback()  # never hand out a connection with someone else's open transaction
+        # callers (e.g. migrations) may have switched these; restore the pool defaults
+        if conn.isolation_level != "":
+            conn.isolation_level = ""
+        conn.row_factory = sqlite3.Row
+    except sqlite3.Error:
+        conn._really_close()
+        return
+    idle = _idle()
+    if conn._pool_generation != _generation or len(idle) >= POOL_SIZE_PER_THREAD:
+        conn._really_close()
+        return
+    idle.append(conn)
+
+
+def close_pool():
+    """Close this thread's idle connections and retire every other pooled connection.
+
+    Connections held by other threads (or currently checked out) can't be closed from
+    here; they are closed as soon as they're next released or checked out.
+    """
+    global _generation
+    with _lock:
+        _generation += 1
+    idle = _idle()
+    while idle:
+        idle.pop()._really_close()
+
+
+def release_thread_connections():
+    """Really close this thread's idle connections (other threads' pools are untouched).
+
+    For short-lived worker threads (e.g. QThreadPool loaders, ui/widgets/async_loader):
+    their idle connections would otherwise stay open until the thread-local is collected.
+    """
+    idle = _idle()
+    while idle:
+        idle.pop()._really_close()
+
+
+def pool_generation():
+    """Bumped by every close_pool(); long-lived private connections use it to know they must reopen."""
+    return _generation
+
+
+def pool_stats():
+    """Counters for the connection pool: opened / reused / closed, plus live connections."""
+    with _lock:
+        stats = dict(_stats)
+        stats["live"] = len(_all_connections)
+    stats["idle_this_thread"] = len(_idle())
+    return stats
+
+
+def reset_pool_stats():
+    with _lock:
+        for key in _stats:
+            _stats[key] = 0
+
+
 @contextmanager
 def tx():
     conn = get_connection()
@@ -23,3 +196,26 @@ def tx():
         raise
     finally:
         conn.close()
+
+
+@contextmanager
+def unit_of_work():
+    """One ``BEGIN IMMEDIATE`` transaction on one pooled connection for a batch of writes.
+
+    The write lock is taken up front, so the batch either commits as a whole (one
+    fsync) or, on any exception, is rolled back as a whole. Repo helpers that take a
+    cursor/connection can be composed inside it; don't call the self-committing repo
+    functions from within, they use their own connections.
+    """
+    conn = get_connection()
+    conn.isolation_level = None  # BEGIN/COMMIT are issued explicitly below
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        yield conn
+        conn.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
@@ -30,7 +30,7 @@ from datetime import datetime
 from pathlib import Path
 
 from acasmart.paths import DB_PATH
-from acasmart.data.db import get_connection
+from acasmart.data.db import get_connection, close_pool
 from acasmart.data.schema import create_tables
 
 logger = logging.getLogger(__name__)
@@ -244,6 +244,345 @@ def _migrate_v6_drop_sessions(conn):
         conn.execute("DROP TABLE IF EXISTS sessions")
 
 
+# Per-term counters (v7). Each trigger recomputes the affected term's row from its own
+# attendance/payments (a handful of rows per term, via the term_id indexes) instead of
+# applying +/- deltas: that stays correct under INSERT OR REPLACE (whose implicit delete
+# fires no trigger) and for MAX(date) columns, which can't be decremented. The
+# EXISTS-style FROM student_terms guard skips terms being deleted (FK cascade).
+_TERM_STATS_ATTENDANCE_SQL = """
+    INSERT INTO term_stats (term_id, held_count, present_count, last_attendance_date)
+    SELECT st.id,
+           (SELECT COUNT(*) FROM attendance a WHERE a.term_id = st.id AND a.status != 'canceled'),
+           (SELECT COUNT(*) FROM attendance a WHERE a.term_id = st.id AND a.status = 'present'),
+           (SELECT MAX(a.date) FROM attendance a WHERE a.term_id = st.id AND a.status != 'canceled')
+    FROM student_terms st WHERE st.id = {term}
+    ON CONFLICT(term_id) DO UPDATE SET
+        held_count = excluded.held_count,
+        present_count = excluded.present_count,
+        last_attendance_date = excluded.last_attendance_date;
+"""
+_TERM_STATS_PAYMENTS_SQL = """
+    INSERT INTO term_stats (term_id, tuition_paid, extra_paid, payment_count, last_payment_date)
+    SELECT st.id,
+           (SELECT COALESCE(SUM(p.amount), 0) FROM payments p WHERE p.term_id = st.id AND p.payment_type = 'tuition'),
+           (SELECT COALESCE(SUM(p.amount), 0) FROM payments p WHERE p.term_id = st.id AND p.payment_type = 'extra'),
+           (SELECT COUNT(*) FROM payments p WHERE p.term_id = st.id),
+           (SELECT MAX(p.payment_date) FROM payments p WHERE p.term_id = st.id)
+    FROM student_terms st WHERE st.id = {term}
+    ON CONFLICT(term_id) DO UPDATE SET
+        tuition_paid = excluded.tuition_paid,
+        extra_paid = excluded.extra_paid,
+        payment_count = excluded.payment_count,
+        last_payment_date = excluded.last_payment_date;
+"""
+
+
+def _create_term_stats_triggers(conn):
+    """(Re)create the term_stats sync triggers. Any migration that rebuilds attendance or
+    payments drops their triggers with the old table and must call this again."""
+    for table, refresh in (("attendance", _TERM_STATS_ATTENDANCE_SQL),
+                           ("payments", _TERM_STATS_PAYMENTS_SQL)):
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_term_stats_{table}_ins")
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_term_stats_{table}_del")
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_term_stats_{table}_upd")
+        conn.execute(f"""
+            CREATE TRIGGER trg_term_stats_{table}_ins AFTER INSERT ON {table}
+            WHEN NEW.term_id IS NOT NULL
+            BEGIN {refresh.format(term="NEW.term_id")} END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER trg_term_stats_{table}_del AFTER DELETE ON {table}
+            WHEN OLD.term_id IS NOT NULL
+            BEGIN {refresh.format(term="OLD.term_id")} END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER trg_term_stats_{table}_upd AFTER UPDATE ON {table}
+            BEGIN
+                {refresh.format(term="OLD.term_id")}
+                {refresh.format(term="NEW.term_id")}
+            END
+        """)
+
+
+def _migrate_v7_term_stats(conn):
+    """v7: materialised per-term counters (`term_stats`) kept in sync by triggers.
+
+    Held/present counts, last held date, tuition/extra paid, payment count and last
+    payment date are read as O(1) counters instead of aggregating attendance/payments
+    on every screen. Additive: a new table + triggers, backfilled from history.
+    `term_stats_repo.check_term_stats()` verifies (and can repair) the counters.
+    A term with no history may have no row; readers LEFT JOIN and COALESCE.
+    """
+    with transactional(conn):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS term_stats (
+                term_id INTEGER PRIMARY KEY,
+                held_count INTEGER NOT NULL DEFAULT 0,
+                present_count INTEGER NOT NULL DEFAULT 0,
+                last_attendance_date TEXT,
+                tuition_paid INTEGER NOT NULL DEFAULT 0,
+                extra_paid INTEGER NOT NULL DEFAULT 0,
+                payment_count INTEGER NOT NULL DEFAULT 0,
+                last_payment_date TEXT,
+                FOREIGN KEY(term_id) REFERENCES student_terms(id) ON DELETE CASCADE
+            )
+        """)
+        _create_term_stats_triggers(conn)
+        conn.execute("DELETE FROM term_stats")
+        conn.execute("""
+            INSERT INTO term_stats
+                (term_id, held_count, present_count, last_attendance_date,
+                 tuition_paid, extra_paid, payment_count, last_payment_date)
+            SELECT st.id,
+                   COALESCE(a.held, 0), COALESCE(a.present, 0), a.last_date,
+                   COALESCE(p.tuition, 0), COALESCE(p.extra, 0), COALESCE(p.cnt, 0), p.last_date
+            FROM student_terms st
+            LEFT JOIN (
+                SELECT term_id,
+                       SUM(CASE WHEN status != 'canceled' THEN 1 ELSE 0 END) AS held,
+                       SUM(CASE WHEN status = 'present' THEN 1 ELSE 0 END) AS present,
+                       MAX(CASE WHEN status != 'canceled' THEN date END) AS last_date
+                FROM attendance GROUP BY term_id
+            ) a ON a.term_id = st.id
+            LEFT JOIN (
+                SELECT term_id,
+                       SUM(CASE WHEN payment_type = 'tuition' THEN amount ELSE 0 END) AS tuition,
+                       SUM(CASE WHEN payment_type = 'extra' THEN amount ELSE 0 END) AS extra,
+                       COUNT(*) AS cnt,
+                       MAX(payment_date) AS last_date
+                FROM payments WHERE term_id IS NOT NULL GROUP BY term_id
+            ) p ON p.term_id = st.id
+        """)
+
+
+# Integer day-ordinal mirrors of the Shamsi text dates (v8): (table, text column, ordinal column).
+DATE_ORDINAL_COLUMNS = (
+    ("attendance", "date", "date_ord"),
+    ("payments", "payment_date", "payment_date_ord"),
+    ("student_terms", "start_date", "start_date_ord"),
+    ("student_terms", "end_date", "end_date_ord"),
+)
+
+
+def _migrate_v8_date_ordinals(conn):
+    """v8: integer day-number columns next to the Shamsi 'YYYY-MM-DD' text dates.
+
+    `*_ord` holds the proleptic-Gregorian day ordinal (``core.schedule.to_ordinal``), so
+    day differences, weekday (``(ord + 6) % 7``), weekly occurrence (``% 7``) and range
+    filters run inside SQLite instead of round-tripping every row through jdatetime.
+    Additive: nullable columns + indexes, backfilled here; from now on the repos write
+    the ordinal whenever they write the text date. NULL text (or an unparsable legacy
+    value) stays NULL.
+    """
+    from acasmart.core.schedule import ordinal_or_none
+
+    with transactional(conn):
+        for table, text_col, ord_col in DATE_ORDINAL_COLUMNS:
+            cols = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if ord_col not in cols:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {ord_col} INTEGER")
+            values = [
+                (ordinal_or_none(row[0]), row[0])
+                for row in conn.execute(
+                    f"SELECT DISTINCT {text_col} FROM {table} WHERE {text_col} IS NOT NULL"
+                )
+            ]
+            conn.executemany(
+                f"UPDATE {table} SET {ord_col} = ? WHERE {text_col} = ?", values
+            )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_attendance_class_date_ord ON attendance(class_id, date_ord)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_payments_date_ord        ON payments(payment_date_ord)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_terms_class_start_ord    ON student_terms(class_id, start_date_ord)")
+
+
+def _migrate_v9_fa_name_indexes(conn):
+    """v9: name indexes in the Persian `FA` collation (registered by db._configure).
+
+    Lists are ordered with `ORDER BY name COLLATE FA, <tiebreak>` inside SQLite instead
+    of being re-sorted in Python; these indexes serve that order directly. Additive.
+    The index order is fa_collation.fa_sort_key (whitespace first, digit runs compared
+    as numbers); changing that key later requires a `REINDEX FA` migration.
+    """
+    with transactional(conn):
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_students_name_fa ON students(name COLLATE FA, national_code)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_teachers_name_fa ON teachers(name COLLATE FA, id)")
+
+
+# People search (v10): one trigram FTS5 table per person table, rowid = person id, kept
+# in sync by triggers from the repo-maintained name_norm column.
+_PEOPLE_SEARCH_TABLES = ("students", "teachers")
+
+
+def _fts5_trigram_supported(conn) -> bool:
+    """True if this SQLite has FTS5 with the trigram tokenizer (3.34+, FTS5 compiled in).
+
+    Probed with a throwaway temp table rather than by version number, since a build can
+    also omit FTS5 altogether. Without it the v10/v11 indexes are skipped and search_repo
+    falls back to LIKE on the same columns.
+    """
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp._fts5_trigram_probe USING fts5(x, tokenize='trigram')")
+    except sqlite3.OperationalError:
+        return False
+    conn.execute("DROP TABLE temp._fts5_trigram_probe")
+    return True
+
+
+def _drop_search_index(conn, table):
+    conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_fts_ins")
+    conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_fts_del")
+    conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_fts_upd")
+    conn.execute(f"DROP TABLE IF EXISTS {table}_fts")
+
+
+def _create_people_search_triggers(conn, table):
+    conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_fts_ins")
+    conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_fts_del")
+    conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_fts_upd")
+    insert = (f"INSERT INTO {table}_fts (rowid, name_norm, national_code, phone) "
+              f"VALUES (NEW.id, NEW.name_norm, NEW.national_code, NEW.phone);")
+    delete = f"DELETE FROM {table}_fts WHERE rowid = OLD.id;"
+    conn.execute(f"CREATE TRIGGER trg_{table}_fts_ins AFTER INSERT ON {table} BEGIN {insert} END")
+    conn.execute(f"CREATE TRIGGER trg_{table}_fts_del AFTER DELETE ON {table} BEGIN {delete} END")
+    conn.execute(f"""
+        CREATE TRIGGER trg_{table}_fts_upd AFTER UPDATE OF name, name_norm, national_code, phone ON {table}
+        BEGIN {delete} {insert} END
+    """)
+
+
+def _migrate_v10_people_search(conn):
+    """v10: normalised-name column + trigram FTS5 index for student/teacher search.
+
+    `name_norm` = fa_collation.normalize_for_search(name) (Persian letter variants, ZWNJ,
+    diacritics, digits and case folded), written by the repos alongside `name`.
+    `students_fts` / `teachers_fts` (tokenize='trigram', rowid = id) index name_norm,
+    national_code and phone, so substring search is an index lookup instead of a scan of
+    the in-memory list on every keystroke (see search_repo). If SQLite lacks the trigram
+    tokenizer only name_norm is added and search_repo uses LIKE on it.
+    """
+    from acasmart.core.fa_collation import normalize_for_search
+
+    with transactional(conn):
+        use_fts = _fts5_trigram_supported(conn)
+        if not use_fts:
+            logger.warning("SQLite %s has no FTS5 trigram tokenizer; people search will use LIKE",
+                           sqlite3.sqlite_version)
+        for table in _PEOPLE_SEARCH_TABLES:
+            cols = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if "name_norm" not in cols:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN name_norm TEXT")
+            conn.executemany(
+                f"UPDATE {table} SET name_norm = ? WHERE id = ?",
+                [(normalize_for_search(name), pid)
+                 for pid, name in conn.execute(f"SELECT id, name FROM {table}").fetchall()],
+            )
+            _drop_search_index(conn, table)
+            if not use_fts:
+                continue
+            conn.execute(f"""
+                CREATE VIRTUAL TABLE {table}_fts
+                USING fts5(name_norm, national_code, phone, tokenize='trigram')
+            """)
+            conn.execute(f"""
+                INSERT INTO {table}_fts (rowid, name_norm, national_code, phone)
+                SELECT id, name_norm, national_code, phone FROM {table}
+            """)
+            _create_people_search_triggers(conn, table)
+
+
+# Free-text notes (v11): (table, text column) pairs indexed in {table}_fts (rowid = id).
+# Only rows that carry text are indexed. attendance is written with INSERT OR REPLACE,
+# whose implicit delete fires no trigger, so its insert trigger also drops index rows
+# whose attendance row is gone (the index only holds canceled lessons with a reason,
+# so that sweep stays small); readers join back to the base table regardless.
+_NOTE_SEARCH_COLUMNS = (("payments", "description"), ("attendance", "cancel_reason"))
+
+
+def _create_note_search_triggers(conn, table, column):
+    """(Re)create the {table}_fts sync triggers. A migration that rebuilds payments or
+    attendance drops them with the old table and must call this again."""
+    conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_fts_ins")
+    conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_fts_del")
+    conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_fts_upd")
+    insert = (f"INSERT INTO {table}_fts (rowid, {column}) "
+              f"SELECT NEW.id, NEW.{column} WHERE COALESCE(NEW.{column}, '') != '';")
+    delete = f"DELETE FROM {table}_fts WHERE rowid = OLD.id;"
+    purge = (f"DELETE FROM {table}_fts WHERE NOT EXISTS "
+             f"(SELECT 1 FROM {table} t WHERE t.id = {table}_fts.rowid);")
+    conn.execute(f"""
+        CREATE TRIGGER trg_{table}_fts_ins AFTER INSERT ON {table}
+        BEGIN {purge if table == "attendance" else ""} {insert} END
+    """)
+    conn.execute(f"CREATE TRIGGER trg_{table}_fts_del AFTER DELETE ON {table} BEGIN {delete} END")
+    conn.execute(f"""
+        CREATE TRIGGER trg_{table}_fts_upd AFTER UPDATE OF {column} ON {table}
+        BEGIN {delete} {insert} END
+    """)
+
+
+def _migrate_v11_note_search(conn):
+    """v11: trigram FTS5 index over payments.description and attendance.cancel_reason.
+
+    `payments_fts` / `attendance_fts` (rowid = id) are kept in sync by triggers, so the
+    payment report's keyword filter and the cancel-reason search are index lookups
+    combined with their date/type filters in one query (payments_repo.fetch_payments(keyword=...),
+    attendance_repo.search_cancel_reasons) instead of a substring test per fetched row.
+    Skipped (search_repo falls back to LIKE) if SQLite lacks the trigram tokenizer.
+    """
+    with transactional(conn):
+        use_fts = _fts5_trigram_supported(conn)
+        if not use_fts:
+            logger.warning("SQLite %s has no FTS5 trigram tokenizer; note search will use LIKE",
+                           sqlite3.sqlite_version)
+        for table, column in _NOTE_SEARCH_COLUMNS:
+            _drop_search_index(conn, table)
+            if not use_fts:
+                continue
+            conn.execute(f"CREATE VIRTUAL TABLE {table}_fts USING fts5({column}, tokenize='trigram')")
+            conn.execute(f"""
+                INSERT INTO {table}_fts (rowid, {column})
+                SELECT id, {column} FROM {table} WHERE COALESCE({column}, '') != ''
+            """)
+            _create_note_search_triggers(conn, table, column)
+
+
+def _migrate_v12_sms_outbox(conn):
+    """v12: persistent outbox for SMS (renewal reminders first).
+
+    Sending used to be a blocking HTTP call on the GUI thread. Now callers insert
+    `sms_outbox` rows (recipient + pattern params snapshot) and the background dispatcher
+    (services/sms_dispatcher) drains them: pending → sending → sent / failed / disabled,
+    with `attempts` and `next_attempt_at` (unix time) driving the retry backoff. The partial
+    unique index keeps at most one pending/sending row per (kind, student, term), so
+    enqueueing the same reminder twice is a no-op.
+    """
+    with transactional(conn):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sms_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                student_id INTEGER REFERENCES students(id) ON DELETE CASCADE,
+                term_id INTEGER REFERENCES student_terms(id) ON DELETE CASCADE,
+                phone TEXT NOT NULL,
+                params TEXT NOT NULL DEFAULT '{}',
+                status TEXT NOT NULL DEFAULT 'pending'
+                    CHECK (status IN ('pending', 'sending', 'sent', 'failed', 'disabled')),
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0,
+                last_error TEXT,
+                created_at TEXT DEFAULT (datetime('now','localtime')),
+                sent_at TEXT
+            )
+        """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_sms_outbox_due ON sms_outbox(status, next_attempt_at)"
+        )
+        conn.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS ux_sms_outbox_active
+            ON sms_outbox(kind, student_id, term_id) WHERE status IN ('pending', 'sending')
+        """)
+
+
 # Ordered list of hardening migrations. Each: (target_version, name, fn(conn)).
 # Versions must be contiguous and strictly greater than BASELINE_VERSION.
 MIGRATIONS = [
@@ -252,6 +591,12 @@ MIGRATIONS = [
     (4, "term_lesson_duration", _migrate_v4_term_lesson_duration),
     (5, "dedup_active_terms", _migrate_v5_dedup_active_terms),
     (6, "drop_sessions", _migrate_v6_drop_sessions),
+    (7, "term_stats", _migrate_v7_term_stats),
+    (8, "date_ordinals", _migrate_v8_date_ordinals),
+    (9, "fa_name_indexes", _migrate_v9_fa_name_indexes),
+    (10, "people_search", _migrate_v10_people_search),
+    (11, "note_search", _migrate_v11_note_search),
+    (12, "sms_outbox", _migrate_v12_sms_outbox),
 ]
 
 
@@ -310,6 +655,7 @@ def _backup_db(from_version: int) -> "Path | None":
 def _restore_db(backup_path: "Path") -> None:
     """Overwrite the live DB with a backup and drop stale WAL/SHM sidecars."""
     db_path = Path(DB_PATH)
+    close_pool()  # pooled handles must not outlive the file they point at
     for suffix in ("-wal", "-shm"):
         side = Path(str(db_path) + suffix)
         if side.exists():
@@ -1,5 +1,7 @@
 import logging
-from acasmart.data.db import get_connection
+from acasmart.core.schedule import ordinal_or_none
+from acasmart.data.db import get_connection, unit_of_work
+from acasmart.data.repos.search_repo import text_match_sql
 
 logger = logging.getLogger(__name__)
 
@@ -58,10 +60,10 @@ def insert_attendance_with_date(student_id, class_id, term_id, date, status, can
 		conn.execute(
 			"""
 			INSERT OR REPLACE INTO attendance
-				(student_id, class_id, term_id, date, is_present, status, cancel_reason)
-			VALUES (?, ?, ?, ?, ?, ?, ?)
+				(student_id, class_id, term_id, date, date_ord, is_present, status, cancel_reason)
+			VALUES (?, ?, ?, ?, ?, ?, ?, ?)
 			""",
-			(student_id, class_id, term_id, date, is_present, status, cancel_reason)
+			(student_id, class_id, term_id, date, ordinal_or_none(date), is_present, status, cancel_reason)
 		)
 		conn.commit()
 
@@ -70,6 +72,86 @@ def insert_attendance_with_date(student_id, class_id, term_id, date, status, can
 	return ended
 
 
+def save_attendance_batch(class_id, date_str, marks):
+	"""ثبتِ حضور/غیابِ یک کلاس در یک روز، همه در یک تراکنشِ BEGIN IMMEDIATE (یک commit).
+
+	marks: لیستِ (student_id, term_id, status) با status یکی از 'present' / 'absent'.
+	برای هر ردیف: بازهٔ ترم بررسی، رکورد ثبت، تکمیلِ ترم بازمحاسبه و شمارشِ بعد از ثبت
+	گرفته می‌شود؛ همچنین مشخص می‌شود که آیا یادآوریِ تمدید باید ارسال شود
+	(دقیقاً یک جلسه مانده و هنوز ارسال‌شده ثبت نشده). ارسالِ پیامک بیرون از تراکنش است.
+
+	خروجی: لیستی از dict به ترتیبِ marks با کلیدهای
+	student_id, term_id, status, saved, skipped_reason, ended, total_after, term_limit, needs_renewal_sms.
+	هر خطا (مثلاً IntegrityError) کلِ دسته را rollback می‌کند.
+	"""
+	from acasmart.data.repos.settings_repo import get_setting
+	from acasmart.data.repos.terms_repo import refresh_term_completion_in
+	marks = list(marks)
+	for _, _, status in marks:
+		if status not in {"present", "absent"}:
+			raise ValueError("invalid attendance status")
+	default_limit = None
+	date_ord = ordinal_or_none(date_str)
+	outcomes = []
+	with unit_of_work() as conn:
+		c = conn.cursor()
+		term_ids = sorted({term_id for _, term_id, _ in marks})
+		terms = {}
+		if term_ids:
+			placeholders = ",".join("?" * len(term_ids))
+			c.execute(f"""
+				SELECT id, start_date, end_date, sessions_limit
+				FROM student_terms WHERE id IN ({placeholders})
+			""", term_ids)
+			terms = {row[0]: (row[1], row[2], row[3]) for row in c.fetchall()}
+
+		for student_id, term_id, status in marks:
+			outcome = {
+				"student_id": student_id, "term_id": term_id, "status": status,
+				"saved": False, "skipped_reason": None, "ended": False,
+				"total_after": None, "term_limit": None, "needs_renewal_sms": False,
+			}
+			outcomes.append(outcome)
+			term = terms.get(term_id)
+			if term is None:
+				outcome["skipped_reason"] = "no_term"
+				continue
+			start_date, end_date, term_limit = term
+			# بیرون از بازه ترم ثبت نکن
+			if date_str < start_date or (end_date and date_str > end_date):
+				outcome["skipped_reason"] = "out_of_term"
+				continue
+			if term_limit is None:
+				if default_limit is None:
+					default_limit = int(get_setting("term_session_count", 12))
+				term_limit = default_limit
+			term_limit = int(term_limit or 12)
+
+			c.execute(
+				"""
+				INSERT OR REPLACE INTO attendance
+					(student_id, class_id, term_id, date, date_ord, is_present, status, cancel_reason)
+				VALUES (?, ?, ?, ?, ?, ?, ?, NULL)
+				""",
+				(student_id, class_id, term_id, date_str, date_ord, 1 if status == "present" else 0, status)
+			)
+			ended = refresh_term_completion_in(c, term_id)
+			c.execute("SELECT held_count FROM term_stats WHERE term_id = ?", (term_id,))
+			row = c.fetchone()
+			total_after = row[0] if row else 0
+			c.execute(
+				"SELECT 1 FROM sms_notifications WHERE student_id = ? AND term_id = ?",
+				(student_id, term_id)
+			)
+			already_sent = c.fetchone() is not None
+
+			outcome.update(
+				saved=True, ended=ended, total_after=total_after, term_limit=term_limit,
+				needs_renewal_sms=(total_after == max(0, term_limit - 1)) and not already_sent,
+			)
+	return outcomes
+
+
 def delete_attendance(student_id, class_id, term_id, date_str):
 	"""حذف یک رکورد حضور بر اساس هنرجو/کلاس/ترم/تاریخ (رشته شمسی)."""
 	with get_connection() as conn:
@@ -145,6 +227,45 @@ def get_term_id_by_student_class_and_date(student_id, class_id, selected_date):
 def count_present_attendance_for_term(term_id: int) -> int:
 	with get_connection() as conn:
 		c = conn.cursor()
-		c.execute("SELECT COUNT(*) FROM attendance WHERE term_id = ? AND status = 'present'", (term_id,))
+		c.execute("SELECT present_count FROM term_stats WHERE term_id = ?", (term_id,))
 		row = c.fetchone()
 		return int(row[0]) if row else 0
+
+
+def search_cancel_reasons(keyword, date_from=None, date_to=None, class_id=None, student_id=None, limit=None):
+	"""جلسه‌های لغوشده‌ای که دلیلشان keyword را دارد (ایندکس attendance_fts، مهاجرت v11).
+
+	فیلترهای تاریخ (رشته شمسی)، کلاس و هنرجو در همان پرس‌وجو اعمال می‌شوند.
+	خروجی: [(attendance_id, date, student_name, class_name, cancel_reason), ...] از جدیدترین.
+	"""
+	keyword = (keyword or "").strip()
+	if not keyword:
+		return []
+	matched, params = text_match_sql("attendance", keyword, ("cancel_reason",))
+	conditions = [f"a.id IN ({matched})", "a.status = 'canceled'"]
+	params = list(params)
+	if date_from:
+		conditions.append("a.date >= ?")
+		params.append(date_from)
+	if date_to:
+		conditions.append("a.date <= ?")
+		params.append(date_to)
+	if class_id:
+		conditions.append("a.class_id = ?")
+		params.append(class_id)
+	if student_id:
+		conditions.append("a.student_id = ?")
+		params.append(student_id)
+	params.append(-1 if limit is None else int(limit))
+	with get_connection() as conn:
+		c = conn.cursor()
+		c.execute(f"""
+			SELECT a.id, a.date, s.name, c.name, a.cancel_reason
+			FROM attendance a
+			JOIN students s ON s.id = a.student_id
+			JOIN classes c ON c.id = a.class_id
+			WHERE {" AND ".join(conditions)}
+			ORDER BY a.date DESC, a.id DESC
+			LIMIT ?
+		""", params)
+		return c.fetchall()
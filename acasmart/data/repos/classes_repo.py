@@ -4,6 +4,11 @@ from acasmart.data.db import get_connection
 logger = logging.getLogger(__name__)
 
 
+def _invalidate_schedule_index():
+	from acasmart.data.repos.sessions_repo import invalidate_schedule_index  # avoid cycles
+	invalidate_schedule_index()
+
+
 def create_class(name, teacher_id, day, start_time, end_time, room, instrument):
 	with get_connection() as conn:
 		conn.execute(
@@ -39,6 +44,7 @@ def delete_class_by_id(class_id):
 	with get_connection() as conn:
 		conn.execute("DELETE FROM classes WHERE id=?", (class_id,))
 		conn.commit()
+	_invalidate_schedule_index()
 
 
 def is_class_has_sessions(class_id):
@@ -86,6 +92,7 @@ def update_class_by_id(class_id, name, teacher_id, day, start_time, end_time, ro
 			(name, teacher_id, instrument, day, start_time, end_time, room, class_id),
 		)
 		conn.commit()
+	_invalidate_schedule_index()  # روز/استادِ کلاس بازه‌های همهٔ ترم‌هایش را جابه‌جا می‌کند
 
 
 def fetch_classes_on_weekday(day_name):
@@ -119,25 +126,27 @@ def fetch_teachers_with_instruments():
 
 
 def does_teacher_have_time_conflict(teacher_id, day, start_time, end_time, exclude_class_id=None):
+	"""آیا استاد در همان روز کلاسی دارد که بازه‌اش با [start_time, end_time) هم‌پوشانی دارد؟
+
+	مقایسه بر حسب دقیقه است، نه رشتهٔ HH:mm (که "9:30" را بعد از "10:00" می‌گذاشت).
+	"""
+	from acasmart.data.repos.sessions_repo import _time_to_minutes  # shared HH:mm parser
+	new_start, new_end = _time_to_minutes(start_time), _time_to_minutes(end_time)
+	if new_start is None or new_end is None:
+		return False
 	with get_connection() as conn:
 		c = conn.cursor()
-		query = (
-			"""
-			SELECT COUNT(*) FROM classes
-			WHERE teacher_id = ?
-			  AND day = ?
-			  AND (
-			      (start_time < ? AND end_time > ?)
-			      OR (start_time >= ? AND start_time < ?)
-			  )
-			"""
-		)
-		params = [teacher_id, day, end_time, start_time, start_time, end_time]
+		query = "SELECT start_time, end_time FROM classes WHERE teacher_id = ? AND day = ?"
+		params = [teacher_id, day]
 		if exclude_class_id:
 			query += " AND id != ?"
 			params.append(exclude_class_id)
 		c.execute(query, params)
-		return c.fetchone()[0] > 0
+		for other_start, other_end in c.fetchall():
+			s, e = _time_to_minutes(other_start), _time_to_minutes(other_end)
+			if s is not None and e is not None and s < new_end and new_start < e:
+				return True
+	return False
 
 def get_day_and_time_for_class(class_id):
     with get_connection() as conn:
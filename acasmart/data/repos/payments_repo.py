@@ -1,5 +1,8 @@
 import logging
+from acasmart.core.schedule import ordinal_or_none
+from acasmart.core.fa_collation import normalize_for_search
 from acasmart.data.db import get_connection
+from acasmart.data.repos.search_repo import text_match_sql
 
 logger = logging.getLogger(__name__)
 
@@ -47,26 +50,19 @@ def insert_payment(student_id, class_id, term_id, amount, payment_date, payment_
 	with get_connection() as conn:
 		conn.execute(
 			"""
-			INSERT INTO payments (student_id, class_id, term_id, amount, payment_date, payment_type, description)
-			VALUES (?, ?, ?, ?, ?, ?, ?)
+			INSERT INTO payments
+				(student_id, class_id, term_id, amount, payment_date, payment_date_ord, payment_type, description)
+			VALUES (?, ?, ?, ?, ?, ?, ?, ?)
 			""",
-			(student_id, class_id, term_id, amount, payment_date, payment_type, description)
+			(student_id, class_id, term_id, amount, payment_date, ordinal_or_none(payment_date),
+			 payment_type, description)
 		)
 		conn.commit()
 
 
-def fetch_payments(student_id=None, class_id=None, date_from=None, date_to=None, term_id=None):
-	"""
-	دریافت لیست پرداخت‌ها با فیلترهای اختیاری.
-	"""
-	query = """
-		SELECT payments.id, students.name, classes.name, 
-			   payments.amount, payments.payment_date, payments.description, payments.payment_type,
-			   classes.id AS class_id
-		FROM payments
-		JOIN students ON payments.student_id = students.id
-		JOIN classes ON payments.class_id = classes.id
-	"""
+def _payment_filters(student_id=None, class_id=None, date_from=None, date_to=None, term_id=None,
+                     keyword=None, payment_type=None, min_amount=None, max_amount=None, student_name=None):
+	"""(شرط‌های WHERE, پارامترها) مشترکِ fetch_payments و fetch_payments_page."""
 	conditions = []
 	params = []
 
@@ -85,11 +81,56 @@ def fetch_payments(student_id=None, class_id=None, date_from=None, date_to=None,
 	if date_to:
 		conditions.append("payments.payment_date <= ?")
 		params.append(date_to)
-
+	if payment_type:
+		conditions.append("payments.payment_type = ?")
+		params.append(payment_type)
+	if min_amount is not None:
+		conditions.append("payments.amount >= ?")
+		params.append(min_amount)
+	if max_amount is not None:
+		conditions.append("payments.amount <= ?")
+		params.append(max_amount)
+	keyword = (keyword or "").strip()
+	if keyword:
+		matched, match_params = text_match_sql("payments", keyword, ("description",))
+		conditions.append(f"payments.id IN ({matched})")
+		params.extend(match_params)
+	student_name = normalize_for_search(student_name)
+	if student_name:
+		# فقط نام هنرجو (ستون name_norm ِ students_fts، مهاجرت v10)؛ کد ملی و تلفن نه
+		matched, match_params = text_match_sql("students", student_name, ("name_norm",))
+		conditions.append(f"payments.student_id IN ({matched})")
+		params.extend(match_params)
+	return conditions, params
+
+
+_PAYMENT_ROW_SQL = """
+	SELECT payments.id, students.name, classes.name,
+		   payments.amount, payments.payment_date, payments.description, payments.payment_type,
+		   classes.id AS class_id
+	FROM payments
+	JOIN students ON payments.student_id = students.id
+	JOIN classes ON payments.class_id = classes.id
+"""
+
+
+def fetch_payments(student_id=None, class_id=None, date_from=None, date_to=None, term_id=None,
+                   keyword=None, payment_type=None, min_amount=None, max_amount=None, student_name=None):
+	"""
+	دریافت لیست پرداخت‌ها با فیلترهای اختیاری (همهٔ ردیف‌ها؛ برای نمایش صفحه‌ای fetch_payments_page).
+	keyword: جست‌وجو در توضیحات از ایندکس payments_fts (مهاجرت v11)، در همان پرس‌وجوی فیلترها.
+	payment_type: 'tuition' / 'extra' یا None برای همه.
+	min_amount / max_amount: بازهٔ مبلغ (شامل دو سر). student_name: بخشی از نام هنرجو.
+	"""
+	conditions, params = _payment_filters(
+		student_id, class_id, date_from, date_to, term_id,
+		keyword, payment_type, min_amount, max_amount, student_name,
+	)
+	query = _PAYMENT_ROW_SQL
 	if conditions:
 		query += " WHERE " + " AND ".join(conditions)
 
-	query += " ORDER BY payments.payment_date DESC"
+	query += " ORDER BY payments.payment_date DESC, payments.id DESC"
 
 	with get_connection() as conn:
 		c = conn.cursor()
@@ -97,6 +138,47 @@ def fetch_payments(student_id=None, class_id=None, date_from=None, date_to=None,
 		return c.fetchall()
 
 
+def fetch_payments_page(page_size=100, after=None, with_totals=True, **filters):
+	"""
+	یک صفحه از پرداخت‌ها (همان فیلترهای fetch_payments) با صفحه‌بندی keyset.
+
+	ترتیب: payment_date DESC, id DESC. after کلیدِ آخرین ردیفِ صفحهٔ قبل است —
+	(payment_date, id)، همان next_cursor خروجیِ قبلی — و صفحهٔ بعد با یک جست‌وجوی ایندکسی
+	از همان نقطه ادامه می‌یابد (بدون OFFSET). with_totals: تعداد و جمع مبلغِ کلِ نتایج
+	(نه فقط این صفحه) هم با SQL حساب می‌شود؛ برای صفحه‌های بعدی لازم نیست.
+
+	خروجی: {"rows": [...], "next_cursor": (date, id) یا None, "total_count": n, "total_amount": x}
+	(در حالت with_totals=False دو کلیدِ آخر None هستند).
+	"""
+	conditions, params = _payment_filters(**filters)
+	page_conditions = list(conditions)
+	page_params = list(params)
+	if after is not None:
+		page_conditions.append("(payments.payment_date, payments.id) < (?, ?)")
+		page_params.extend(after)
+	query = _PAYMENT_ROW_SQL
+	if page_conditions:
+		query += " WHERE " + " AND ".join(page_conditions)
+	query += " ORDER BY payments.payment_date DESC, payments.id DESC LIMIT ?"
+	page_params.append(int(page_size) + 1)  # یک ردیفِ اضافه: آیا صفحهٔ بعدی هست؟
+
+	total_count = total_amount = None
+	with get_connection() as conn:
+		c = conn.cursor()
+		c.execute(query, tuple(page_params))
+		rows = c.fetchall()
+		if with_totals:
+			where = (" WHERE " + " AND ".join(conditions)) if conditions else ""
+			c.execute(f"SELECT COUNT(*), COALESCE(SUM(payments.amount), 0) FROM payments{where}", tuple(params))
+			total_count, total_amount = c.fetchone()
+
+	next_cursor = None
+	if len(rows) > page_size:
+		rows = rows[:page_size]
+		next_cursor = (rows[-1][4], rows[-1][0])
+	return {"rows": rows, "next_cursor": next_cursor, "total_count": total_count, "total_amount": total_amount}
+
+
 def get_total_paid_for_term(term_id, payment_type='tuition'):
 	"""
 	جمع مبلغ پرداختی برای یک ترم مشخص (پیش‌فرض فقط شهریه).
@@ -134,14 +216,13 @@ def get_terms_for_payment_management(student_id, class_id):
 				t.start_date,
 				t.end_date,
 				t.created_at,
-				COALESCE(SUM(CASE WHEN p.payment_type='tuition' THEN p.amount ELSE 0 END), 0) as paid_tuition,
-				COALESCE(SUM(CASE WHEN p.payment_type='extra' THEN p.amount ELSE 0 END), 0) as paid_extra,
-				COUNT(p.id) as payment_count,
+				COALESCE(ts.tuition_paid, 0) as paid_tuition,
+				COALESCE(ts.extra_paid, 0) as paid_extra,
+				COALESCE(ts.payment_count, 0) as payment_count,
 				COALESCE(t.tuition_fee, 0) as term_fee
 			FROM student_terms t
-			LEFT JOIN payments p ON t.id = p.term_id
+			LEFT JOIN term_stats ts ON ts.term_id = t.id
 			WHERE t.student_id = ? AND t.class_id = ?
-			GROUP BY t.id, t.start_date, t.end_date, t.created_at, t.tuition_fee
 			ORDER BY t.start_date DESC
 			""",
 			(student_id, class_id)
@@ -236,10 +317,11 @@ def update_payment_by_id(payment_id, amount, date, payment_type, description):
 		conn.execute(
 			"""
 			UPDATE payments
-			SET amount = ?, payment_date = ?, payment_type = ?, description = ?, updated_at = datetime('now','localtime')
+			SET amount = ?, payment_date = ?, payment_date_ord = ?, payment_type = ?, description = ?,
+			    updated_at = datetime('now','localtime')
 			WHERE id = ?
 			""",
-			(amount, date, payment_type, description, payment_id),
+			(amount, date, ordinal_or_none(date), payment_type, description, payment_id),
 		)
 		conn.commit()
 
@@ -285,4 +367,6 @@ def delete_term_if_no_history(student_id, class_id, term_id):
 
 	conn.commit()
 	conn.close()
+	from acasmart.data.repos.sessions_repo import mark_schedule_term_dirty  # avoid cycles
+	mark_schedule_term_dirty(term_id)
 	return True
@@ -26,7 +26,7 @@ def list_pricing_profiles():
 		c.execute("""
 			SELECT id, name, sessions_limit, tuition_fee, currency_unit, is_default
 			FROM pricing_profiles
-			ORDER BY is_default DESC, name COLLATE NOCASE
+			ORDER BY is_default DESC, name COLLATE FA
 		""")
 		return c.fetchall()
 
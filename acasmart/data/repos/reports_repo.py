@@ -15,8 +15,17 @@ def get_class_and_teacher_name(class_id):
         return c.fetchone() or ("—", "—")
 	
 def get_all_student_terms_with_financials():
+	return list(iter_student_terms_with_financials())
+
+
+def iter_student_terms_with_financials():
+	"""نسخهٔ استریمی: ترم‌ها را یکی‌یکی (همان dictها) از یک کوئریِ تجمیعی برمی‌گرداند.
+
+	مبالغ پرداختی و آخرین تاریخ پرداخت از شمارنده‌های term_stats (نگه‌داشته‌شده با تریگر)
+	خوانده می‌شوند، پس هر ترم فقط یک join است و payments پیمایش نمی‌شود.
+	"""
 	from acasmart.data.repos.settings_repo import get_setting
-	from acasmart.data.repos.payments_repo import get_total_paid_for_term
+	default_fee = None
 	with get_connection() as conn:
 		c = conn.cursor()
 		c.execute("""
@@ -30,33 +39,31 @@ def get_all_student_terms_with_financials():
 				t.start_date,
 				t.end_date,
 				tr.name as teacher_name,
-				COALESCE(t.tuition_fee, 0) as term_fee
+				COALESCE(t.tuition_fee, 0) as term_fee,
+				COALESCE(ts.tuition_paid, 0),
+				COALESCE(ts.extra_paid, 0),
+				ts.last_payment_date
 			FROM student_terms t
 			JOIN students s ON s.id = t.student_id
 			JOIN classes c   ON c.id = t.class_id
 			JOIN teachers tr ON c.teacher_id = tr.id
+			LEFT JOIN term_stats ts ON ts.term_id = t.id
 			ORDER BY t.start_date DESC
 		""")
-		terms = c.fetchall()
-
-		result = []
 		for (term_id, student_name, national_code, class_name, instrument,
-			 class_id, start_date, end_date, teacher_name, term_fee) in terms:
+			 class_id, start_date, end_date, teacher_name, term_fee,
+			 paid_tuition, paid_extra, last_payment_date) in c:
 
 			if not term_fee:
-				term_fee = int(get_setting("term_fee", get_setting("term_tuition", 6000000)))  # fallback
+				if default_fee is None:
+					default_fee = int(get_setting("term_fee", get_setting("term_tuition", 6000000)))  # fallback
+				term_fee = default_fee
 
-			paid_tuition = get_total_paid_for_term(term_id, 'tuition')
-			paid_extra   = get_total_paid_for_term(term_id, 'extra')
 			debt = term_fee - paid_tuition
 			status = "تسویه" if debt == 0 else "بدهکار" if debt > 0 else "خطا در داده‌ها"
 			term_status = "فعال" if end_date is None else "تکمیل شده"
 
-			# آخرین تاریخ پرداخت
-			c.execute("SELECT MAX(payment_date) FROM payments WHERE term_id = ?", (term_id,))
-			last_payment_date = c.fetchone()[0]
-
-			result.append({
+			yield {
 				"term_id": term_id,
 				"student_name": student_name,
 				"national_code": national_code,
@@ -74,16 +81,46 @@ def get_all_student_terms_with_financials():
 				"status": status,
 				"term_status": term_status,
 				"last_payment_date": last_payment_date
-			})
-	return result
+			}
+
+
+def get_attendance_report_rows(date_from=None, date_to=None, class_id=None):
+	"""ردیف‌های گزارش حضور و غیاب: هر ترم با dictِ {تاریخ: برچسبِ وضعیت}.
+
+	فیلترهای اختیاری در SQL اعمال می‌شوند: class_id، و بازهٔ تاریخ (شمسی "YYYY-MM-DD") که
+	هم ترم‌ها را به ترم‌های هم‌پوشان با بازه و هم رکوردهای حضور را به همان بازه محدود می‌کند.
+	حضورها با یک پیمایشِ مرتب (term_id, date) خوانده و در یک گذر گروه‌بندی می‌شوند.
+	"""
+	conditions = []
+	params = []
+	if class_id:
+		conditions.append("t.class_id = ?")
+		params.append(class_id)
+	if date_to:
+		conditions.append("t.start_date <= ?")
+		params.append(date_to)
+	if date_from:
+		conditions.append("(t.end_date IS NULL OR t.end_date >= ?)")
+		params.append(date_from)
+	term_where = (" WHERE " + " AND ".join(conditions)) if conditions else ""
 
+	att_conditions = list(conditions)
+	att_params = list(params)
+	if date_from:
+		att_conditions.append("a.date >= ?")
+		att_params.append(date_from)
+	if date_to:
+		att_conditions.append("a.date <= ?")
+		att_params.append(date_to)
+	att_where = (" WHERE " + " AND ".join(att_conditions)) if att_conditions else ""
+
+	_label = {"present": "حاضر", "absent": "غایب", "canceled": "لغو"}
 
-def get_attendance_report_rows():
 	with get_connection() as conn:
 		c = conn.cursor()
 
 		# مرحله ۱: گرفتن لیست ترم‌ها همراه با اطلاعات مرتبط
-		c.execute("""
+		c.execute(f"""
 			SELECT 
 				t.id as term_id,
 				s.name as student_name,
@@ -97,127 +134,136 @@ def get_attendance_report_rows():
 			JOIN students s ON s.id = t.student_id
 			JOIN classes cls ON cls.id = t.class_id
 			JOIN teachers tr ON cls.teacher_id = tr.id
+			{term_where}
 			ORDER BY t.start_date ASC
-		""")
+		""", params)
 		terms = c.fetchall()
 
-		result = []
+		# مرحله ۲: حضور و غیابِ همهٔ ترم‌ها در یک پیمایش، گروه‌بندی‌شده بر اساس ترم
+		attendance_by_term = {}
+		c.execute(f"""
+			SELECT a.term_id, a.date, a.status
+			FROM attendance a
+			JOIN student_terms t ON t.id = a.term_id
+			{att_where}
+			ORDER BY a.term_id, a.date ASC
+		""", att_params)
+		current_id, current = None, None
+		for term_id, date, status in c:
+			if term_id != current_id:
+				current_id = term_id
+				current = attendance_by_term[term_id] = {}
+			current[date] = _label.get(status, "غایب")
 
-		# مرحله ۲: گرفتن حضور و غیاب هر ترم
-		for (term_id, student_name, start_date, end_date,
-			 class_id, class_name, instrument, teacher_name) in terms:
-
-			c.execute("""
-				SELECT date, status
-				FROM attendance
-				WHERE term_id = ?
-				ORDER BY date ASC
-			""", (term_id,))
-			attendance_rows = c.fetchall()
-
-			_label = {"present": "حاضر", "absent": "غایب", "canceled": "لغو"}
-			attendance_dict = {
-				row[0]: _label.get(row[1], "غایب")
-				for row in attendance_rows
-			}
-
-			result.append({
-				"student_name": student_name,
-				"teacher_name": teacher_name,
-				"class_id": class_id,
-				"class_name": class_name,
-				"instrument": instrument,
-				"start_date": start_date,
-				"end_date": end_date,
-				"attendance": attendance_dict
-			})
-
-		return result
-
-
-def get_student_term_summary_rows(student_name='', teacher_name='', class_name='',class_id='',instrument_name='', day='', date_from='', date_to='',term_status=''):
-	conn = get_connection()
-	cursor = conn.cursor()
+	result = []
+	for (term_id, student_name, start_date, end_date,
+		 class_id, class_name, instrument, teacher_name) in terms:
+		result.append({
+			"student_name": student_name,
+			"teacher_name": teacher_name,
+			"class_id": class_id,
+			"class_name": class_name,
+			"instrument": instrument,
+			"start_date": start_date,
+			"end_date": end_date,
+			"attendance": attendance_by_term.get(term_id, {})
+		})
+	return result
 
-	query = """
-		SELECT
-			st.id AS term_id,
-			s.id AS student_id,
-			s.name AS student_name,
-			s.national_code,
-			c.id AS class_id,
-			c.name AS class_name,
-			t.name AS teacher_name,
-			c.instrument,
-			c.day,
-			c.start_time,
-			st.start_date,
-			st.end_date
-		FROM student_terms st
-		JOIN students s ON s.id = st.student_id
-		JOIN classes c ON c.id = st.class_id
-		JOIN teachers t ON t.id = c.teacher_id
-		WHERE 1=1
-	"""
 
+def _student_term_summary_filters(student_name='', teacher_name='', class_name='', class_id='',
+								  instrument_name='', day='', date_from='', date_to='', term_status=''):
+	"""شرط‌های WHERE و پارامترهای مشترکِ گزارش کلی هنرجویان."""
+	conditions = []
 	params = []
 
 	if student_name:
-		query += " AND s.name LIKE ?"
+		conditions.append("s.name LIKE ?")
 		params.append(f"%{student_name}%")
 	if teacher_name:
-		query += " AND t.name LIKE ?"
+		conditions.append("t.name LIKE ?")
 		params.append(f"%{teacher_name}%")
 	if class_id:
-		query += " AND c.id = ?"
+		conditions.append("c.id = ?")
 		params.append(class_id)
 	elif class_name:
-		query += " AND c.name LIKE ?"
+		conditions.append("c.name LIKE ?")
 		params.append(f"%{class_name}%")
 	if instrument_name:
-		query += " AND c.instrument LIKE ?"
+		conditions.append("c.instrument LIKE ?")
 		params.append(f"%{instrument_name}%")
 	if day:
-		query += " AND c.day = ?"
+		conditions.append("c.day = ?")
 		params.append(day)
 	if date_from:
-		query += " AND st.start_date >= ?"
+		conditions.append("st.start_date >= ?")
 		params.append(date_from)
 	if date_to:
-		query += " AND st.start_date <= ?"
+		conditions.append("st.start_date <= ?")
 		params.append(date_to)
 	if term_status == "active":
-		query += " AND st.end_date IS NULL"
+		conditions.append("st.end_date IS NULL")
 	elif term_status == "finished":
-		query += " AND st.end_date IS NOT NULL"
+		conditions.append("st.end_date IS NOT NULL")
+	return conditions, params
+
+
+_SUMMARY_FROM = """
+	FROM student_terms st
+	JOIN students s ON s.id = st.student_id
+	JOIN classes c ON c.id = st.class_id
+	JOIN teachers t ON t.id = c.teacher_id
+"""
 
-	query += " ORDER BY st.start_date DESC"
-	cursor.execute(query, params)
-	terms = cursor.fetchall()
 
-	# گرفتن تنظیم سقف جلسات ترم
-	cursor.execute("SELECT value FROM settings WHERE key = 'term_session_count'")
-	row = cursor.fetchone()
-	session_limit = int(row[0]) if row else 12
+def get_student_term_summary_page(limit=200, after=None, **filters):
+	"""یک صفحه از گزارش کلی هنرجویان با صفحه‌بندیِ keyset.
+
+	ترتیب: (start_date DESC, term_id DESC). after همان کلیدِ آخرین ردیفِ صفحهٔ قبل است
+	(None برای صفحهٔ اول). شمارش حاضر/غایب از term_stats در همان کوئری اصلی join می‌شود. filters همان پارامترهای get_student_term_summary_rows است.
+	خروجی: (rows, next_after)؛ next_after برای صفحهٔ آخر None است.
+	"""
+	conditions, params = _student_term_summary_filters(**filters)
+	if after is not None:
+		conditions.append("(st.start_date < ? OR (st.start_date = ? AND st.id < ?))")
+		params.extend([after[0], after[0], after[1]])
+
+	query = """
+		SELECT
+			st.id AS term_id,
+			s.name AS student_name,
+			s.national_code,
+			c.id AS class_id,
+			c.name AS class_name,
+			t.name AS teacher_name,
+			c.instrument,
+			c.day,
+			c.start_time,
+			st.start_date,
+			st.end_date,
+			COALESCE(ts.held_count, 0),
+			COALESCE(ts.present_count, 0)
+	""" + _SUMMARY_FROM + """
+		LEFT JOIN term_stats ts ON ts.term_id = st.id
+	"""
+	if conditions:
+		query += " WHERE " + " AND ".join(conditions)
+	query += " ORDER BY st.start_date DESC, st.id DESC"
+	if limit is not None:
+		query += " LIMIT ?"
+		params.append(int(limit))
+
+	with get_connection() as conn:
+		terms = conn.execute(query, params).fetchall()
 
 	result = []
 	for term in terms:
 		(
-			term_id, student_id, student_name, national_code,class_id,
+			term_id, student_name, national_code, class_id,
 			class_name, teacher_name, instrument, day, start_time,
-			start_date, end_date
+			start_date, end_date, total_sessions, present_sessions
 		) = term
-
-		# شمارش جلسات
-		cursor.execute("""
-			SELECT SUM(CASE WHEN status != 'canceled' THEN 1 ELSE 0 END),
-				   SUM(CASE WHEN status = 'present' THEN 1 ELSE 0 END)
-			FROM attendance
-			WHERE term_id = ?
-		""", (term_id,))
-		session_row = cursor.fetchone()
-		total_sessions = session_row[0] or 0   # مصرف‌شده = حاضر + غایب (بدون لغوشده)
-		present_sessions = session_row[1] or 0
+		# مصرف‌شده = حاضر + غایب (بدون لغوشده)
 		absent_sessions = total_sessions - present_sessions
 
 		result.append([
@@ -237,8 +283,30 @@ def get_student_term_summary_rows(student_name='', teacher_name='', class_name='
 			round((present_sessions / total_sessions) * 100, 1) if total_sessions else 0
 		])
 
-	conn.close()
-	return result
+	next_after = None
+	if limit is not None and len(terms) == int(limit):
+		next_after = (terms[-1][9], terms[-1][0])
+	return result, next_after
+
+
+def count_student_term_summary_rows(**filters):
+	"""تعداد کل ردیف‌های گزارش کلی هنرجویان با همان فیلترها (برای نمایش «n از کل»)."""
+	conditions, params = _student_term_summary_filters(**filters)
+	query = "SELECT COUNT(*)" + _SUMMARY_FROM
+	if conditions:
+		query += " WHERE " + " AND ".join(conditions)
+	with get_connection() as conn:
+		return conn.execute(query, params).fetchone()[0]
+
+
+def get_student_term_summary_rows(student_name='', teacher_name='', class_name='',class_id='',instrument_name='', day='', date_from='', date_to='',term_status=''):
+	rows, _ = get_student_term_summary_page(
+		limit=None,
+		student_name=student_name, teacher_name=teacher_name, class_name=class_name,
+		class_id=class_id, instrument_name=instrument_name, day=day,
+		date_from=date_from, date_to=date_to, term_status=term_status,
+	)
+	return rows
 
 
 def fetch_all_contacts():
@@ -287,7 +355,7 @@ def get_teacher_summary_rows():
 				FROM classes
 				GROUP BY teacher_id
 			) days ON t.id = days.teacher_id
-			ORDER BY t.name COLLATE NOCASE
+			ORDER BY t.name COLLATE FA
 		""")
 		result = []
 		for row in c.fetchall():
@@ -0,0 +1,208 @@
+"""جست‌وجوی هنرجو/استاد روی ایندکس FTS5 (مهاجرت v10).
+
+متنِ جست‌وجو با همان normalize_for_search ستون name_norm نرمال می‌شود. پرس‌وجوی سه
+حرف به بالا با MATCH روی جدول‌های trigramِ students_fts / teachers_fts اجرا می‌شود (بدون
+اسکن جدول)؛ پرس‌وجوی کوتاه‌تر — که trigram نمی‌تواند پیدایش کند — و SQLite ِ بدون tokenizer
+trigram (جدول FTS ساخته نشده) به LIKE روی همان ستون‌ها برمی‌گردد. خروجی‌ها ردیف‌های آمادهٔ
+نمایش‌اند به ترتیب name COLLATE FA؛ limit=None یعنی بدون سقف (پنجره‌ها DISPLAY_LIMIT می‌دهند).
+text_match_sql همین الگو را برای ایندکس‌های متنی دیگر (توضیحات پرداخت، دلیل لغو — v11) می‌سازد.
+"""
+import logging
+from acasmart.core.fa_collation import normalize_for_search, nd
+from acasmart.data.db import get_connection, pool_generation
+
+logger = logging.getLogger(__name__)
+
+# کمترین طول پرس‌وجو برای tokenizer سه‌حرفیِ FTS5
+_TRIGRAM_MIN = 3
+# سقف ردیف‌های نتیجهٔ جست‌وجو در فهرست‌های رابط کاربری
+DISPLAY_LIMIT = 200
+
+_fts_tables = None
+_fts_generation = -1
+
+
+def _has_fts(table):
+	"""آیا {table}_fts ساخته شده است؟ (بدون tokenizer trigram مهاجرت‌های v10/v11 آن را نمی‌سازند)
+
+	نتیجه تا close_pool ِ بعدی (بازگردانی پشتیبان، مهاجرت، تعویض فایل) نگه داشته می‌شود.
+	"""
+	global _fts_tables, _fts_generation
+	if _fts_tables is None or _fts_generation != pool_generation():
+		generation = pool_generation()
+		with get_connection() as conn:
+			_fts_tables = {
+				r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+				if r[0].endswith("_fts")
+			}
+		_fts_generation = generation
+	return f"{table}_fts" in _fts_tables
+
+
+def _fts_phrase(query):
+	"""پرس‌وجو به‌صورت یک عبارت FTS5 (نقل‌قول دوبل escape می‌شود؛ عملگرها بی‌اثر)."""
+	return '"' + query.replace('"', '""') + '"'
+
+
+def _like_pattern(query):
+	escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+	return f"%{escaped}%"
+
+
+_PEOPLE_COLUMNS = ("name_norm", "national_code", "phone")
+
+
+def text_match_sql(table, query, like_columns):
+	"""(زیرپرس‌وجو, پارامترها) برای id سطرهای table که متنشان query را دارد.
+
+	query باید از قبل نرمال شده باشد. سه حرف به بالا و وجود {table}_fts: MATCH روی آن
+	(rowid = id)؛ وگرنه LIKE روی like_columns. MATCH هم با فیلتر ستون به همان like_columns
+	محدود می‌شود تا هر دو مسیر همان ستون‌ها را بگردند (مثلاً فقط name_norm از students_fts).
+	پارامترها جای‌نگهدار ? هستند تا در پرس‌وجوهای موقعیتیِ ریپوهای دیگر (مثل payments_repo)
+	هم جا بیفتند.
+	"""
+	if len(query) >= _TRIGRAM_MIN and _has_fts(table):
+		match = "{%s} : %s" % (" ".join(like_columns), _fts_phrase(query))
+		return f"SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH ?", (match,)
+	where = " OR ".join(f"{col} LIKE ? ESCAPE '\\'" for col in like_columns)
+	return f"SELECT id FROM {table} WHERE {where}", (_like_pattern(query),) * len(like_columns)
+
+
+def _limit(limit):
+	return -1 if limit is None else int(limit)
+
+
+def _student_match_sql(query, include_teacher):
+	"""زیرپرس‌وجوی id هنرجویانِ منطبق؛ include_teacher: هنرجویانِ کلاس‌های استادانِ منطبق هم."""
+	matched, params = text_match_sql("students", query, _PEOPLE_COLUMNS)
+	if include_teacher:
+		teachers_sql, teachers_params = text_match_sql("teachers", query, _PEOPLE_COLUMNS)
+		matched += f"""
+			UNION
+			SELECT st.student_id
+			FROM student_terms st
+			JOIN classes c ON c.id = st.class_id
+			WHERE c.teacher_id IN ({teachers_sql})
+		"""
+		params += teachers_params
+	return matched, params
+
+
+_STUDENT_ORDER = {
+	"name": "name COLLATE FA, national_code",
+	"age": "birth_date DESC, name COLLATE FA, national_code",
+	"national_code": "national_code, name COLLATE FA",
+}
+
+
+def search_students(text, limit=None, gender=None, national_code=None, order="name"):
+	"""هنرجویانی که نام/کد ملی/تلفنشان شامل text است؛ هم‌شکل fetch_students:
+	(id, name, gender, birth_date, national_code).
+
+	gender: فقط همین جنسیت (None = همه). national_code: بخشی از کد ملی. order: 'name'،
+	'age' (کم‌سن‌ترین اول) یا 'national_code'؛ مرتب‌سازی پیش از limit در SQL انجام می‌شود.
+	"""
+	conditions, params = [], ()
+	query = normalize_for_search(text)
+	if query:
+		matched, params = _student_match_sql(query, False)
+		conditions.append(f"id IN ({matched})")
+	if gender:
+		conditions.append("gender = ?")
+		params += (gender,)
+	national_code = nd(national_code).strip()
+	if national_code:
+		conditions.append("national_code LIKE ? ESCAPE '\\'")
+		params += (_like_pattern(national_code),)
+	where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+	with get_connection() as conn:
+		return conn.execute(
+			f"""
+			SELECT id, name, gender, birth_date, national_code FROM students
+			{where}
+			ORDER BY {_STUDENT_ORDER[order]}
+			LIMIT ?
+			""",
+			params + (_limit(limit),),
+		).fetchall()
+
+
+def search_students_with_teachers(text, limit=None):
+	"""هنرجویانی که نام/کد ملی/تلفن خودشان یا استادشان شامل text است؛ هم‌شکل
+	fetch_students_with_teachers: (id, national_code, name, teachers)."""
+	query = normalize_for_search(text)
+	where, params = "", ()
+	if query:
+		matched, params = _student_match_sql(query, True)
+		where = f"WHERE s.id IN ({matched})"
+	with get_connection() as conn:
+		return conn.execute(
+			f"""
+			SELECT s.id, s.national_code, s.name, COALESCE(GROUP_CONCAT(DISTINCT t.name), '—')
+			FROM students s
+			LEFT JOIN student_terms st ON st.student_id = s.id
+			LEFT JOIN classes c ON c.id = st.class_id
+			LEFT JOIN teachers t ON t.id = c.teacher_id
+			{where}
+			GROUP BY s.id
+			ORDER BY s.name COLLATE FA, s.national_code
+			LIMIT ?
+			""",
+			params + (_limit(limit),),
+		).fetchall()
+
+
+def search_teachers(text, limit=None):
+	"""استادانی که نام/کد ملی/تلفن یا یکی از سازهایشان شامل text است؛ هم‌شکل fetch_teachers: (id, name).
+
+	سازها (teacher_instruments) چند ده نام‌اند؛ همان‌ها در پایتون نرمال و مقایسه می‌شوند.
+	"""
+	query = normalize_for_search(text)
+	where, params = "", ()
+	with get_connection() as conn:
+		if query:
+			matched, params = text_match_sql("teachers", query, _PEOPLE_COLUMNS)
+			instruments = [
+				r[0] for r in conn.execute("SELECT DISTINCT instrument FROM teacher_instruments")
+				if query in normalize_for_search(r[0])
+			]
+			where = f"WHERE id IN ({matched})"
+			if instruments:
+				marks = ",".join("?" * len(instruments))
+				where += f" OR id IN (SELECT teacher_id FROM teacher_instruments WHERE instrument IN ({marks}))"
+				params += tuple(instruments)
+		return conn.execute(
+			f"""
+			SELECT id, name FROM teachers
+			{where}
+			ORDER BY name COLLATE FA, id
+			LIMIT ?
+			""",
+			params + (_limit(limit),),
+		).fetchall()
+
+
+def search_contacts(text, limit=None):
+	"""ردیف‌های دفترچه تلفن (name, national_code, phone, role) منطبق با text؛ هم‌شکل fetch_all_contacts."""
+	query = normalize_for_search(text)
+	where_s = where_t = ""
+	params = ()
+	if query:
+		students_sql, students_params = text_match_sql("students", query, _PEOPLE_COLUMNS)
+		teachers_sql, teachers_params = text_match_sql("teachers", query, _PEOPLE_COLUMNS)
+		where_s = f"WHERE id IN ({students_sql})"
+		where_t = f"WHERE id IN ({teachers_sql})"
+		params = students_params + teachers_params
+	with get_connection() as conn:
+		return conn.execute(
+			f"""
+			SELECT name, national_code, phone, role FROM (
+				SELECT name, national_code, phone, 'هنرجو' AS role FROM students {where_s}
+				UNION ALL
+				SELECT name, national_code, phone, 'استاد' AS role FROM teachers {where_t}
+			)
+			ORDER BY name COLLATE FA, national_code
+			LIMIT ?
+			""",
+			params + (_limit(limit),),
+		).fetchall()
@@ -5,7 +5,11 @@ weekly schedule (ADR-0002). This module now holds enrollment creation, the compu
 attendance-page listing, and schedule-based conflict detection — all over student_terms.
 The module/filename is kept for import stability.
 """
-from acasmart.data.db import get_connection
+import json
+import threading
+
+from acasmart.core.intervals import IntervalIndex, free_starts, merge_intervals
+from acasmart.data.db import get_connection, pool_generation
 
 
 def fetch_enrollments_for_class(class_id, include_completed=False):
@@ -20,16 +24,17 @@ def fetch_enrollments_for_class(class_id, include_completed=False):
 		query = """
 			SELECT st.id, st.student_id, s.name, st.start_date, st.start_time,
 			       COALESCE(st.lesson_duration, 30), COALESCE(st.sessions_limit, 0),
-			       (SELECT COUNT(*) FROM attendance a WHERE a.term_id = st.id AND a.status != 'canceled'),
+			       COALESCE(ts.held_count, 0),
 			       st.end_date
 			FROM student_terms st
 			JOIN students s ON s.id = st.student_id
+			LEFT JOIN term_stats ts ON ts.term_id = st.id
 			WHERE st.class_id = ?
 		"""
 		params = [class_id]
 		if not include_completed:
 			query += " AND st.end_date IS NULL"
-		query += " ORDER BY st.start_time, s.name COLLATE NOCASE"
+		query += " ORDER BY st.start_time, s.name COLLATE FA"
 		c.execute(query, params)
 		return c.fetchall()
 
@@ -59,39 +64,133 @@ def fetch_scheduled_students_for_class_on_date(class_id, selected_date, include_
 	With include_completed=True, completed terms are included too (for editing past dates).
 	Returns rows: (sid, name, teacher, start_time, term_id).
 	"""
-	from acasmart.core.schedule import is_weekly_occurrence
+	return [
+		(r["student_id"], r["name"], r["teacher"], r["start_time"], r["term_id"])
+		for r in fetch_attendance_roster(class_id, selected_date, include_completed)
+	]
+
+
+def fetch_attendance_roster(class_id, selected_date, include_completed=False):
+	"""Model-B: the whole attendance page for a class on a date, in one SQL round trip.
+
+	Same roster rule as fetch_scheduled_students_for_class_on_date, but each row also carries
+	what the page shows per student, so the page costs a constant number of queries
+	regardless of class size. Returns dicts sorted by (start_time, name) with keys:
+	student_id, name, teacher, start_time, term_id, term_limit (sessions_limit, falling back
+	to the term_session_count setting), held_count (present + absent), status (None /
+	'present' / 'absent' / 'canceled' on selected_date), cancel_reason, renew_sms_sent.
+	"""
+	from acasmart.core.schedule import to_ordinal
+	# The weekly-occurrence rule runs in SQL over the day ordinals (migration v8):
+	# (date - start) % 7 = 0 with room left (held < limit), or a record already on the date.
+	# idx_terms_class_start_ord bounds the scan to the class's terms started by the date.
+	query = """
+		SELECT st.id, st.student_id, s.name, t.name, st.start_time,
+		       st.sessions_limit,
+		       COALESCE((SELECT CAST(value AS INTEGER) FROM settings
+		                 WHERE key = 'term_session_count'), 12),
+		       COALESCE(ts.held_count, 0), a.status, a.cancel_reason,
+		       EXISTS (SELECT 1 FROM sms_notifications n
+		               WHERE n.student_id = st.student_id AND n.term_id = st.id)
+		FROM student_terms st
+		JOIN students s ON s.id = st.student_id
+		JOIN classes c2 ON st.class_id = c2.id
+		JOIN teachers t ON c2.teacher_id = t.id
+		LEFT JOIN term_stats ts ON ts.term_id = st.id
+		LEFT JOIN attendance a ON a.term_id = st.id AND a.date = :date
+		WHERE st.class_id = :class_id AND st.start_date_ord <= :day
+		  AND (a.term_id IS NOT NULL
+		       OR ((:day - st.start_date_ord) % 7 = 0
+		           AND COALESCE(ts.held_count, 0) < COALESCE(st.sessions_limit, 0)))
+	"""
+	if not include_completed:
+		query += " AND st.end_date IS NULL"
+	else:
+		# a completed term can only show up on a date after its end through a record
+		query += " AND (st.end_date_ord IS NULL OR st.end_date_ord >= :day OR a.term_id IS NOT NULL)"
+	params = {"class_id": class_id, "date": selected_date, "day": to_ordinal(selected_date)}
+	with get_connection() as conn:
+		rows = conn.execute(query, params).fetchall()
+
+	result = []
+	for (term_id, sid, sname, tname, start_time, raw_limit, default_limit,
+		 held, status, cancel_reason, sms_sent) in rows:
+		term_limit = int(raw_limit if raw_limit is not None else default_limit) or 12
+		result.append({
+			"student_id": sid,
+			"name": sname,
+			"teacher": tname,
+			"start_time": start_time,
+			"term_id": term_id,
+			"term_limit": term_limit,
+			"held_count": held,
+			"status": status,
+			"cancel_reason": cancel_reason,
+			"renew_sms_sent": bool(sms_sent),
+		})
+
+	result.sort(key=lambda r: (str(r["start_time"]), str(r["name"])))
+	return result
+
+
+def fetch_timetable(date_from, date_to, class_id=None, teacher_id=None, student_id=None):
+	"""Model-B: every lesson of every term in the Shamsi range [date_from, date_to], in one batch.
+
+	Terms overlapping the range (active, or completed on/after date_from) and all their attendance
+	(every present/absent record counts toward the limit) are read in two queries and expanded
+	by core.schedule.expand_timetable.
+	Returns (timetable, terms): the columnar timetable (date_ord, term_id, seq, status) and
+	{term_id: dict(student_id, student, teacher_id, teacher, class_id, class_name, day,
+	start_time, lesson_duration, sessions_limit)} for labelling it.
+	"""
+	from acasmart.core.schedule import expand_timetable, to_ordinal
+	where = """
+		WHERE st.start_date_ord <= :hi AND (st.end_date_ord IS NULL OR st.end_date_ord >= :lo)
+	"""
+	params = {"lo": to_ordinal(date_from), "hi": to_ordinal(date_to)}
+	for column, value in (("st.class_id", class_id), ("cl.teacher_id", teacher_id),
+						  ("st.student_id", student_id)):
+		if value is not None:
+			name = column.split(".")[1]
+			where += f" AND {column} = :{name}"
+			params[name] = value
 	with get_connection() as conn:
 		c = conn.cursor()
-		c.execute("""
-			SELECT st.id, st.student_id, s.name, t.name, st.start_time, st.start_date,
-			       st.end_date, COALESCE(st.sessions_limit, 0)
+		c.execute(f"""
+			SELECT st.id, st.student_id, s.name, cl.teacher_id, t.name, cl.id, cl.name, cl.day,
+			       st.start_time, COALESCE(st.lesson_duration, 30), st.start_date_ord,
+			       COALESCE(st.sessions_limit,
+			                (SELECT CAST(value AS INTEGER) FROM settings WHERE key = 'term_session_count'),
+			                12)
 			FROM student_terms st
+			JOIN classes cl ON cl.id = st.class_id
 			JOIN students s ON s.id = st.student_id
-			JOIN classes c2 ON st.class_id = c2.id
-			JOIN teachers t ON c2.teacher_id = t.id
-			WHERE st.class_id = ? AND st.start_date <= ?
-		""", (class_id, selected_date))
-		rows = c.fetchall()
-
-		result = []
-		for term_id, sid, sname, tname, start_time, start_date, end_date, limit in rows:
-			if end_date is not None and not include_completed:
-				continue
-			c.execute("""
-				SELECT
-					SUM(CASE WHEN status != 'canceled' THEN 1 ELSE 0 END),
-					SUM(CASE WHEN date = ? THEN 1 ELSE 0 END)
-				FROM attendance WHERE term_id = ?
-			""", (selected_date, term_id))
-			hrow = c.fetchone()
-			held = hrow[0] or 0
-			has_record = (hrow[1] or 0) > 0
-			is_occ = is_weekly_occurrence(start_date, selected_date) and held < int(limit or 0)
-			if has_record or is_occ:
-				result.append((sid, sname, tname, start_time, term_id))
-
-		result.sort(key=lambda r: (str(r[3]), str(r[1])))
-		return result
+			JOIN teachers t ON t.id = cl.teacher_id
+			{where}
+		""", params)
+		term_rows = c.fetchall()
+		c.execute(f"""
+			SELECT a.term_id, a.date_ord, a.status
+			FROM attendance a
+			JOIN student_terms st ON st.id = a.term_id
+			JOIN classes cl ON cl.id = st.class_id
+			{where}
+		""", params)
+		records = c.fetchall()
+
+	terms = {}
+	for (term_id, sid, sname, tid, tname, cid, cname, day,
+		 start_time, duration, start_ord, limit) in term_rows:
+		terms[term_id] = {
+			"student_id": sid, "student": sname, "teacher_id": tid, "teacher": tname,
+			"class_id": cid, "class_name": cname, "day": day, "start_time": start_time,
+			"lesson_duration": duration, "sessions_limit": limit, "start_date_ord": start_ord,
+		}
+	timetable = expand_timetable(
+		[(term_id, info["start_date_ord"], info["sessions_limit"]) for term_id, info in terms.items()],
+		records, params["lo"], params["hi"],
+	)
+	return timetable, terms
 
 
 def _time_to_minutes(t):
@@ -106,66 +205,199 @@ def _time_to_minutes(t):
 		return None
 
 
-def _intervals_overlap(start1, dur1, start2, dur2):
-	"""آیا دو بازهٔ [start, start+dur) هم‌پوشانی دارند؟"""
-	if start1 is None or start2 is None:
-		return False
-	return start1 < (start2 + dur2) and start2 < (start1 + dur1)
+# ---------------------------------------------------------------------------
+# In-memory interval index of active weekly slots (teacher, weekday) / (student, weekday).
+# Built once from student_terms, then kept current: term-level changes (enrollment,
+# completion/reactivation, term delete) mark the term dirty and it is re-read on the next
+# query — i.e. after its transaction has committed; coarse changes (class edit/delete,
+# student delete) and a restored DB (pool generation) rebuild it.
+# ---------------------------------------------------------------------------
+_index_lock = threading.Lock()
+_index = None            # {"teacher": IntervalIndex, "student": IntervalIndex}
+_index_generation = None
+_index_dirty = set()
+
+_SLOT_SQL = """
+	SELECT st.id, st.student_id, cl.teacher_id, cl.day, st.start_time,
+	       COALESCE(st.lesson_duration, 30)
+	FROM student_terms st JOIN classes cl ON cl.id = st.class_id
+	WHERE st.end_date IS NULL
+"""
+
+
+def _index_slot(index, row):
+	term_id, student_id, teacher_id, day, start_time, duration = row
+	start = _time_to_minutes(start_time)
+	if start is None:
+		return  # زمانِ نامعتبر با هیچ بازه‌ای تداخل ندارد (مثل قبل)
+	end = start + int(duration or 30)
+	index["teacher"].add((teacher_id, day), start, end, term_id)
+	index["student"].add((student_id, day), start, end, term_id)
+
+
+def _schedule_index():
+	"""The current index (caller holds _index_lock)."""
+	global _index, _index_generation
+	if _index is None or _index_generation != pool_generation():
+		index = {"teacher": IntervalIndex(), "student": IntervalIndex()}
+		with get_connection() as conn:
+			for row in conn.execute(_SLOT_SQL):
+				_index_slot(index, row)
+		_index, _index_generation = index, pool_generation()
+		_index_dirty.clear()
+	elif _index_dirty:
+		term_ids = list(_index_dirty)
+		_index_dirty.clear()
+		for sub in _index.values():
+			for term_id in term_ids:
+				sub.discard(term_id)
+		placeholders = ",".join("?" * len(term_ids))
+		with get_connection() as conn:
+			for row in conn.execute(_SLOT_SQL + f" AND st.id IN ({placeholders})", term_ids):
+				_index_slot(_index, row)
+	return _index
+
+
+def mark_schedule_term_dirty(term_id):
+	"""Enrollment/completion/delete of one term: re-read it into the index on next use."""
+	with _index_lock:
+		if _index is not None and term_id is not None:
+			_index_dirty.add(term_id)
+
+
+def invalidate_schedule_index():
+	"""Class/teacher/student edits that move or drop many slots: rebuild on next use."""
+	global _index
+	with _index_lock:
+		_index = None
+		_index_dirty.clear()
+
+
+def find_schedule_overlaps(kind, owner_id, day, start_time, duration=30, exclude_term_id=None):
+	"""term_idهای فعالی که بازهٔ هفتگی‌شان با این بازه هم‌پوشانی دارد.
+
+	kind: 'teacher' یا 'student'؛ owner_id: شناسهٔ استاد/هنرجو؛ day: روزِ کلاس (class.day).
+	"""
+	start = _time_to_minutes(start_time)
+	if start is None:
+		return []
+	with _index_lock:
+		return _schedule_index()[kind].overlapping(
+			(owner_id, day), start, start + int(duration or 30), exclude=exclude_term_id
+		)
+
+
+def schedule_conflict_pairs():
+	"""Bulk pass over the index: list of (kind, (owner_id, day), term_a, term_b) overlaps."""
+	with _index_lock:
+		index = _schedule_index()
+		return [
+			(kind, key, a, b)
+			for kind in ("teacher", "student")
+			for key, a, b in index[kind].overlapping_pairs()
+		]
+
+
+def schedule_index_size():
+	"""Number of active terms with a valid weekly slot in the index."""
+	with _index_lock:
+		return len(_schedule_index()["student"])
+
+
+# پنجرهٔ پیش‌فرضِ روز وقتی ساعتِ شروع/پایانِ کلاس ثبت نشده است
+DEFAULT_DAY_WINDOW = ("08:00", "22:00")
+
+
+def find_free_slots(class_id, student_id=None, duration=30, window=None, step=15):
+	"""زمان‌های شروعِ آزاد ("HH:mm") برای یک جلسهٔ هفتگیِ جدید در این کلاس.
+
+	بازه‌های مشغولِ استادِ کلاس (و در صورتِ دادنِ student_id، هنرجو) در روزِ کلاس از
+	ایندکسِ برنامه در یک گذر ادغام می‌شوند و هر شروعی روی گامِ step دقیقه که جلسهٔ
+	duration دقیقه‌ای را کامل داخلِ پنجره و بیرون از بازه‌های مشغول جا بدهد برگردانده
+	می‌شود. پنجره به‌طور پیش‌فرض ساعتِ شروع تا پایانِ کلاس است.
+	"""
+	with get_connection() as conn:
+		row = conn.execute(
+			"SELECT teacher_id, day, start_time, end_time FROM classes WHERE id = ?", (class_id,)
+		).fetchone()
+	if not row:
+		return []
+	teacher_id, day, class_start, class_end = row
+	if window is None:
+		window = (class_start, class_end)
+	win_start = _time_to_minutes(window[0])
+	win_end = _time_to_minutes(window[1])
+	if win_start is None:
+		win_start = _time_to_minutes(DEFAULT_DAY_WINDOW[0])
+	if win_end is None or win_end <= win_start:
+		win_end = max(win_start, _time_to_minutes(DEFAULT_DAY_WINDOW[1]))
+	duration = int(duration or 30)
+
+	with _index_lock:
+		index = _schedule_index()
+		busy_lists = [index["teacher"].intervals((teacher_id, day))]
+		if student_id is not None:
+			busy_lists.append(index["student"].intervals((student_id, day)))
+	busy = merge_intervals(*busy_lists)
+	return [
+		f"{m // 60:02d}:{m % 60:02d}"
+		for m in free_starts(busy, win_start, win_end, duration, step)
+	]
+
+
+def fetch_schedule_term_details(term_ids):
+	"""نام‌ها و بازهٔ هفتگیِ ترم‌های داده‌شده (برای گزارش ممیزیِ تداخل).
+
+	Returns {term_id: {"term_id", "student", "teacher", "class_name", "start_time", "duration"}}.
+	"""
+	term_ids = list(term_ids)
+	if not term_ids:
+		return {}
+	with get_connection() as conn:
+		rows = conn.execute("""
+			SELECT st.id, s.name, t.name, cl.name, st.start_time, COALESCE(st.lesson_duration, 30)
+			FROM student_terms st
+			JOIN classes cl ON cl.id = st.class_id
+			JOIN students s ON s.id = st.student_id
+			JOIN teachers t ON t.id = cl.teacher_id
+			WHERE st.id IN (SELECT value FROM json_each(?))
+		""", (json.dumps(term_ids),)).fetchall()
+	return {
+		term_id: {
+			"term_id": term_id, "student": student, "teacher": teacher,
+			"class_name": class_name, "start_time": start_time, "duration": int(duration or 30),
+		}
+		for term_id, student, teacher, class_name, start_time, duration in rows
+	}
 
 
 def has_student_schedule_conflict(student_id, class_id, start_time, new_duration=30, exclude_term_id=None):
 	"""Model-B: does the student already have an active term whose weekly slot overlaps this one?
 
 	Computed from student_terms (no sessions): same weekday (class.day) AND interval overlap on
-	start_time/lesson_duration. exclude_term_id skips a term being edited.
+	start_time/lesson_duration, answered by the in-memory schedule index.
+	exclude_term_id skips a term being edited.
 	"""
-	new_start = _time_to_minutes(start_time)
-	if new_start is None:
+	if _time_to_minutes(start_time) is None:
 		return False
 	with get_connection() as conn:
-		c = conn.cursor()
-		row = c.execute("SELECT day FROM classes WHERE id = ?", (class_id,)).fetchone()
-		if not row:
-			return False
-		class_day = row[0]
-		query = """
-			SELECT cl.day, st.start_time, COALESCE(st.lesson_duration, 30)
-			FROM student_terms st JOIN classes cl ON cl.id = st.class_id
-			WHERE st.student_id = ? AND st.end_date IS NULL
-		"""
-		params = [student_id]
-		if exclude_term_id:
-			query += " AND st.id != ?"
-			params.append(exclude_term_id)
-		c.execute(query, params)
-		for day, stime, dur in c.fetchall():
-			if day == class_day and _intervals_overlap(new_start, new_duration, _time_to_minutes(stime), int(dur or 30)):
-				return True
-	return False
+		row = conn.execute("SELECT day FROM classes WHERE id = ?", (class_id,)).fetchone()
+	if not row:
+		return False
+	return bool(find_schedule_overlaps(
+		"student", student_id, row[0], start_time, new_duration, exclude_term_id
+	))
 
 
 def has_teacher_schedule_conflict(class_id, start_time, new_duration=30, exclude_term_id=None):
 	"""Model-B: does the class's teacher already have an active term whose weekly slot overlaps this one?"""
-	new_start = _time_to_minutes(start_time)
-	if new_start is None:
+	if _time_to_minutes(start_time) is None:
 		return False
 	with get_connection() as conn:
-		c = conn.cursor()
-		row = c.execute("SELECT teacher_id, day FROM classes WHERE id = ?", (class_id,)).fetchone()
-		if not row:
-			return False
-		teacher_id, class_day = row
-		query = """
-			SELECT cl.day, st.start_time, COALESCE(st.lesson_duration, 30)
-			FROM student_terms st JOIN classes cl ON cl.id = st.class_id
-			WHERE cl.teacher_id = ? AND st.end_date IS NULL
-		"""
-		params = [teacher_id]
-		if exclude_term_id:
-			query += " AND st.id != ?"
-			params.append(exclude_term_id)
-		c.execute(query, params)
-		for day, stime, dur in c.fetchall():
-			if day == class_day and _intervals_overlap(new_start, new_duration, _time_to_minutes(stime), int(dur or 30)):
-				return True
-	return False
+		row = conn.execute("SELECT teacher_id, day FROM classes WHERE id = ?", (class_id,)).fetchone()
+	if not row:
+		return False
+	teacher_id, class_day = row
+	return bool(find_schedule_overlaps(
+		"teacher", teacher_id, class_day, start_time, new_duration, exclude_term_id
+	))
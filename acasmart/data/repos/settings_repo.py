@@ -1,8 +1,69 @@
 import logging
-from acasmart.data.db import get_connection
+import threading
+from acasmart.data.db import get_connection, connect, pool_generation
 
 logger = logging.getLogger(__name__)
 
+# --- In-process settings cache ---
+# The whole settings table is tiny, so it is cached as one dict. It is dropped by
+# set_setting() and re-read whenever PRAGMA data_version on a private watcher connection
+# changes, i.e. whenever any other connection (another process, or another pooled
+# connection in this one) has committed since the last load. The data_version check is
+# an in-memory PRAGMA, far cheaper than the connection + SELECT it replaces in hot loops
+# (currency formatting per cell, sms_enabled per row, fee fallbacks per term).
+_cache_lock = threading.Lock()
+_cache = None
+_cache_data_version = None
+_watcher = None
+_watcher_generation = None
+_cache_stats = {"hits": 0, "misses": 0}
+
+
+def _watcher_conn():
+	global _watcher, _watcher_generation
+	if _watcher is None or _watcher_generation != pool_generation():
+		if _watcher is not None:
+			try:
+				_watcher.close()
+			except Exception:
+				pass
+		_watcher = connect(check_same_thread=False)  # only used under _cache_lock
+		_watcher_generation = pool_generation()
+	return _watcher
+
+
+def _settings():
+	"""The cached settings dict, reloaded if the database changed since it was read."""
+	global _cache, _cache_data_version
+	with _cache_lock:
+		conn = _watcher_conn()
+		version = conn.execute("PRAGMA data_version").fetchone()[0]
+		if _cache is not None and version == _cache_data_version:
+			_cache_stats["hits"] += 1
+			return _cache
+		_cache_stats["misses"] += 1
+		_cache = {row[0]: row[1] for row in conn.execute("SELECT key, value FROM settings")}
+		_cache_data_version = version
+		return _cache
+
+
+def load_settings_cache():
+	"""Warm the settings cache (called once at startup, after migrations)."""
+	invalidate_settings_cache()
+	_settings()
+
+
+def invalidate_settings_cache():
+	global _cache
+	with _cache_lock:
+		_cache = None
+
+
+def settings_cache_stats():
+	"""Hit/miss counters of the settings cache."""
+	with _cache_lock:
+		return dict(_cache_stats)
+
 
 def set_setting(key, value):
 	"""Insert or update a setting key/value pair."""
@@ -12,15 +73,13 @@ def set_setting(key, value):
 			(key, str(value))
 		)
 		conn.commit()
+	invalidate_settings_cache()
 
 
 def get_setting(key, default=None):
 	"""Retrieve a setting value by key, or return default."""
-	with get_connection() as conn:
-		c = conn.cursor()
-		c.execute("SELECT value FROM settings WHERE key = ?", (key,))
-		row = c.fetchone()
-		return row[0] if row else default
+	value = _settings().get(key)
+	return value if value is not None else default
 
 # --- Boolean settings helpers (store as "0"/"1") ---
 
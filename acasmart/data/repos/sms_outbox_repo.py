@@ -0,0 +1,225 @@
+"""صف پایدارِ پیامک (sms_outbox، مهاجرت v12).
+
+رابط کاربری فقط ردیف اضافه می‌کند (enqueue_*) و dispatcher پس‌زمینه
+(services/sms_dispatcher) آن‌ها را برمی‌دارد و ارسال می‌کند. وضعیت‌ها:
+pending → sending → sent / failed / disabled؛ تلاش ناموفقِ قابل تکرار دوباره pending
+می‌شود با next_attempt_at (زمان یونیکس) جلوتر. فلگ sms_notifications فقط همراه با sent
+و در همان تراکنش ثبت می‌شود.
+"""
+import json
+import logging
+from acasmart.data.db import get_connection, unit_of_work
+
+logger = logging.getLogger(__name__)
+
+KIND_RENEWAL = "renewal"
+# پیمایش، یادآوریِ تمدیدی را که این تعداد ردیفِ failed دارد دیگر خودکار صف نمی‌کند
+# (ارسال مجدد دستی از پنجرهٔ حضور و غیاب همچنان ممکن است)
+RENEWAL_MAX_FAILURES = 3
+
+
+def enqueue_renewal_sms(term_keys):
+	"""یادآوری تمدید برای (student_id, term_id) ها در صف؛ همه در یک INSERT ... SELECT.
+
+	شماره و پارامترهای الگو (student_name, class_name) همین حالا از جدول‌ها برداشته می‌شوند.
+	ترمی که هنرجویش شماره ندارد یا یادآوریِ در صفِ دیگری دارد اضافه نمی‌شود.
+	خروجی: مجموعهٔ term_id هایی که حالا یادآوریِ در صف (pending/sending) دارند.
+	"""
+	term_keys = list(term_keys)
+	if not term_keys:
+		return set()
+	with unit_of_work() as conn:
+		conn.execute("CREATE TEMP TABLE IF NOT EXISTS _outbox_keys (student_id INTEGER, term_id INTEGER)")
+		conn.execute("DELETE FROM _outbox_keys")
+		conn.executemany("INSERT INTO _outbox_keys (student_id, term_id) VALUES (?, ?)", term_keys)
+		conn.execute(
+			"""
+			INSERT OR IGNORE INTO sms_outbox (kind, student_id, term_id, phone, params)
+			SELECT ?, s.id, t.id, TRIM(s.phone),
+			       json_object('student_name', s.name, 'class_name', c.name)
+			FROM _outbox_keys k
+			JOIN student_terms t ON t.id = k.term_id AND t.student_id = k.student_id
+			JOIN students s ON s.id = t.student_id
+			JOIN classes c ON c.id = t.class_id
+			WHERE COALESCE(TRIM(s.phone), '') != ''
+			""",
+			(KIND_RENEWAL,),
+		)
+		rows = conn.execute(
+			"""
+			SELECT o.term_id FROM sms_outbox o
+			JOIN _outbox_keys k ON k.term_id = o.term_id AND k.student_id = o.student_id
+			WHERE o.kind = ? AND o.status IN ('pending', 'sending')
+			""",
+			(KIND_RENEWAL,),
+		).fetchall()
+		conn.execute("DELETE FROM _outbox_keys")
+	return {r[0] for r in rows}
+
+
+def claim_due_sms(limit, now):
+	"""تا limit ردیفِ pending که موعدشان رسیده را sending کن و برگردان (یک تراکنش).
+
+	خروجی: لیست dict با id, kind, student_id, term_id, phone, params (dict), attempts
+	(attempts همین تلاش را هم شمرده است).
+	"""
+	with unit_of_work() as conn:
+		rows = conn.execute(
+			"""
+			SELECT id, kind, student_id, term_id, phone, params, attempts
+			FROM sms_outbox
+			WHERE status = 'pending' AND next_attempt_at <= ?
+			ORDER BY next_attempt_at, id
+			LIMIT ?
+			""",
+			(now, int(limit)),
+		).fetchall()
+		conn.executemany(
+			"UPDATE sms_outbox SET status = 'sending', attempts = attempts + 1 WHERE id = ?",
+			[(r["id"],) for r in rows],
+		)
+	return [
+		{
+			"id": r["id"], "kind": r["kind"], "student_id": r["student_id"], "term_id": r["term_id"],
+			"phone": r["phone"], "params": json.loads(r["params"] or "{}"), "attempts": r["attempts"] + 1,
+		}
+		for r in rows
+	]
+
+
+def mark_sms_sent(outbox_id):
+	"""sent + (برای یادآوری تمدید) فلگ sms_notifications، در یک تراکنش."""
+	with unit_of_work() as conn:
+		conn.execute(
+			"""
+			UPDATE sms_outbox SET status = 'sent', last_error = NULL,
+			       sent_at = datetime('now','localtime')
+			WHERE id = ?
+			""",
+			(outbox_id,),
+		)
+		conn.execute(
+			"""
+			INSERT OR IGNORE INTO sms_notifications (student_id, term_id)
+			SELECT student_id, term_id FROM sms_outbox
+			WHERE id = ? AND kind = ? AND student_id IS NOT NULL AND term_id IS NOT NULL
+			""",
+			(outbox_id, KIND_RENEWAL),
+		)
+
+
+def reschedule_sms(outbox_id, error, next_attempt_at):
+	"""تلاش ناموفقِ قابل تکرار: دوباره pending در next_attempt_at."""
+	with get_connection() as conn:
+		conn.execute(
+			"UPDATE sms_outbox SET status = 'pending', last_error = ?, next_attempt_at = ? WHERE id = ?",
+			(error, next_attempt_at, outbox_id),
+		)
+		conn.commit()
+
+
+def finish_sms(outbox_id, status, error=None):
+	"""پایانِ بدون ارسال: status یکی از 'failed' / 'disabled'."""
+	if status not in ("failed", "disabled"):
+		raise ValueError("invalid outbox status")
+	with get_connection() as conn:
+		conn.execute(
+			"UPDATE sms_outbox SET status = ?, last_error = ? WHERE id = ?",
+			(status, error, outbox_id),
+		)
+		conn.commit()
+
+
+def requeue_stale_sending():
+	"""ردیف‌های sending ماندهٔ اجرای قبلی (بسته‌شدنِ برنامه وسط ارسال) → pending.
+
+	ممکن است پیامکی که واقعاً رسیده بود دوباره برود؛ یادآوریِ تکراری بهتر از یادآوریِ گم‌شده است.
+	"""
+	with get_connection() as conn:
+		cur = conn.execute("UPDATE sms_outbox SET status = 'pending' WHERE status = 'sending'")
+		conn.commit()
+		return cur.rowcount
+
+
+def next_due_time():
+	"""زودترین next_attempt_at بین ردیف‌های pending (یا None اگر صف خالی است)."""
+	with get_connection() as conn:
+		row = conn.execute(
+			"SELECT MIN(next_attempt_at) FROM sms_outbox WHERE status = 'pending'"
+		).fetchone()
+		return row[0] if row else None
+
+
+# ترمِ فعالی که دست‌کم یک جلسه‌اش برگزار شده و دقیقاً یک جلسه‌اش مانده (held = سقف − ۱)،
+# هنوز فلگ sms_notifications ندارد و یادآوریِ در صف ندارد. failed_recent: یادآوری‌اش در
+# ۲۴ ساعت گذشته شکست قطعی خورده است؛ failures: تعداد ردیف‌های failed (هر کدام پس از همهٔ
+# تلاش‌های dispatcher). هیچ‌کدام دوباره صف نمی‌شوند، جدا گزارش می‌شوند.
+# سقف مثل save_attendance_batch: sessions_limit، وگرنه تنظیم term_session_count، وگرنه ۱۲.
+_DUE_RENEWALS_SQL = """
+	SELECT st.id AS term_id, st.student_id, s.name AS student_name,
+	       TRIM(COALESCE(s.phone, '')) AS phone, c.name AS class_name,
+	       EXISTS (SELECT 1 FROM sms_outbox o
+	               WHERE o.kind = :kind AND o.student_id = st.student_id AND o.term_id = st.id
+	                 AND o.status = 'failed'
+	                 AND o.created_at > datetime('now', 'localtime', '-1 day')) AS failed_recent,
+	       (SELECT COUNT(*) FROM sms_outbox o
+	        WHERE o.kind = :kind AND o.student_id = st.student_id AND o.term_id = st.id
+	          AND o.status = 'failed') AS failures
+	FROM student_terms st
+	JOIN students s ON s.id = st.student_id
+	JOIN classes c ON c.id = st.class_id
+	LEFT JOIN term_stats ts ON ts.term_id = st.id
+	WHERE st.end_date IS NULL
+	  AND COALESCE(ts.held_count, 0) > 0
+	  AND COALESCE(ts.held_count, 0) = COALESCE(NULLIF(COALESCE(
+	          st.sessions_limit,
+	          (SELECT CAST(value AS INTEGER) FROM settings WHERE key = 'term_session_count')
+	      ), 0), 12) - 1
+	  AND NOT EXISTS (SELECT 1 FROM sms_notifications n
+	                  WHERE n.student_id = st.student_id AND n.term_id = st.id)
+	  AND NOT EXISTS (SELECT 1 FROM sms_outbox o
+	                  WHERE o.kind = :kind AND o.student_id = st.student_id AND o.term_id = st.id
+	                    AND o.status IN ('pending', 'sending'))
+	ORDER BY s.name COLLATE FA, st.id
+"""
+
+
+def enqueue_due_renewal_sms():
+	"""پیمایش یادآوری‌های تمدیدِ جامانده: یک کوئری برای ترم‌های واجد شرایط و درج دسته‌ای در صف.
+
+	همان شرطِ save_attendance_batch (دقیقاً یک جلسه مانده، بدون فلگ ارسال‌شده) ولی برای همهٔ
+	ترم‌ها؛ یادآوری‌هایی که ارسالشان غیرفعال بوده یا بیش از ۲۴ ساعت پیش ناموفق شده دوباره
+	صف می‌شوند، ولی حداکثر تا RENEWAL_MAX_FAILURES ردیفِ failed. خروجی: dict با due (تعداد
+	ترم‌های واجد شرایط)، queued (تعداد ردیف‌های تازه در صف)، no_phone (نام هنرجویانِ بدون
+	شماره)، failed_recent (نام هنرجویانی که یادآوری‌شان در ۲۴ ساعت گذشته ناموفق بوده) و
+	gave_up (نام هنرجویانی که یادآوری‌شان به سقف شکست رسیده است)؛ این دو گروه صف نمی‌شوند.
+	"""
+	with unit_of_work() as conn:
+		found = conn.execute(_DUE_RENEWALS_SQL, {"kind": KIND_RENEWAL}).fetchall()
+		gave_up = [r for r in found if r["failures"] >= RENEWAL_MAX_FAILURES]
+		recent = [r for r in found if r["failed_recent"] and r["failures"] < RENEWAL_MAX_FAILURES]
+		rows = [r for r in found if not r["failed_recent"] and r["failures"] < RENEWAL_MAX_FAILURES]
+		with_phone = [r for r in rows if r["phone"]]
+		before = conn.total_changes
+		conn.executemany(
+			"""
+			INSERT OR IGNORE INTO sms_outbox (kind, student_id, term_id, phone, params)
+			VALUES (?, ?, ?, ?, ?)
+			""",
+			[
+				(
+					KIND_RENEWAL, r["student_id"], r["term_id"], r["phone"],
+					json.dumps({"student_name": r["student_name"], "class_name": r["class_name"]},
+					           ensure_ascii=False),
+				)
+				for r in with_phone
+			],
+		)
+		queued = conn.total_changes - before
+	return {
+		"due": len(rows),
+		"queued": queued,
+		"no_phone": [r["student_name"] for r in rows if not r["phone"]],
+		"failed_recent": [r["student_name"] for r in recent],
+		"gave_up": [r["student_name"] for r in gave_up],
+	}
@@ -1,4 +1,5 @@
 import logging
+from acasmart.core.fa_collation import normalize_for_search
 from acasmart.data.db import get_connection
 
 logger = logging.getLogger(__name__)
@@ -9,10 +10,10 @@ def insert_student(name, birth_date, gender, national_code, phone, father_name):
 	c = conn.cursor()
 	c.execute(
 		"""
-		INSERT INTO students (name, birth_date, gender, national_code, phone, father_name)
-		VALUES (?, ?, ?, ?, ?, ?)
+		INSERT INTO students (name, name_norm, birth_date, gender, national_code, phone, father_name)
+		VALUES (?, ?, ?, ?, ?, ?, ?)
 		""",
-		(name, birth_date, gender, national_code, phone, father_name),
+		(name, normalize_for_search(name), birth_date, gender, national_code, phone, father_name),
 	)
 	conn.commit()
 	conn.close()
@@ -39,10 +40,10 @@ def update_student_by_id(student_id, name, birth_date, gender, national_code, ph
 		conn.execute(
 			"""
 			UPDATE students
-			SET name=?, birth_date=?, gender=?, national_code=?, phone=?, father_name=?, updated_at=datetime('now','localtime')
+			SET name=?, name_norm=?, birth_date=?, gender=?, national_code=?, phone=?, father_name=?, updated_at=datetime('now','localtime')
 			WHERE id=?
 			""",
-			(name, birth_date, gender, national_code, phone, father_name, student_id),
+			(name, normalize_for_search(name), birth_date, gender, national_code, phone, father_name, student_id),
 		)
 		conn.commit()
 
@@ -51,6 +52,8 @@ def delete_student_by_id(student_id):
 	with get_connection() as conn:
 		conn.execute("DELETE FROM students WHERE id=?", (student_id,))
 		conn.commit()
+	from acasmart.data.repos.sessions_repo import invalidate_schedule_index  # avoid cycles
+	invalidate_schedule_index()  # ترم‌ها با FK (ON DELETE CASCADE) حذف شدند
 
 
 def fetch_students():
@@ -60,7 +63,7 @@ def fetch_students():
 			"""
 			SELECT id, name, gender, birth_date, national_code 
 			FROM students
-			ORDER BY name COLLATE NOCASE
+			ORDER BY name COLLATE FA, national_code
 			"""
 		)
 		return c.fetchall()
@@ -117,7 +120,7 @@ def fetch_classes_for_student(student_id):
             SELECT DISTINCT c.id, c.name, t.name, c.day
             FROM classes c
             JOIN teachers t ON c.teacher_id = t.id
-            ORDER BY c.name COLLATE NOCASE
+            ORDER BY c.name COLLATE FA
         """)
         return c.fetchall()
 
@@ -134,6 +137,6 @@ def fetch_students_with_teachers():
             LEFT JOIN classes ON student_terms.class_id = classes.id
             LEFT JOIN teachers ON classes.teacher_id = teachers.id
             GROUP BY students.id
-            ORDER BY students.name COLLATE NOCASE
+            ORDER BY students.name COLLATE FA, students.national_code
         """)
         return c.fetchall()
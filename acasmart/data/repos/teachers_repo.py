@@ -1,4 +1,5 @@
 import logging
+from acasmart.core.fa_collation import normalize_for_search
 from acasmart.data.db import get_connection
 
 logger = logging.getLogger(__name__)
@@ -7,14 +8,14 @@ logger = logging.getLogger(__name__)
 def fetch_teachers():
 	with get_connection() as conn:
 		c = conn.cursor()
-		c.execute("SELECT id, name FROM teachers")
+		c.execute("SELECT id, name FROM teachers ORDER BY name COLLATE FA, id")
 		return c.fetchall()
 
 
 def fetch_teachers_simple():
 	with get_connection() as conn:
 		c = conn.cursor()
-		c.execute("SELECT id, name FROM teachers")
+		c.execute("SELECT id, name FROM teachers ORDER BY name COLLATE FA, id")
 		return c.fetchall()
 
 
@@ -22,10 +23,10 @@ def insert_teacher(name, national_code, teaching_card_number, gender, phone, bir
 	with get_connection() as conn:
 		conn.execute(
 			"""
-			INSERT INTO teachers (name, national_code, teaching_card_number, gender, phone, birth_date, card_number, iban)
-			VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+			INSERT INTO teachers (name, name_norm, national_code, teaching_card_number, gender, phone, birth_date, card_number, iban)
+			VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
 			""",
-			(name, national_code, teaching_card_number, gender, phone, birth_date, card_number, iban),
+			(name, normalize_for_search(name), national_code, teaching_card_number, gender, phone, birth_date, card_number, iban),
 		)
 		conn.commit()
 
@@ -34,6 +35,8 @@ def delete_teacher_by_id(teacher_id):
 	with get_connection() as conn:
 		conn.execute("DELETE FROM teachers WHERE id=?", (teacher_id,))
 		conn.commit()
+	from acasmart.data.repos.sessions_repo import invalidate_schedule_index  # avoid cycles
+	invalidate_schedule_index()  # ترم‌ها با FK (ON DELETE CASCADE) حذف شدند
 
 
 def is_teacher_assigned_to_students(teacher_id):
@@ -58,10 +61,10 @@ def update_teacher_by_id(teacher_id, name, national_code, teaching_card_number,
 		conn.execute(
 			"""
 			UPDATE teachers
-			SET name=?, national_code=?, teaching_card_number=?, gender=?, phone=?, birth_date=?, card_number=?, iban=?, updated_at=datetime('now','localtime')
+			SET name=?, name_norm=?, national_code=?, teaching_card_number=?, gender=?, phone=?, birth_date=?, card_number=?, iban=?, updated_at=datetime('now','localtime')
 			WHERE id=?
 			""",
-			(name, national_code, teaching_card_number, gender, phone, birth_date, card_number, iban, teacher_id),
+			(name, normalize_for_search(name), national_code, teaching_card_number, gender, phone, birth_date, card_number, iban, teacher_id),
 		)
 		conn.commit()
 
@@ -0,0 +1,92 @@
+"""Materialised per-term counters (`term_stats`, migration v7).
+
+Triggers on attendance and payments keep one row per term with its held/present
+counts, last held date, tuition/extra paid, payment count and last payment date, so
+screens read O(1) counters instead of aggregating history. A term without any
+attendance or payment may have no row: readers LEFT JOIN and COALESCE to zero.
+"""
+import logging
+from acasmart.data.db import get_connection, tx
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = (
+	"held_count", "present_count", "last_attendance_date",
+	"tuition_paid", "extra_paid", "payment_count", "last_payment_date",
+)
+
+# What term_stats *should* contain, aggregated from history (same rules as the triggers).
+_EXPECTED_SQL = """
+	SELECT st.id,
+	       COALESCE(a.held, 0), COALESCE(a.present, 0), a.last_date,
+	       COALESCE(p.tuition, 0), COALESCE(p.extra, 0), COALESCE(p.cnt, 0), p.last_date
+	FROM student_terms st
+	LEFT JOIN (
+		SELECT term_id,
+		       SUM(CASE WHEN status != 'canceled' THEN 1 ELSE 0 END) AS held,
+		       SUM(CASE WHEN status = 'present' THEN 1 ELSE 0 END) AS present,
+		       MAX(CASE WHEN status != 'canceled' THEN date END) AS last_date
+		FROM attendance GROUP BY term_id
+	) a ON a.term_id = st.id
+	LEFT JOIN (
+		SELECT term_id,
+		       SUM(CASE WHEN payment_type = 'tuition' THEN amount ELSE 0 END) AS tuition,
+		       SUM(CASE WHEN payment_type = 'extra' THEN amount ELSE 0 END) AS extra,
+		       COUNT(*) AS cnt,
+		       MAX(payment_date) AS last_date
+		FROM payments WHERE term_id IS NOT NULL GROUP BY term_id
+	) p ON p.term_id = st.id
+"""
+
+
+def get_term_stats(term_id):
+	"""شمارنده‌های ترم به‌صورت dict (برای ترمِ بدون سابقه، همه صفر/None)."""
+	with get_connection() as conn:
+		row = conn.execute(
+			f"SELECT {', '.join(_COLUMNS)} FROM term_stats WHERE term_id = ?", (term_id,)
+		).fetchone()
+	if row is None:
+		return {"held_count": 0, "present_count": 0, "last_attendance_date": None,
+				"tuition_paid": 0, "extra_paid": 0, "payment_count": 0, "last_payment_date": None}
+	return dict(zip(_COLUMNS, row))
+
+
+def check_term_stats(repair=False):
+	"""بررسیِ سازگاریِ term_stats با تاریخچهٔ حضور و پرداخت.
+
+	خروجی: لیستِ (term_id, stored, expected) برای ترم‌های ناسازگار (stored=None یعنی ردیف
+	ندارد ولی سابقه دارد). با repair=True ردیف‌های ناسازگار از روی تاریخچه بازنویسی
+	و ردیف‌های یتیم حذف می‌شوند.
+	"""
+	zero = (0, 0, None, 0, 0, 0, None)
+	with get_connection() as conn:
+		stored = {
+			row[0]: tuple(row[1:])
+			for row in conn.execute(f"SELECT term_id, {', '.join(_COLUMNS)} FROM term_stats")
+		}
+		expected = {row[0]: tuple(row[1:]) for row in conn.execute(_EXPECTED_SQL)}
+
+	mismatches = []
+	for term_id, exp in expected.items():
+		got = stored.get(term_id)
+		if (got if got is not None else zero) != exp:
+			mismatches.append((term_id, got, exp))
+	orphans = [term_id for term_id in stored if term_id not in expected]
+	for term_id in orphans:
+		mismatches.append((term_id, stored[term_id], None))
+
+	if mismatches:
+		logger.warning("term_stats: %d inconsistent row(s), e.g. %s", len(mismatches), mismatches[:5])
+	if repair and mismatches:
+		with tx() as conn:
+			conn.executemany(
+				f"""
+				INSERT OR REPLACE INTO term_stats (term_id, {', '.join(_COLUMNS)})
+				VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+				""",
+				[(term_id,) + exp for term_id, _, exp in mismatches if exp is not None],
+			)
+			conn.executemany(
+				"DELETE FROM term_stats WHERE term_id = ?", [(term_id,) for term_id in orphans]
+			)
+	return mismatches
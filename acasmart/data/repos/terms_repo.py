@@ -1,5 +1,6 @@
 import logging
 import sqlite3
+from acasmart.core.schedule import ordinal_or_none
 from acasmart.data.db import get_connection
 
 logger = logging.getLogger(__name__)
@@ -12,7 +13,7 @@ def insert_student_term_if_not_exists(
 ):
 	from acasmart.data.repos.settings_repo import get_setting  # local to avoid cycles
 	from acasmart.data.repos.sessions_repo import (
-		has_teacher_schedule_conflict, has_student_schedule_conflict,
+		has_teacher_schedule_conflict, has_student_schedule_conflict, mark_schedule_term_dirty,
 	)  # avoid cycles
 	eff_duration = int(lesson_duration) if lesson_duration else 30
 	with get_connection() as conn:
@@ -71,12 +72,13 @@ def insert_student_term_if_not_exists(
 		try:
 			c.execute("""
 				INSERT INTO student_terms
-					(student_id, class_id, start_date, start_time, end_date,
+					(student_id, class_id, start_date, start_date_ord, start_time, end_date,
 					 sessions_limit, tuition_fee, currency_unit, profile_id, lesson_duration)
-				VALUES (?, ?, ?, ?, NULL, ?, ?, ?, ?, ?)
-			""", (student_id, class_id, start_date, start_time,
+				VALUES (?, ?, ?, ?, ?, NULL, ?, ?, ?, ?, ?)
+			""", (student_id, class_id, start_date, ordinal_or_none(start_date), start_time,
 			      sessions_limit, tuition_fee, currency_unit, profile_id, eff_duration))
 			conn.commit()
+			mark_schedule_term_dirty(c.lastrowid)
 			return c.lastrowid
 		except sqlite3.IntegrityError:
 			# نقضِ ایندکسِ «یک ترمِ فعال»: این هنرجو از قبل ترمِ فعال در این کلاس دارد
@@ -87,6 +89,8 @@ def delete_student_term_by_id(term_id):
 	with get_connection() as conn:
 		conn.execute("DELETE FROM student_terms WHERE id = ?", (term_id,))
 		conn.commit()
+	from acasmart.data.repos.sessions_repo import mark_schedule_term_dirty  # avoid cycles
+	mark_schedule_term_dirty(term_id)
 
 
 def get_student_term(student_id, class_id):
@@ -176,53 +180,61 @@ def refresh_term_completion(term_id):
 	همان هنرجو/کلاس شود، end_date را NULL نمی‌کند و مارکر را نگه می‌دارد.
 	خروجی: True اگر ترم اکنون تکمیل‌شده است.
 	"""
-	from acasmart.data.repos.settings_repo import get_setting  # local to avoid cycles
 	with get_connection() as conn:
-		c = conn.cursor()
-		c.execute("""
-			SELECT student_id, class_id, sessions_limit, end_date
-			FROM student_terms WHERE id = ?
-		""", (term_id,))
-		row = c.fetchone()
-		if not row:
-			return False
-		sid, cid, term_limit, current_end = row[0], row[1], row[2], row[3]
-		try:
-			term_limit = int(term_limit)
-		except (TypeError, ValueError):
-			term_limit = int(get_setting("term_session_count", 12))
+		completed = refresh_term_completion_in(conn.cursor(), term_id)
+		conn.commit()
+		return completed
 
-		c.execute("""
-			SELECT COUNT(*), MAX(date) FROM attendance
-			WHERE term_id = ? AND status != 'canceled'
-		""", (term_id,))
-		crow = c.fetchone()
-		total = crow[0] or 0
-		last_date = crow[1]
 
-		if total >= term_limit:
-			new_end = last_date or current_end
-			if current_end != new_end:
-				c.execute("""
-					UPDATE student_terms SET end_date = ?, updated_at = datetime('now','localtime')
-					WHERE id = ?
-				""", (new_end, term_id))
-				conn.commit()
-			return True
-
-		# زیرِ سقف → ترم باید فعال باشد، مگر اینکه ترمِ فعالِ دیگری برای همان هنرجو/کلاس وجود داشته باشد
-		if current_end is not None:
-			c.execute("""
-				SELECT COUNT(*) FROM student_terms
-				WHERE student_id = ? AND class_id = ? AND end_date IS NULL AND id != ?
-			""", (sid, cid, term_id))
-			if c.fetchone()[0] == 0:
-				c.execute("""
-					UPDATE student_terms SET end_date = NULL, updated_at = datetime('now','localtime')
-					WHERE id = ?
-				""", (term_id,))
-				conn.commit()
+def refresh_term_completion_in(c, term_id):
+	"""همان refresh_term_completion روی cursorِ داده‌شده و بدونِ commit (برای unit_of_work)."""
+	from acasmart.data.repos.settings_repo import get_setting  # local to avoid cycles
+	from acasmart.data.repos.sessions_repo import mark_schedule_term_dirty  # avoid cycles
+	c.execute("""
+		SELECT student_id, class_id, sessions_limit, end_date
+		FROM student_terms WHERE id = ?
+	""", (term_id,))
+	row = c.fetchone()
+	if not row:
 		return False
+	sid, cid, term_limit, current_end = row[0], row[1], row[2], row[3]
+	try:
+		term_limit = int(term_limit)
+	except (TypeError, ValueError):
+		term_limit = int(get_setting("term_session_count", 12))
+
+	# شمارندهٔ نگه‌داشته‌شده با تریگر (term_stats) به‌جای COUNT روی attendance
+	c.execute("""
+		SELECT held_count, last_attendance_date FROM term_stats WHERE term_id = ?
+	""", (term_id,))
+	crow = c.fetchone()
+	total = (crow[0] or 0) if crow else 0
+	last_date = crow[1] if crow else None
+
+	if total >= term_limit:
+		new_end = last_date or current_end
+		if current_end != new_end:
+			c.execute("""
+				UPDATE student_terms
+				SET end_date = ?, end_date_ord = ?, updated_at = datetime('now','localtime')
+				WHERE id = ?
+			""", (new_end, ordinal_or_none(new_end), term_id))
+			mark_schedule_term_dirty(term_id)  # بازهٔ هفتگی‌اش آزاد شد
+		return True
+
+	# زیرِ سقف → ترم باید فعال باشد، مگر اینکه ترمِ فعالِ دیگری برای همان هنرجو/کلاس وجود داشته باشد
+	if current_end is not None:
+		c.execute("""
+			SELECT COUNT(*) FROM student_terms
+			WHERE student_id = ? AND class_id = ? AND end_date IS NULL AND id != ?
+		""", (sid, cid, term_id))
+		if c.fetchone()[0] == 0:
+			c.execute("""
+				UPDATE student_terms SET end_date = NULL, end_date_ord = NULL, updated_at = datetime('now','localtime')
+				WHERE id = ?
+			""", (term_id,))
+			mark_schedule_term_dirty(term_id)
+	return False
 
 
 def recalc_term_end_by_id(term_id: int):
@@ -293,8 +305,6 @@ def count_attendance_for_term(term_id):
     """تعداد جلسات مصرف‌شدهٔ ترم (حاضر + غایب). جلسهٔ لغوشده شمرده نمی‌شود."""
     with get_connection() as conn:
         c = conn.cursor()
-        c.execute("""
-            SELECT COUNT(*) FROM attendance
-            WHERE term_id = ? AND status != 'canceled'
-        """, (term_id,))
-        return c.fetchone()[0]
\ No newline at end of file
+        c.execute("SELECT held_count FROM term_stats WHERE term_id = ?", (term_id,))
+        row = c.fetchone()
+        return row[0] if row else 0
\ No newline at end of file
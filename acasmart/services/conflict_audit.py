@@ -0,0 +1,81 @@
+"""
+ممیزیِ تداخل برنامهٔ کل آموزشگاه (Model-B).
+
+بررسی می‌کند که هیچ استاد و هیچ هنرجویی دو ترم فعال با بازهٔ هفتگیِ هم‌پوشان نداشته باشد
+(مثلاً بعد از ورود داده یا مهاجرت v5). جفت‌های تداخل از همان ایندکس بازه‌های
+sessions_repo می‌آیند (schedule_conflict_pairs، یک گذرِ sweep-line روی
+(استاد، روز) و (هنرجو، روز))؛ این ماژول فقط نام‌ها را برای ترم‌های درگیر می‌خواند و
+گزارش می‌سازد.
+
+بدون رابط کاربری::
+
+    python -m acasmart.services.conflict_audit
+
+اگر تداخلی باشد با کد ۱ خارج می‌شود. داشبورد همین ممیزی را اجرا می‌کند.
+"""
+import sys
+import time
+
+from acasmart.data.repos.sessions_repo import (
+    schedule_conflict_pairs, schedule_index_size, fetch_schedule_term_details,
+)
+
+
+def audit_schedule_conflicts():
+    """اجرای ممیزی. خروجی: {"conflicts": [...], "terms": n, "load_ms": x, "sweep_ms": y}.
+
+    هر تداخل یک dict است: kind ('teacher' / 'student')، owner (نام)، day، و a / b —
+    دو ترم به‌صورت dict (term_id, student, teacher, class_name, start_time, duration).
+    """
+    t0 = time.perf_counter()
+    pairs = schedule_conflict_pairs()
+    t1 = time.perf_counter()
+    terms = fetch_schedule_term_details({term_id for _, _, a, b in pairs for term_id in (a, b)})
+    t2 = time.perf_counter()
+
+    conflicts = [
+        {
+            "kind": kind,
+            "owner": terms[a][kind],
+            "day": day,
+            "a": terms[a],
+            "b": terms[b],
+        }
+        for kind, (_, day), a, b in pairs
+        if a in terms and b in terms
+    ]
+    return {
+        "conflicts": conflicts,
+        "terms": schedule_index_size(),
+        "load_ms": (t2 - t1) * 1000,
+        "sweep_ms": (t1 - t0) * 1000,
+    }
+
+
+def format_report(result):
+    """خطوط خوانا (فارسی) برای نتیجهٔ ممیزی."""
+    lines = []
+    for c in result["conflicts"]:
+        who = "استاد" if c["kind"] == "teacher" else "هنرجو"
+        a, b = c["a"], c["b"]
+        lines.append(
+            f"{who} {c['owner']} — {c['day']}: "
+            f"{a['student']} ({a['class_name']}، {a['start_time']}، {a['duration']} دقیقه) ⟷ "
+            f"{b['student']} ({b['class_name']}، {b['start_time']}، {b['duration']} دقیقه)"
+        )
+    lines.append(
+        f"{len(result['conflicts'])} تداخل در {result['terms']} ترمِ فعال "
+        f"(بررسی {result['sweep_ms']:.1f} ms، خواندن نام‌ها {result['load_ms']:.1f} ms)"
+    )
+    return lines
+
+
+def main():
+    result = audit_schedule_conflicts()
+    for line in format_report(result):
+        print(line)
+    return 1 if result["conflicts"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""
+ارسال پس‌زمینهٔ پیامک‌های صف‌شده در sms_outbox (مهاجرت v12).
+
+رابط کاربری هرگز منتظر IPPanel نمی‌ماند: یادآوری با data/repos/sms_outbox_repo در صف
+قرار می‌گیرد و wake() صدا زده می‌شود. SmsDispatcher یک thread پس‌زمینه است که:
+- ردیف‌های موعدرسیده را دسته‌ای (batch_size) برمی‌دارد (pending → sending)،
+- ارسال‌ها را با حداکثر max_workers درخواست هم‌زمان روی یک requests.Session مشترک
+  (keep-alive، با مهلت) انجام می‌دهد،
+- نتیجه را ثبت می‌کند: SENT → sent + فلگ sms_notifications؛ خطای موقت (مهلت، شبکه،
+  429/5xx) → دوباره pending با backoff نمایی (تا max_attempts)؛ بقیه → failed / disabled،
+- و برای هر ردیفِ تمام‌شده شنونده‌ها را صدا می‌زند: fn(outbox_id, student_id, term_id, status).
+  شنونده‌ها در thread dispatcher اجرا می‌شوند؛ رابط کاربری باید نتیجه را با سیگنال Qt
+  به thread خودش ببرد.
+
+همهٔ نوشتن‌های دیتابیس در همان thread dispatcher (با pool اتصالِ خودش) انجام می‌شود؛
+thread های ارسال فقط HTTP می‌زنند.
+"""
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from acasmart.data.db import release_thread_connections
+from acasmart.data.repos.settings_repo import get_setting_bool
+from acasmart.data.repos.sms_outbox_repo import (
+    claim_due_sms, mark_sms_sent, reschedule_sms, finish_sms, requeue_stale_sending, next_due_time,
+    enqueue_due_renewal_sms,
+)
+from acasmart.services.sms_notifier import SmsNotifier, SmsStatus
+
+logger = logging.getLogger(__name__)
+
+# فاصلهٔ پیمایش دوره‌ای یادآوری‌های تمدیدِ جامانده (میلی‌ثانیه، برای QTimer داشبورد)
+RENEWAL_SWEEP_INTERVAL_MS = 30 * 60 * 1000
+
+
+class SmsDispatcher:
+    def __init__(self, notifier=None, max_workers=4, batch_size=20, poll_interval=60.0,
+                 max_attempts=5, backoff_base=10.0, backoff_max=900.0):
+        self.notifier = notifier or SmsNotifier(pool_size=max_workers)
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._listeners = []
+        self._listeners_lock = threading.Lock()
+
+    # --- کنترل ---
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sms-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.notifier.close()
+
+    def wake(self):
+        """صف را همین حالا بررسی کن (بعد از enqueue)."""
+        self._wake.set()
+
+    def add_listener(self, fn):
+        with self._listeners_lock:
+            self._listeners.append(fn)
+
+    def remove_listener(self, fn):
+        with self._listeners_lock:
+            if fn in self._listeners:
+                self._listeners.remove(fn)
+
+    def backoff_delay(self, attempts):
+        """فاصلهٔ تلاش بعدی (ثانیه) پس از attempts تلاش: نمایی با سقف و jitter."""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** max(0, attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    # --- thread dispatcher ---
+    def _run(self):
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="sms-send")
+        try:
+            requeue_stale_sending()
+            while not self._stop.is_set():
+                self._wake.clear()
+                try:
+                    self._drain(executor)
+                    timeout = self._next_wait()
+                except Exception:
+                    logger.exception("SMS dispatcher iteration failed")
+                    timeout = self.poll_interval
+                self._wake.wait(timeout)
+        finally:
+            executor.shutdown(wait=True)
+            release_thread_connections()
+
+    def _next_wait(self):
+        due = next_due_time()
+        if due is None:
+            return self.poll_interval
+        return max(0.0, min(self.poll_interval, due - time.time()))
+
+    def _drain(self, executor):
+        while not self._stop.is_set():
+            jobs = claim_due_sms(self.batch_size, time.time())
+            if not jobs:
+                return
+            futures = [
+                (job, executor.submit(self.notifier.send_pattern, [job["phone"]], job["params"]))
+                for job in jobs
+            ]
+            for job, future in futures:
+                try:
+                    result = future.result()
+                except Exception as e:  # send_pattern خطا نمی‌دهد؛ فقط برای اطمینان
+                    result = {"status": SmsStatus.FAILED, "message": str(e), "retryable": True}
+                self._record(job, result)
+
+    def _record(self, job, result):
+        status = result["status"]
+        if status == SmsStatus.SENT:
+            mark_sms_sent(job["id"])
+        elif status == SmsStatus.FAILED and result.get("retryable") and job["attempts"] < self.max_attempts:
+            retry_at = time.time() + self.backoff_delay(job["attempts"])
+            reschedule_sms(job["id"], result["message"], retry_at)
+            logger.info("SMS %s retry %s scheduled", job["id"], job["attempts"])
+            return  # هنوز تمام نشده؛ به شنونده‌ها خبر نده
+        else:
+            finish_sms(job["id"], status.value, result.get("message"))
+        self._notify(job, status)
+
+    def _notify(self, job, status):
+        with self._listeners_lock:
+            listeners = list(self._listeners)
+        for fn in listeners:
+            try:
+                fn(job["id"], job["student_id"], job["term_id"], status)
+            except Exception:
+                logger.exception("SMS dispatcher listener failed")
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    """dispatcher مشترک برنامه (در اولین استفاده ساخته و شروع می‌شود)."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = SmsDispatcher()
+        _dispatcher.start()
+        return _dispatcher
+
+
+def stop_dispatcher():
+    """توقف dispatcher مشترک (هنگام خروج از برنامه)."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is not None:
+            _dispatcher.stop()
+            _dispatcher = None
+
+
+def sweep_renewal_reminders():
+    """یادآوری‌های تمدیدی که در save_attendance جا مانده‌اند (ارسال ناموفق/غیرفعال) را صف کن.
+
+    یک کوئری روی همهٔ ترم‌ها (enqueue_due_renewal_sms) و بیدارکردنِ dispatcher؛ برای اجرا
+    در پس‌زمینه (داشبورد، هنگام شروع و با تایمر). خروجی: خلاصهٔ enqueue_due_renewal_sms،
+    یا None اگر ارسال پیامک غیرفعال است.
+    """
+    if not get_setting_bool("sms_enabled", True):
+        return None
+    summary = enqueue_due_renewal_sms()
+    if summary["queued"]:
+        get_dispatcher().wake()
+    logger.info("Renewal sweep: %s due, %s queued, %s without phone, %s failed in the last day, %s given up",
+                summary["due"], summary["queued"], len(summary["no_phone"]), len(summary["failed_recent"]),
+                len(summary["gave_up"]))
+    return summary
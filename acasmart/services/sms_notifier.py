@@ -1,7 +1,12 @@
 from acasmart.data.repos.settings_repo import get_setting_bool
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
+import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from acasmart.paths import APP_DATA_DIR
 from enum import Enum
 class SmsStatus(Enum):
@@ -9,88 +14,230 @@ class SmsStatus(Enum):
     FAILED = "failed"
     DISABLED = "disabled"
 
+# مهلت اتصال/خواندن درخواست‌های IPPanel (ثانیه)؛ بدون مهلت یک پاسخ کند همه‌چیز را نگه می‌داشت
+REQUEST_TIMEOUT = (5, 20)
+DEFAULT_API_URL = "https://edge.ippanel.com/v1/api/send"
+# ارسال گروهی: سقف گیرنده در هر درخواست الگو، درخواست هم‌زمان، و نرخ شروع درخواست‌ها
+BULK_MAX_RECIPIENTS = 100
+BULK_MAX_WORKERS = 4
+BULK_REQUESTS_PER_SECOND = 5.0
+BULK_RETRIES = 2
+
+
+def normalize_recipient(phone_number):
+    """تبدیل شماره به فرمت +98"""
+    phone_number = (phone_number or "").strip()
+    if phone_number.startswith("0"):
+        return "+98" + phone_number[1:]
+    if phone_number.startswith("9"):
+        return "+98" + phone_number
+    return phone_number
+
+
+class RateLimiter:
+    """حداقل فاصله بین شروع درخواست‌ها (thread-safe)؛ rate بر حسب درخواست در ثانیه."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
 class SmsNotifier:
-    def __init__(self):
+    def __init__(self, pool_size=4):
         # بارگذاری متغیرها از فایل .env
         load_dotenv()
         self.api_key = os.getenv("IPPANEL_API_KEY")
         self.from_number = os.getenv("IPPANEL_FROM_NUMBER")
         self.pattern_code = os.getenv("IPPANEL_PATTERN_CODE")
-        self.api_url = "https://edge.ippanel.com/v1/api/send"
-        
+        # IPPANEL_API_URL برای سرور آزمایشی محلی (tools/fake_ippanel.py)
+        self.api_url = os.getenv("IPPANEL_API_URL") or DEFAULT_API_URL
+        self.timeout = REQUEST_TIMEOUT
+
+        # یک Session مشترک (keep-alive)؛ pool_size = حداکثر درخواست هم‌زمان
+        self.pool_size = pool_size
+        self._session = None
+        self._session_lock = threading.Lock()
+
         # مسیر مطمئن برای ذخیره لاگ (همان مسیر main.py)
         self.log_dir = APP_DATA_DIR
         self.log_dir.mkdir(parents=True, exist_ok=True)
         self.log_path = os.path.join(APP_DATA_DIR, "acasmart.log")
-    
+
 
     def is_enabled(self) -> bool:
         '''check if auto sms send is enabled'''
         # پیش‌فرض: فعال
         return get_setting_bool("sms_enabled", True)
 
-    def send_renew_term_notification(self, student_name, phone_number, class_name):
+    def is_configured(self) -> bool:
+        return bool(self.api_key and self.from_number and self.pattern_code)
+
+    def session(self):
+        with self._session_lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({
+                    "Content-Type": "application/json",
+                    "Authorization": self.api_key or "",
+                })
+                self._session = session
+            return self._session
+
+    def close(self):
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def _log(self, line):
+        try:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except Exception as e:
+            print(f"⚠️ خطا در نوشتن لاگ: {e}")
+
+    def send_pattern(self, recipients, params):
+        """ارسال پیامک الگو (pattern) به recipients؛ هرگز exception نمی‌دهد.
+
+        خروجی: dict با status (SmsStatus)، message، retryable (خطای موقت: مهلت، قطعی
+        شبکه، 429 یا 5xx) و http_status.
+        """
+        blocked = self._precheck()
+        if blocked is not None:
+            return blocked
+        return self._post(recipients, params)
+
+    def _precheck(self):
+        """نتیجهٔ DISABLED/FAILED اگر ارسال ممکن نیست، وگرنه None."""
         # 1) اگر ارسال پیامک غیرفعال است، بی‌سر و صدا برگرد
         if not self.is_enabled():
-            try:
-                with open(self.log_path, "a", encoding="utf-8") as f:
-                    f.write("[SMS SKIPPED] ارسال پیامک غیرفعال بود. ارسال انجام نشد.\n")
-            except Exception as e:
-                print(f"⚠️ خطا در نوشتن لاگ (skip): {e}")
-            return {"status": SmsStatus.DISABLED, "message": "ارسال پیامک غیرفعال است"}
+            self._log("[SMS SKIPPED] ارسال پیامک غیرفعال بود. ارسال انجام نشد.")
+            return {"status": SmsStatus.DISABLED, "message": "ارسال پیامک غیرفعال است",
+                    "retryable": False, "http_status": None}
 
         # 2) ولیدیشن حداقلی تنظیمات ENV
-        if not self.api_key or not self.from_number or not self.pattern_code:
-            try:
-                with open(self.log_path, "a", encoding="utf-8") as f:
-                    f.write("[SMS ERROR] اطلاعات IPPanel ناقص است (API_KEY/ FROM_NUMBER/ PATTERN_CODE).\n")
-            except Exception as e:
-                print(f"⚠️ خطا در نوشتن لاگ (env): {e}")
+        if not self.is_configured():
+            self._log("[SMS ERROR] اطلاعات IPPanel ناقص است (API_KEY/ FROM_NUMBER/ PATTERN_CODE).")
             # برگرداندن وضعیت شکست برای استفادهٔ احتمالی در UI
-            return {"status": SmsStatus.FAILED, "message": "پیکربندی IPPanel ناقص است"}
-
-        # تبدیل شماره به فرمت +98
-        if phone_number.startswith("0"):
-            recipient = "+98" + phone_number[1:]
-        elif phone_number.startswith("9"):
-            recipient = "+98" + phone_number
-        else:
-            recipient = phone_number
-
-        params = {
-            "student_name": student_name,
-            "class_name": class_name
-        }
+            return {"status": SmsStatus.FAILED, "message": "پیکربندی IPPanel ناقص است",
+                    "retryable": False, "http_status": None}
+        return None
 
+    def _post(self, recipients, params):
         data = {
             "sending_type": "pattern",
             "from_number": self.from_number,
             "code": self.pattern_code,
-            "recipients": [recipient],
+            "recipients": [normalize_recipient(r) for r in recipients],
             "params": params
         }
 
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization":self.api_key
-        }
-
-        response = requests.post(self.api_url, headers=headers, json=data)
+        try:
+            response = self.session().post(self.api_url, json=data, timeout=self.timeout)
+        except requests.RequestException as e:
+            self._log(f"[SMS ERROR] خطای ارتباط با IPPanel برای {data['recipients']}: {e}")
+            return {"status": SmsStatus.FAILED, "message": f"خطای ارتباط: {e}",
+                    "retryable": True, "http_status": None}
 
         if response.status_code != 200:
             error_message = (
-                f"ارسال پیامک برای {student_name} ({phone_number}) با خطا مواجه شد:\n"
+                f"ارسال پیامک برای {', '.join(data['recipients'])} با خطا مواجه شد:\n"
                 f"کد وضعیت: {response.status_code}\n"
                 f"متن خطا: {response.text}"
             )
-            # نوشتن در فایل لاگ (مسیر مطمئن)
-            try:
-                with open(self.log_path, "a", encoding="utf-8") as f:
-                    f.write(f"[SMS ERROR] {error_message}\n")
-            except Exception as e:
-                print(f"❌ خطا در نوشتن لاگ: {e}")
-            # حفظ رفتار قبلی: پرتاب خطا برای هندل فعلی UI
-            raise Exception(error_message)
-
-        print(f"✅ پیامک برای {student_name} ارسال شد.")
-        return {"status": SmsStatus.SENT, "message": "پیامک ارسال شد"}
\ No newline at end of file
+            self._log(f"[SMS ERROR] {error_message}")
+            return {"status": SmsStatus.FAILED, "message": error_message,
+                    "retryable": response.status_code == 429 or response.status_code >= 500,
+                    "http_status": response.status_code}
+
+        return {"status": SmsStatus.SENT, "message": "پیامک ارسال شد",
+                "retryable": False, "http_status": response.status_code}
+
+    def send_renew_term_notification(self, student_name, phone_number, class_name):
+        """ارسال هم‌زمان (blocking) یک یادآوری؛ برای مسیرهای پس‌زمینه/ابزارها.
+
+        در رابط کاربری به‌جای این، یادآوری در sms_outbox صف می‌شود (services/sms_dispatcher).
+        """
+        params = {
+            "student_name": student_name,
+            "class_name": class_name
+        }
+        result = self.send_pattern([phone_number], params)
+        if result["status"] == SmsStatus.FAILED and (result["retryable"] or result["http_status"] is not None):
+            # حفظ رفتار قبلی: پرتاب خطا (HTTP/شبکه) برای هندل فعلی UI
+            raise Exception(result["message"])
+        if result["status"] == SmsStatus.SENT:
+            print(f"✅ پیامک برای {student_name} ارسال شد.")
+        return {"status": result["status"], "message": result["message"]}
+
+    def iter_send_pattern_bulk(self, messages, max_recipients=BULK_MAX_RECIPIENTS,
+                               max_workers=BULK_MAX_WORKERS, rate=BULK_REQUESTS_PER_SECOND,
+                               retries=BULK_RETRIES):
+        """ارسال گروهیِ پیامک الگو؛ نتیجهٔ هر گیرنده به محض آماده‌شدن yield می‌شود.
+
+        messages: (key, phone, params) ها. گیرنده‌های با params یکسان در یک درخواست
+        (تکه‌های حداکثر max_recipients نفره) می‌روند؛ تکه‌ها با حداکثر max_workers درخواست
+        هم‌زمان و حداکثر rate شروع در ثانیه ارسال و خطای موقت تا retries بار با backoff
+        تکرار می‌شود. خروجی: (key, result) با همان dict های send_pattern.
+        بستنِ generator (لغو) تکه‌های شروع‌نشده را لغو می‌کند.
+        """
+        messages = list(messages)
+        blocked = self._precheck()
+        if blocked is not None:
+            for key, _phone, _params in messages:
+                yield key, blocked
+            return
+
+        groups = {}
+        for key, phone, params in messages:
+            group = groups.setdefault(json.dumps(params, sort_keys=True, ensure_ascii=False), (params, []))
+            group[1].append((key, phone))
+        chunks = [
+            (params, members[i:i + max_recipients])
+            for params, members in groups.values()
+            for i in range(0, len(members), max_recipients)
+        ]
+
+        limiter = RateLimiter(rate)
+
+        def send_chunk(params, members):
+            recipients = [phone for _key, phone in members]
+            for attempt in range(retries + 1):
+                if attempt:
+                    time.sleep(min(30.0, 2.0 * (2 ** (attempt - 1))))
+                limiter.acquire()
+                result = self._post(recipients, params)
+                if not result["retryable"]:
+                    break
+            return result
+
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sms-bulk")
+        futures = {}
+        try:
+            futures = {executor.submit(send_chunk, params, members): members for params, members in chunks}
+            for future in as_completed(futures):
+                result = future.result()
+                for key, _phone in futures[future]:
+                    yield key, result
+        finally:
+            for future in futures:
+                future.cancel()  # (cancel_futures در پایتون 3.8 نیست)
+            executor.shutdown(wait=False)
+
+    def send_pattern_bulk(self, messages, **kwargs):
+        """نسخهٔ یک‌جای iter_send_pattern_bulk: dict از key به result."""
+        return dict(self.iter_send_pattern_bulk(messages, **kwargs))
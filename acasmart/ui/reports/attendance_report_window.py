@@ -6,6 +6,7 @@ from PySide6.QtWidgets import (
     QLineEdit, QComboBox, QPushButton, QHBoxLayout, QFileDialog, QMessageBox
 )
 from acasmart.data.repos.classes_repo import fetch_classes
+from acasmart.data.repos.teachers_repo import fetch_teachers_simple
 from PySide6.QtCore import Qt, QDate
 from PySide6.QtGui import QColor
 from datetime import datetime
@@ -16,12 +17,19 @@ from acasmart.ui.widgets.shamsi_date_picker import ShamsiDatePicker
 from acasmart.ui.widgets.theme_manager import ThemeManager
 from acasmart.ui.widgets.shamsi_date_popup import ShamsiDatePopup
 from acasmart.ui.widgets.base_secondary_window import BaseSecondaryWindow
+from acasmart.ui.widgets.async_loader import AsyncLoader
 
 
 class AttendanceReportWindow(BaseSecondaryWindow):
     def __init__(self, return_target: QWidget | None = None):
         super().__init__("گزارش حضور و غیاب هنرجویان", return_target)
         self.setGeometry(250, 150, 1300, 600)
+        self.all_data = []
+        # خواندن حضورها در پس‌زمینه؛ فیلترهای پایتونی بعد از رسیدن نتیجه اعمال می‌شوند
+        self.loader = AsyncLoader(self)
+        self.loader.finished.connect(self._on_rows_loaded)
+        self.loader.failed.connect(self._on_load_failed)
+        self._apply_row_filters = False
         self.build_ui()
 
     def build_ui(self):
@@ -102,8 +110,6 @@ class AttendanceReportWindow(BaseSecondaryWindow):
         self.table.setSortingEnabled(True)
 
     def load_data(self):
-        rows = get_attendance_report_rows()
-        self.all_data = rows
         self.combo_teacher.clear()
         self.combo_teacher.addItem("همه اساتید", None)
 
@@ -112,43 +118,55 @@ class AttendanceReportWindow(BaseSecondaryWindow):
         for cid, cname, *_ in fetch_classes():
             self.combo_class.addItem(cname, cid)
 
-        teacher_names = set()
-        class_names = set()
-        for row in rows:
-            teacher_names.add(row['teacher_name'])
-            class_names.add(row['class_name'])
-
-        for t in sorted(teacher_names):
+        for t in sorted({name for _, name in fetch_teachers_simple()}):
             self.combo_teacher.addItem(t, t)
 
+        self._fetch_rows(apply_filters=False)
+
+    def _fetch_rows(self, apply_filters):
+        """بازهٔ تاریخ (شمسی) و کلاس در SQL فیلتر می‌شوند؛ فقط همان بازه از حضورها خوانده می‌شود.
+
+        خواندن در پس‌زمینه انجام می‌شود و جدول در _on_rows_loaded پر می‌شود.
+        """
+        self._apply_row_filters = apply_filters
+        self.status_label.setText("در حال بارگذاری…")
+        self.loader.load(
+            get_attendance_report_rows,
+            date_from=self.date_from_picker.selected_shamsi,
+            date_to=self.date_to_picker.selected_shamsi,
+            class_id=self.combo_class.currentData(),
+        )
 
+    def _on_rows_loaded(self, rows):
+        self.all_data = rows
+        if self._apply_row_filters:
+            self._show_filtered(rows)
+        else:
+            self.populate_table(rows)
+            self.status_label.setText(f"تعداد نتایج: {len(rows)}")
 
-        self.populate_table(self.all_data)
-        self.status_label.setText(f"تعداد نتایج: {len(self.all_data)}")
+    def _on_load_failed(self, message):
+        self.status_label.setText(f"خطا در بارگذاری گزارش: {message}")
 
     def apply_filters(self):
+        self._fetch_rows(apply_filters=True)
+
+    def _show_filtered(self, rows):
         name_filter = self.input_student_name.text().strip()
         teacher_filter = self.combo_teacher.currentData()
-        class_filter = self.combo_class.currentData()
         term_status_filter = self.combo_term_status.currentData()
-        from_date = self.date_from_picker.get_miladi_str()
-        to_date = self.date_to_picker.get_miladi_str()
 
         filtered = []
 
-        for row in self.all_data:
+        for row in rows:
             if name_filter and name_filter not in row['student_name']:
                 continue
             if teacher_filter and row['teacher_name'] != teacher_filter:
                 continue
-            if class_filter and row['class_id'] != class_filter:
-                continue
             if term_status_filter == "active" and row['end_date']:
                 continue
             if term_status_filter == "finished" and not row['end_date']:
                 continue
-            if row['start_date'] > to_date or (row['end_date'] and row['end_date'] < from_date):
-                continue
 
             filtered.append(row)
 
@@ -228,8 +246,7 @@ class AttendanceReportWindow(BaseSecondaryWindow):
         self.date_from_picker.setDate(QDate.currentDate().addMonths(-3))
         self.date_to_picker.setDate(QDate.currentDate())
 
-        self.populate_table(self.all_data)
-        self.status_label.setText(f"تعداد نتایج: {len(self.all_data)}")
+        self._fetch_rows(apply_filters=False)
 
     def export_to_excel(self):
         today = jdatetime.date.today().strftime("%Y%m%d")
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from acasmart.data.repos.reports_repo import fetch_all_contacts
+from acasmart.data.repos.search_repo import search_contacts
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QTableWidget, QTableWidgetItem,
     QHeaderView, QLineEdit, QHBoxLayout
@@ -61,5 +62,5 @@ class ContactsWindow(BaseSecondaryWindow):
         if not query:
             self.populate_table(self.all_data)
         else:
-            filtered = [row for row in self.all_data if query in row[0]]
-            self.populate_table(filtered)
+            # نام، کد ملی یا شماره تماس — از ایندکس FTS (search_repo)
+            self.populate_table(search_contacts(query))
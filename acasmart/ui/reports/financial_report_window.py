@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from acasmart.data.repos.reports_repo import get_all_student_terms_with_financials
+from acasmart.data.repos.reports_repo import iter_student_terms_with_financials
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QTableWidget, QTableWidgetItem, QHeaderView,
     QHBoxLayout, QLineEdit, QComboBox, QPushButton, QFileDialog
@@ -13,6 +13,7 @@ from acasmart.core.utils import format_currency_with_unit
 from acasmart.ui.widgets.shamsi_date_picker import ShamsiDatePicker
 from acasmart.ui.widgets.theme_manager import ThemeManager
 from acasmart.ui.widgets.base_secondary_window import BaseSecondaryWindow
+from acasmart.ui.widgets.async_loader import AsyncLoader
 
 import jdatetime
 import openpyxl
@@ -23,6 +24,15 @@ class FinancialReportWindow(BaseSecondaryWindow):
         super().__init__("گزارش مالی هنرجویان", return_target)
         self.setGeometry(300, 200, 1300, 500)
         self.all_data = []  # همه داده‌ها ذخیره می‌شن برای فیلتر کردن
+        self.filtered_data = []
+        # فیلتر فعال (None = بدون فیلتر)؛ تکه‌هایی که بعد از اعمال فیلتر می‌رسند هم با آن سنجیده می‌شوند
+        self._row_filter = None
+        # ترم‌ها در پس‌زمینه خوانده و تکه‌تکه به جدول اضافه می‌شوند
+        self.loader = AsyncLoader(self)
+        self.loader.chunk_ready.connect(self._on_rows_loaded)
+        self.loader.progress.connect(self._on_load_progress)
+        self.loader.finished.connect(self._on_load_finished)
+        self.loader.failed.connect(self._on_load_failed)
         self.build_ui()
 
     def build_ui(self):
@@ -110,16 +120,45 @@ class FinancialReportWindow(BaseSecondaryWindow):
         self.load_data()
 
     def load_data(self):
-        self.all_data = get_all_student_terms_with_financials()
-        self.populate_table(self.all_data)
+        self.all_data = []
+        self.filtered_data = []
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(0)
+        self.summary_label.setText("در حال بارگذاری…")
+        self.loader.stream(iter_student_terms_with_financials)
+
+    def _on_rows_loaded(self, rows):
+        self.all_data.extend(rows)
+        if self._row_filter is not None:
+            rows = [row for row in rows if self._row_filter(row)]
+        self.filtered_data.extend(rows)
+        self._append_rows(rows)
+
+    def _on_load_progress(self, done, _total):
+        self.summary_label.setText(f"در حال بارگذاری… {done} ترم")
+
+    def _on_load_finished(self, _count):
+        self._update_summary(self.filtered_data)
+        self.table.setSortingEnabled(True)
+
+    def _on_load_failed(self, message):
+        self.summary_label.setText(f"خطا در بارگذاری گزارش: {message}")
 
     def populate_table(self, data):
-        self.table.setRowCount(len(data))
-        total_tuition = 0
-        total_paid = 0
-        total_debt = 0
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(0)
+        self._append_rows(data)
+        self.filtered_data = list(data)
+        if self.loader.is_running():
+            # بقیهٔ ردیف‌ها هنوز در راه‌اند؛ خلاصه و مرتب‌سازی در _on_load_finished
+            return
+        self._update_summary(data)
+        self.table.setSortingEnabled(True)
 
-        for i, row in enumerate(data):
+    def _append_rows(self, data):
+        start = self.table.rowCount()
+        self.table.setRowCount(start + len(data))
+        for i, row in enumerate(data, start=start):
             self.table.setItem(i, 0, QTableWidgetItem(row['student_name']))
             self.table.setItem(i, 1, QTableWidgetItem(row['class_name']))
             self.table.setItem(i, 2, QTableWidgetItem(row['instrument']))
@@ -142,14 +181,13 @@ class FinancialReportWindow(BaseSecondaryWindow):
             item_status.setTextAlignment(Qt.AlignCenter)
             self.table.setItem(i, 9, item_status)
 
-            total_tuition += row['tuition']
-            total_paid += row['paid_tuition']
-            total_debt += row['debt']
-
+    def _update_summary(self, data):
+        total_tuition = sum(row['tuition'] for row in data)
+        total_paid = sum(row['paid_tuition'] for row in data)
+        total_debt = sum(row['debt'] for row in data)
         self.summary_label.setText(
             f"تعداد ترم‌ها: {len(data)}   |   مجموع شهریه: {format_currency_with_unit(total_tuition)}   |   مجموع پرداخت: {format_currency_with_unit(total_paid)}   |   مجموع بدهی: {format_currency_with_unit(total_debt)}"
         )
-        self.filtered_data = data
 
     def apply_filters(self):
         name_filter = self.input_student_name.text().strip()
@@ -158,23 +196,20 @@ class FinancialReportWindow(BaseSecondaryWindow):
         from_date = self.date_from_picker.get_miladi_str()
         to_date = self.date_to_picker.get_miladi_str()
 
-        filtered = []
-        for row in self.all_data:
+        def matches(row):
             if name_filter and name_filter not in row['student_name']:
-                continue
+                return False
             if class_id and row['class_id'] != class_id:
-                continue
+                return False
             if status != "همه وضعیت‌ها" and row['status'] != status:
-                continue
+                return False
 
             term_start = row['start_date']
             term_end = row['end_date'] or "2100-01-01"
-            if not (term_start <= to_date and term_end >= from_date):
-                continue
-
-            filtered.append(row)
+            return term_start <= to_date and term_end >= from_date
 
-        self.populate_table(filtered)
+        self._row_filter = matches
+        self.populate_table([row for row in self.all_data if matches(row)])
 
     def reset_filters(self):
         self.input_student_name.clear()
@@ -184,6 +219,7 @@ class FinancialReportWindow(BaseSecondaryWindow):
         self.date_from_picker.setDate(QDate.currentDate().addMonths(-3))
         self.date_to_picker.setDate(QDate.currentDate())
 
+        self._row_filter = None
         self.populate_table(self.all_data)
 
     def export_to_excel(self):
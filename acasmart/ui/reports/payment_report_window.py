@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-    QTableWidget, QTableWidgetItem, QHeaderView, QLineEdit, QComboBox, QFileDialog, QMessageBox, QApplication
+    QTableView, QHeaderView, QLineEdit, QComboBox, QFileDialog, QMessageBox, QApplication
 )
 from PySide6.QtCore import Qt,Signal,QDate
 from PySide6.QtGui import QColor
@@ -11,17 +11,48 @@ import jdatetime
 from acasmart.ui.widgets.shamsi_date_popup import ShamsiDatePopup
 from acasmart.ui.widgets.shamsi_date_picker import ShamsiDatePicker
 from datetime import timedelta
-from acasmart.data.repos.payments_repo import fetch_payments, delete_payment
+from acasmart.data.repos.payments_repo import fetch_payments, fetch_payments_page, delete_payment
 from acasmart.data.repos.settings_repo import get_setting
 from acasmart.data.repos.classes_repo import fetch_classes
 from acasmart.core.utils import format_currency_with_unit
-from functools import partial
 from acasmart.ui.widgets.theme_manager import ThemeManager
 from acasmart.ui.widgets.base_secondary_window import BaseSecondaryWindow
+from acasmart.ui.widgets.table_models import ACTIONS_ROLE, RecordTableModel, ActionButtonsDelegate
+
+
+class PaymentTableModel(RecordTableModel):
+    """ردیف‌های fetch_payments_page: (id, student, class, amount, date, description, type, class_id)."""
+
+    headers = ("ID", "هنرجو", "کلاس", "مبلغ", "تاریخ پرداخت", "توضیحات", "نوع پرداخت", "عملیات")
+    COL_AMOUNT, COL_TYPE, COL_ACTIONS = 3, 6, 7
+    _ACTIONS = [
+        ("edit", "✏️ ویرایش", "secondary", True, None),
+        ("delete", "❌ حذف", "ghost", True, None),
+    ]
+    _TYPE_COLORS = {"tuition": QColor("#81C784"), "extra": QColor("#FFD54F")}
+
+    @staticmethod
+    def display_row(record):
+        """متن‌های نمایشیِ ۷ ستونِ داده (برای جدول و خروجی اکسل)."""
+        pid, sname, cname, amount, pdate, desc, ptype, _class_id = record
+        return (
+            str(pid), sname, cname, format_currency_with_unit(amount), str(pdate).replace("-", "/"),
+            desc or "", "شهریه" if ptype == 'tuition' else "مازاد",
+        )
+
+    def column_data(self, record, column, role):
+        if role == Qt.DisplayRole and column < self.COL_ACTIONS:
+            return self.display_row(record)[column]
+        if role == Qt.BackgroundRole and column == self.COL_TYPE:
+            return self._TYPE_COLORS["tuition" if record[6] == "tuition" else "extra"]
+        if role == ACTIONS_ROLE and column == self.COL_ACTIONS:
+            return self._ACTIONS
+        return None
 
 class PaymentReportWindow(BaseSecondaryWindow):
     payment_changed = Signal()  # سیگنال برای اعلام تغییرات پرداخت
     edit_requested = Signal(int)
+    PAGE_SIZE = 200  # ردیف‌های هر صفحه (keyset؛ fetch_payments_page)
     def __init__(self, student_id=None, class_id=None, return_target: QWidget | None = None):
         super().__init__("📊 گزارش پرداخت‌ها", return_target)
         self.resize(1300, 650)
@@ -87,16 +118,25 @@ class PaymentReportWindow(BaseSecondaryWindow):
         layout.addLayout(btn_layout)
 
         # --- جدول ---
-        self.table_payments = QTableWidget()
-        self.table_payments.setColumnCount(8)
-        self.table_payments.setHorizontalHeaderLabels(
-            ["ID", "هنرجو", "کلاس", "مبلغ", "تاریخ پرداخت", "توضیحات", "نوع پرداخت", "عملیات"]
-        )
+        # مدل/نما: ردیف‌ها به‌صورت داده، دکمه‌های عملیات با delegate (بدون ویجت برای هر ردیف)
+        self.model_payments = PaymentTableModel(self)
+        self.table_payments = QTableView()
+        self.table_payments.setModel(self.model_payments)
+        self.actions_delegate = ActionButtonsDelegate(self.table_payments)
+        self.actions_delegate.clicked.connect(self._on_row_action)
+        self.table_payments.setItemDelegateForColumn(PaymentTableModel.COL_ACTIONS, self.actions_delegate)
         self.table_payments.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.table_payments.verticalHeader().setVisible(False)
         self.table_payments.setAlternatingRowColors(True)
         layout.addWidget(self.table_payments)
 
+        self._next_cursor = None
+        self.btn_more = QPushButton("⬇️ نمایش موارد بیشتر")
+        self.btn_more.setProperty("variant", "secondary")
+        self.btn_more.setEnabled(False)
+        self.btn_more.clicked.connect(self.load_more_payments)
+        layout.addWidget(self.btn_more)
+
         # --- مجموع ---
         self.lbl_total_filtered = QLabel("مجموع پرداخت‌های نمایشی: 0 تومان")
         self.lbl_total_filtered.setStyleSheet("font-size:13px; color:green; margin-top:5px;")
@@ -105,7 +145,7 @@ class PaymentReportWindow(BaseSecondaryWindow):
         for w in (
             self.input_min_amount, self.input_max_amount, self.input_student_name, self.combo_class,
             self.input_keyword, self.combo_filter_ptype, self.date_from, self.date_to,
-            self.btn_clear, self.btn_export, self.table_payments, self.lbl_total_filtered,
+            self.btn_clear, self.btn_export, self.table_payments, self.btn_more, self.lbl_total_filtered,
         ):
             try:
                 ThemeManager.repolish(w)
@@ -124,110 +164,54 @@ class PaymentReportWindow(BaseSecondaryWindow):
 
         self.load_payments()
 
-    def load_payments(self):
-        date_from = self.date_from.selected_shamsi
-        date_to = self.date_to.selected_shamsi
+    def _filters(self):
+        """فیلترهای فعلیِ فرم به شکلِ آرگومان‌های fetch_payments / fetch_payments_page."""
         class_id = self.combo_class.currentData()
-        raw = fetch_payments(
+        if self.class_id and class_id and class_id != self.class_id:
+            class_id = -1  # دو فیلتر کلاسِ ناسازگار: هیچ نتیجه‌ای
+        return dict(
             student_id=self.student_id,
-            class_id=self.class_id,
-            date_from=date_from,
-            date_to=date_to
+            class_id=class_id or self.class_id,
+            date_from=self.date_from.selected_shamsi,
+            date_to=self.date_to.selected_shamsi,
+            min_amount=self._to_int(self.input_min_amount.text()),
+            max_amount=self._to_int(self.input_max_amount.text()),
+            student_name=self.input_student_name.text(),
+            keyword=self.input_keyword.text(),
+            payment_type={"شهریه": "tuition", "مازاد": "extra"}.get(self.combo_filter_ptype.currentText()),
         )
 
-        filtered = []
-        min_amt = self._to_int(self.input_min_amount.text())
-        max_amt = self._to_int(self.input_max_amount.text())
-        student_kw = self.input_student_name.text().strip().lower()
-
-        desc_kw = self.input_keyword.text().strip().lower()
-        sel_ptype = self.combo_filter_ptype.currentText()
-
-        # تاریخ فیلتر
-        date_from_g = jdatetime.date.fromisoformat(self.date_from.selected_shamsi).togregorian()
-        date_to_g = jdatetime.date.fromisoformat(self.date_to.selected_shamsi).togregorian()
-
-        for row in raw:
-            if len(row) < 7:
-                continue
-            pid, sname, cname, amount, pdate, desc, ptype, row_class_id = row
-            try:
-                pdate_j = jdatetime.date.fromisoformat(pdate)
-                pdate_g = pdate_j.togregorian()
-                jdate = pdate_j.strftime("%Y/%m/%d")
-            except:
-                        # اگر تاریخ پرداخت درست نبود، ردش کن
-                continue
-
-            if min_amt is not None and amount < min_amt: continue
-            if max_amt is not None and amount > max_amt: continue
-            if student_kw and student_kw not in sname.lower(): continue
-            if class_id and row_class_id != class_id:
-                continue
-            if desc_kw and (not desc or desc_kw not in desc.lower()): continue
-            if sel_ptype != "همه":
-                if sel_ptype == "شهریه" and ptype != 'tuition': continue
-                if sel_ptype == "مازاد" and ptype != 'extra': continue
-
-            if pdate_g < date_from_g or pdate_g > date_to_g:
-                continue
-
-            filtered.append((pid, sname, cname, amount, jdate, desc, "شهریه" if ptype == 'tuition' else "مازاد"))
-
-
-        total_displayed = sum([row[3] for row in filtered])
+    def load_payments(self):
+        # همهٔ فیلترها، تعداد و جمع در SQL؛ فقط صفحهٔ اول رسم می‌شود (بقیه با «بیشتر»)
+        page = fetch_payments_page(page_size=self.PAGE_SIZE, **self._filters())
         self.lbl_total_filtered.setText(
-            f"مجموع پرداخت‌های نمایشی: {format_currency_with_unit(total_displayed)} — تعداد: {len(filtered)} مورد"
+            f"مجموع پرداخت‌های نمایشی: {format_currency_with_unit(page['total_amount'])} — تعداد: {page['total_count']} مورد"
         )
+        self._append_page(page, reset=True)
 
-        self.table_payments.setRowCount(0)
-        for row_data in filtered:
-            row = self.table_payments.rowCount()
-            self.table_payments.insertRow(row)
-
-            # ستون‌های معمولی
-            for col, value in enumerate(row_data):
-                item = QTableWidgetItem(str(value))
-                 # ستون مبلغ (col == 3)
-                if col == 3:
-                    display_value = format_currency_with_unit(value)
-                else:
-                    display_value = str(value)
-
-                item = QTableWidgetItem(display_value)
-
-                if col == 6:  # نوع پرداخت
-                    if value == "مازاد":
-                        item.setBackground(QColor("#FFD54F"))
-                    else:
-                        item.setBackground(QColor("#81C784"))
-                self.table_payments.setItem(row, col, item)
-
-            # ستون عملیات
-            pid = row_data[0]
-            btn_delete = QPushButton("❌ حذف")
-            btn_delete.setProperty("variant", "ghost")
-            btn_delete.clicked.connect(partial(self.delete_payment, pid))
-
-            btn_edit = QPushButton("✏️ ویرایش")
-            btn_edit.setProperty("variant", "secondary")
-            btn_edit.clicked.connect(partial(self.edit_payment, pid))
-
-            op_layout = QHBoxLayout()
-            op_layout.addWidget(btn_edit)
-            op_layout.addWidget(btn_delete)
-            op_layout.setContentsMargins(0, 0, 0, 0)
-
-            # Repolish operation buttons
-            try:
-                ThemeManager.repolish(btn_delete)
-                ThemeManager.repolish(btn_edit)
-            except Exception:
-                pass
-
-            op_widget = QWidget()
-            op_widget.setLayout(op_layout)
-            self.table_payments.setCellWidget(row, 7, op_widget)
+    def load_more_payments(self):
+        if self._next_cursor is None:
+            return
+        page = fetch_payments_page(
+            page_size=self.PAGE_SIZE, after=self._next_cursor, with_totals=False, **self._filters()
+        )
+        self._append_page(page)
+
+    def _append_page(self, page, reset=False):
+        self._next_cursor = page["next_cursor"]
+        self.btn_more.setEnabled(self._next_cursor is not None)
+        if reset:
+            self.model_payments.set_records(page["rows"])
+        else:
+            self.model_payments.append_records(page["rows"])
+
+    def _on_row_action(self, row, key):
+        """کلیکِ دکمه‌های ستونِ «عملیات» (ActionButtonsDelegate)."""
+        pid = self.model_payments.record(row)[0]
+        if key == "edit":
+            self.edit_payment(pid)
+        elif key == "delete":
+            self.delete_payment(pid)
 
     def clear_filters(self):
         # پاک کردن فیلترهای متنی و انتخاب‌ها
@@ -256,20 +240,13 @@ class PaymentReportWindow(BaseSecondaryWindow):
             return None
 
     def export_to_excel(self):
-        row_count = self.table_payments.rowCount()
-        col_count = self.table_payments.columnCount()
-
-        if row_count == 0:
+        # همهٔ نتایجِ فیلتر (نه فقط صفحه‌های رسم‌شده)
+        rows = fetch_payments(**self._filters())
+        if not rows:
             return
 
-        data = []
-        headers = [self.table_payments.horizontalHeaderItem(col).text() for col in range(col_count)]
-        for row in range(row_count):
-            row_data = []
-            for col in range(col_count):
-                item = self.table_payments.item(row, col)
-                row_data.append(item.text() if item else "")
-            data.append(row_data)
+        headers = list(PaymentTableModel.headers[:PaymentTableModel.COL_ACTIONS])  # بدون ستون عملیات
+        data = [list(PaymentTableModel.display_row(row)) for row in rows]
 
         df = pd.DataFrame(data, columns=headers)
         filename = f"پرداخت‌ها_{jdatetime.date.today()}.xlsx"
@@ -1,6 +1,10 @@
 from __future__ import annotations
 
-from acasmart.data.repos.reports_repo import get_student_term_summary_rows
+from acasmart.data.repos.reports_repo import (
+    get_student_term_summary_page,
+    get_student_term_summary_rows,
+    count_student_term_summary_rows,
+)
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QTableWidget, QTableWidgetItem,
     QHeaderView, QHBoxLayout, QGridLayout, QLineEdit, QComboBox, QPushButton, QGroupBox, QFileDialog, QSizePolicy
@@ -15,9 +19,30 @@ from acasmart.ui.widgets.shamsi_date_popup import ShamsiDatePopup
 import openpyxl
 from acasmart.ui.widgets.theme_manager import ThemeManager
 from acasmart.ui.widgets.base_secondary_window import BaseSecondaryWindow
+from acasmart.ui.widgets.async_loader import AsyncLoader
+
+
+def _display_row(row_data):
+    """مقادیر نمایشیِ یک ردیف گزارش (جدول و اکسل).
+
+    row_data ساختار فعلی: [student_name, national_code, class_name, class_id, teacher_name, instrument,
+                           day, start_time, start_date, end_date, total, present, absent, ratio]
+    مقادیر قابل نمایش = همه‌ی فیلدها به‌جز class_id (طول = 13 ستون جدول، با هدرها مچ است).
+    """
+    display = tuple(row_data[:3]) + tuple(row_data[4:])
+    return [str(value if value is not None else "—") for value in display]
+
+
+def _fetch_page(limit, after, with_count, filters):
+    """(تعداد کل یا None, ردیف‌ها, مکان‌نمای بعدی) — در thread بارگذار اجرا می‌شود."""
+    total = count_student_term_summary_rows(**filters) if with_count else None
+    rows, next_after = get_student_term_summary_page(limit=limit, after=after, **filters)
+    return total, rows, next_after
 
 
 class StudentTermSummaryWindow(BaseSecondaryWindow):
+    PAGE_SIZE = 200
+
     def __init__(self, return_target: QWidget | None = None):
         super().__init__("گزارش کلی هنرجویان", return_target)
         self.setGeometry(300, 150, 1200, 600)
@@ -27,8 +52,24 @@ class StudentTermSummaryWindow(BaseSecondaryWindow):
         layout.addWidget(self.create_filter_box())
         layout.addWidget(self.create_table())
 
+        footer = QHBoxLayout()
         self.summary_label = QLabel("تعداد نتایج: ۰")
-        layout.addWidget(self.summary_label)
+        footer.addWidget(self.summary_label)
+        footer.addStretch(1)
+        self.btn_more = QPushButton("نمایش بیشتر")
+        self.btn_more.setProperty("variant", "secondary")
+        self.btn_more.clicked.connect(self.load_next_page)
+        footer.addWidget(self.btn_more)
+        layout.addLayout(footer)
+        ThemeManager.repolish(self.btn_more)
+
+        self._filters = {}
+        self._next_after = None
+        self._total = 0
+        # شمارش و صفحه‌ها در پس‌زمینه خوانده می‌شوند
+        self.loader = AsyncLoader(self)
+        self.loader.finished.connect(self._on_page_loaded)
+        self.loader.failed.connect(self._on_load_failed)
         self.load_filter_options()
         self.set_default_dates()
         self.load_data(apply_filters=False)
@@ -142,7 +183,7 @@ class StudentTermSummaryWindow(BaseSecondaryWindow):
 
     def load_data(self, apply_filters=False):
         if not apply_filters:
-            rows = get_student_term_summary_rows()
+            self._filters = {}
         else:
             student_name = self.input_student.text().strip()
             teacher_name = self.combo_teacher.currentText()
@@ -167,42 +208,53 @@ class StudentTermSummaryWindow(BaseSecondaryWindow):
             else:
                 term_status = ""
 
-            rows = get_student_term_summary_rows(
+            self._filters = dict(
                 student_name=student_name,
                 teacher_name=teacher_name,
                 class_name=class_name,
-                class_id=class_id, 
+                class_id=class_id,
                 instrument_name=instrument_name,
                 day=day,
                 date_from=date_from,
                 date_to=date_to,
                 term_status=term_status
             )
-        self.table.setSortingEnabled(False)
-        self.table.setRowCount(len(rows))
-        for row_idx, row_data in enumerate(rows):
-            # row_data ساختار فعلی: [student_name, national_code, class_name, class_id, teacher_name, instrument,
-            #                        day, start_time, start_date, end_date, total, present, absent, ratio]
-            class_id = row_data[3]
 
-            # مقادیر قابل نمایش = همه‌ی فیلدها به‌جز class_id
-            display = row_data[:3] + row_data[4:]  # طول = 13 ستون جدول (با هدرها مچ است)
-
-            for col_idx, value in enumerate(display):
-                item = QTableWidgetItem(str(value if value is not None else "—"))
+        # صفحه‌بندی: فقط صفحهٔ اول خوانده می‌شود؛ بقیه با «نمایش بیشتر»
+        self._next_after = None
+        self.table.setRowCount(0)
+        self.btn_more.setEnabled(False)
+        self.summary_label.setText("در حال بارگذاری…")
+        self.loader.load(_fetch_page, self.PAGE_SIZE, None, True, dict(self._filters))
+
+    def load_next_page(self):
+        if self._next_after is not None and not self.loader.is_running():
+            self.btn_more.setEnabled(False)
+            self.loader.load(_fetch_page, self.PAGE_SIZE, self._next_after, False, dict(self._filters))
+
+    def _on_page_loaded(self, result):
+        total, rows, self._next_after = result
+        if total is not None:
+            self._total = total
+        self._append_page(rows)
+
+    def _on_load_failed(self, message):
+        self.btn_more.setEnabled(self._next_after is not None)
+        self.summary_label.setText(f"خطا در بارگذاری گزارش: {message}")
+
+    def _append_page(self, rows):
+        self.table.setSortingEnabled(False)
+        start = self.table.rowCount()
+        self.table.setRowCount(start + len(rows))
+        for row_idx, row_data in enumerate(rows, start=start):
+            for col_idx, value in enumerate(_display_row(row_data)):
+                item = QTableWidgetItem(value)
                 item.setTextAlignment(Qt.AlignCenter)
                 self.table.setItem(row_idx, col_idx, item)
 
-            # ذخیره‌ی class_id روی سلول «نام کلاس» (ستون 2)
-            row = self.table.currentRow()
-            if row >= 0:
-                cls_id = self.table.item(row, 2).data(Qt.UserRole)
-                index = self.combo_class.findData(cls_id)
-                if index >= 0:
-                    self.combo_class.setCurrentIndex(index)
-        
         self.table.setSortingEnabled(True)
-        self.summary_label.setText(f"تعداد نتایج: {len(rows)}")
+        self.btn_more.setEnabled(self._next_after is not None)
+        self.summary_label.setText(f"تعداد نتایج: {self.table.rowCount()} از {self._total}")
 
     def load_filter_options(self):
         self.combo_teacher.addItems([t[1] for t in fetch_teachers_simple()])
@@ -248,10 +300,10 @@ class StudentTermSummaryWindow(BaseSecondaryWindow):
             if header:
                 ws.cell(row=1, column=col + 1, value=header.text())
 
-        for row in range(self.table.rowCount()):
-            for col in range(self.table.columnCount()):
-                item = self.table.item(row, col)
-                if item:
-                    ws.cell(row=row + 2, column=col + 1, value=item.text())
+        # همهٔ نتایجِ فیلترِ فعال (نه فقط صفحه‌های بارگذاری‌شده در جدول)
+        rows = get_student_term_summary_rows(**self._filters)
+        for row_idx, row_data in enumerate(rows, start=2):
+            for col_idx, value in enumerate(_display_row(row_data), start=1):
+                ws.cell(row=row_idx, column=col_idx, value=value)
 
         wb.save(file_path)
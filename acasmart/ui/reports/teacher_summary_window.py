@@ -11,6 +11,7 @@ import openpyxl
 import jdatetime
 from acasmart.ui.widgets.theme_manager import ThemeManager
 from acasmart.ui.widgets.base_secondary_window import BaseSecondaryWindow
+from acasmart.ui.widgets.async_loader import AsyncLoader
 
 
 class TeacherSummaryWindow(BaseSecondaryWindow):
@@ -33,6 +34,12 @@ class TeacherSummaryWindow(BaseSecondaryWindow):
 
         self.summary_label = QLabel()
         layout.addWidget(self.summary_label)
+
+        # ردیف‌ها در پس‌زمینه خوانده و تکه‌تکه به جدول اضافه می‌شوند
+        self.loader = AsyncLoader(self)
+        self.loader.chunk_ready.connect(self._on_rows_loaded)
+        self.loader.finished.connect(self._on_load_finished)
+        self.loader.failed.connect(self._on_load_failed)
         # Apply QSS
         for w in (self.table, self.summary_label):
             try:
@@ -93,8 +100,7 @@ class TeacherSummaryWindow(BaseSecondaryWindow):
         self.combo_teacher.addItems([t[1] for t in fetch_teachers_simple()])
 
     def load_data(self, apply_filters=False):
-        rows = get_teacher_summary_rows()
-
+        teacher_name = selected_day = ""
         if apply_filters:
             teacher_name = self.combo_teacher.currentText()
             if teacher_name == "همه":
@@ -103,24 +109,35 @@ class TeacherSummaryWindow(BaseSecondaryWindow):
             selected_day = self.combo_day.currentText()
             if selected_day == "همه":
                 selected_day = ""
-
-            filtered = []
-            for row in rows:
-                match_teacher = teacher_name in row[0] if teacher_name else True
-                match_day = selected_day in row[8] if selected_day else True
-
-                if match_teacher and match_day:
-                    filtered.append(row)
-            rows = filtered
-
-        self.table.setRowCount(len(rows))
-        for row_idx, row_data in enumerate(rows):
+        self._row_filter = (teacher_name, selected_day)
+
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(0)
+        self.summary_label.setText("در حال بارگذاری…")
+        self.loader.stream(get_teacher_summary_rows)
+
+    def _on_rows_loaded(self, rows):
+        teacher_name, selected_day = self._row_filter
+        rows = [
+            row for row in rows
+            if (not teacher_name or teacher_name in row[0])
+            and (not selected_day or selected_day in (row[8] or ""))
+        ]
+        start = self.table.rowCount()
+        self.table.setRowCount(start + len(rows))
+        for row_idx, row_data in enumerate(rows, start=start):
             for col_idx, value in enumerate(row_data):
                 item = QTableWidgetItem(str(value) if value else "—")
                 item.setTextAlignment(Qt.AlignCenter)
                 self.table.setItem(row_idx, col_idx, item)
+        self.summary_label.setText(f"در حال بارگذاری… {self.table.rowCount()} استاد")
+
+    def _on_load_finished(self, _count):
+        self.table.setSortingEnabled(True)
+        self.summary_label.setText(f"تعداد اساتید: {self.table.rowCount()}")
 
-        self.summary_label.setText(f"تعداد اساتید: {len(rows)}")
+    def _on_load_failed(self, message):
+        self.summary_label.setText(f"خطا در بارگذاری گزارش: {message}")
 
     def clear_filters(self):
         self.combo_teacher.setCurrentIndex(0)
@@ -0,0 +1,164 @@
+"""
+بارگذاری داده در پس‌زمینه برای پنجره‌های گزارش (QThreadPool + QRunnable).
+
+    loader = AsyncLoader(self)
+    loader.chunk_ready.connect(self._on_rows)     # list از ردیف‌ها، تکه‌تکه
+    loader.progress.connect(self._on_progress)    # (تعداد خوانده‌شده، کل یا -1)
+    loader.finished.connect(self._on_loaded)      # نتیجهٔ load() / تعداد ردیف‌های stream()
+    loader.failed.connect(self._on_failed)        # متن خطا
+    loader.stream(iter_student_terms_with_financials)
+
+- load(fn, ...): fn در thread کارگر اجرا و نتیجه‌اش یک‌جا با finished برمی‌گردد.
+- stream(fn, ...): خروجیِ fn (لیست یا generator) تکه‌های chunk_size ردیفی می‌شود و هر تکه
+  همان لحظه به نما می‌رسد؛ finished تعداد کل را می‌دهد.
+- هر load/stream جدید کار قبلی را لغو می‌کند؛ cancel() (و بسته‌شدنِ پنجرهٔ والد) هم. سیگنال‌های
+  کارِ لغوشده یا قدیمی نادیده گرفته می‌شوند، پس نما هرگز داده‌ی فیلترِ قبلی را نمی‌گیرد.
+
+سیاستِ اتصال: کارگرها از pool اتصالِ thread خودشان (data/db.get_connection) استفاده می‌کنند و
+هیچ اتصالی با thread رابط کاربری شریک نمی‌شود؛ در پایان هر کار اتصال‌های بیکارِ همان thread
+بسته می‌شوند (release_thread_connections)، چون QThreadPool thread های بیکار را بازنشسته می‌کند.
+همهٔ loader ها یک QThreadPool اختصاصی با LOADER_THREADS کارگر دارند (WAL: خواندن‌ها هم‌زمان با
+نوشتنِ رابط کاربری).
+"""
+import threading
+import traceback
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+from acasmart.data.db import release_thread_connections
+
+LOADER_THREADS = 2
+
+_pool = None
+
+
+def _loader_pool():
+    global _pool
+    if _pool is None:
+        _pool = QThreadPool()
+        _pool.setMaxThreadCount(LOADER_THREADS)
+    return _pool
+
+
+class _TaskSignals(QObject):
+    """سیگنال‌های یک کار؛ token کارِ فرستنده را مشخص می‌کند."""
+    chunk = Signal(int, object)
+    progress = Signal(int, int, int)
+    done = Signal(int, object)
+    error = Signal(int, str)
+
+
+class _LoadTask(QRunnable):
+    def __init__(self, token, fn, args, kwargs, stream, chunk_size, cancelled):
+        super().__init__()
+        self.token = token
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.cancelled = cancelled
+        self.signals = _TaskSignals()
+
+    def run(self):
+        result = None
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+            if not self.stream:
+                if not self.cancelled.is_set():
+                    self.signals.done.emit(self.token, result)
+                return
+            total = len(result) if hasattr(result, "__len__") else -1
+            done = 0
+            chunk = []
+            for row in result:
+                if self.cancelled.is_set():
+                    return
+                chunk.append(row)
+                if len(chunk) >= self.chunk_size:
+                    done += len(chunk)
+                    self.signals.chunk.emit(self.token, chunk)
+                    self.signals.progress.emit(self.token, done, total)
+                    chunk = []
+            if self.cancelled.is_set():
+                return
+            if chunk:
+                done += len(chunk)
+                self.signals.chunk.emit(self.token, chunk)
+                self.signals.progress.emit(self.token, done, total)
+            self.signals.done.emit(self.token, done)
+        except Exception as e:
+            traceback.print_exc()
+            if not self.cancelled.is_set():
+                self.signals.error.emit(self.token, str(e))
+        finally:
+            if self.stream and hasattr(result, "close"):
+                result.close()  # generator نیمه‌کاره (لغو/خطا): اتصالش همین‌جا برگردد
+            release_thread_connections()
+
+
+class AsyncLoader(QObject):
+    """یک بارگذارِ پس‌زمینه به ازای هر نما؛ فقط آخرین کار به سیگنال‌ها می‌رسد."""
+
+    chunk_ready = Signal(object)
+    progress = Signal(int, int)
+    finished = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self, parent=None, chunk_size=200):
+        super().__init__(parent)
+        self.chunk_size = chunk_size
+        self._token = 0
+        self._cancelled = None
+        self._running = False
+        self._task = None  # مرجعِ کارِ جاری (تا wrapper پایتونی‌اش زودتر جمع نشود)
+        if parent is not None:
+            parent.destroyed.connect(self.cancel)
+
+    def is_running(self):
+        return self._running
+
+    def load(self, fn, *args, **kwargs):
+        """fn(*args, **kwargs) را در پس‌زمینه اجرا کن؛ نتیجه با finished(result)."""
+        self._start(fn, args, kwargs, stream=False)
+
+    def stream(self, fn, *args, **kwargs):
+        """ردیف‌های fn(...) را تکه‌تکه با chunk_ready بفرست؛ در پایان finished(تعداد)."""
+        self._start(fn, args, kwargs, stream=True)
+
+    def cancel(self):
+        if self._cancelled is not None:
+            self._cancelled.set()
+        self._token += 1
+        self._running = False
+
+    def _start(self, fn, args, kwargs, stream):
+        self.cancel()
+        self._cancelled = threading.Event()
+        self._running = True
+        task = _LoadTask(self._token, fn, args, kwargs, stream, self.chunk_size, self._cancelled)
+        task.signals.chunk.connect(self._on_chunk)
+        task.signals.progress.connect(self._on_progress)
+        task.signals.done.connect(self._on_done)
+        task.signals.error.connect(self._on_error)
+        self._task = task
+        _loader_pool().start(task)
+
+    # --- در thread رابط کاربری (اتصال صف‌دار) ---
+    def _on_chunk(self, token, rows):
+        if token == self._token:
+            self.chunk_ready.emit(rows)
+
+    def _on_progress(self, token, done, total):
+        if token == self._token:
+            self.progress.emit(done, total)
+
+    def _on_done(self, token, result):
+        if token == self._token:
+            self._running = False
+            self.finished.emit(result)
+
+    def _on_error(self, token, message):
+        if token == self._token:
+            self._running = False
+            self.failed.emit(message)
@@ -9,7 +9,7 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QShortcut, QKeySequence
 
-from acasmart.core.fa_collation import sort_records_fa, contains_fa, nd
+from acasmart.data.repos.search_repo import search_students_with_teachers, DISPLAY_LIMIT
 from acasmart.ui.widgets.theme_manager import ThemeManager
 
 
@@ -60,32 +60,14 @@ class PaymentStudentPickerPopup(QDialog):
         self._search()
 
     def _search(self):
-        raw = self.input_search.text().strip()
-        q_name_or_teacher = raw
-        q_code = nd(raw)
+        # نام هنرجو / نام استاد / کد ملی از ایندکس FTS (search_repo)، با سقف نمایش؛ خالی یعنی همه
+        text = self.input_search.text()
+        if text.strip():
+            rows = search_students_with_teachers(text, limit=DISPLAY_LIMIT)
+        else:
+            rows = [row[:4] for row in self.students_data if len(row) >= 4]
         self.list_results.clear()
-        if not raw:
-            for row in self.students_data:
-                if len(row) < 4:
-                    continue
-                sid, national_code, name, teacher = row[:4]
-                item = QListWidgetItem(f"{name} (استاد: {teacher})")
-                item.setData(Qt.UserRole, (sid, name, teacher))
-                self.list_results.addItem(item)
-            return
-        filtered = []
-        for row in self.students_data:
-            if len(row) < 4:
-                continue
-            sid, national_code, name, teacher = row[:4]
-            if (
-                contains_fa(name, q_name_or_teacher)
-                or contains_fa(teacher, q_name_or_teacher)
-                or (q_code and q_code in nd(national_code))
-            ):
-                filtered.append((sid, national_code, name, teacher))
-        filtered = sort_records_fa(filtered, name_index=2, tiebreak_index=1)
-        for sid, national_code, name, teacher in filtered:
+        for sid, national_code, name, teacher in rows:
             item = QListWidgetItem(f"{name} (استاد: {teacher})")
             item.setData(Qt.UserRole, (sid, name, teacher))
             self.list_results.addItem(item)
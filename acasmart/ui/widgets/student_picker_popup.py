@@ -9,7 +9,8 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QShortcut, QKeySequence
 
-from acasmart.core.fa_collation import sort_records_fa, contains_fa, nd, fa_digits
+from acasmart.core.fa_collation import fa_digits
+from acasmart.data.repos.search_repo import search_students_with_teachers, DISPLAY_LIMIT
 from acasmart.ui.widgets.theme_manager import ThemeManager
 
 
@@ -60,20 +61,14 @@ class StudentPickerPopup(QDialog):
         self._search()
 
     def _search(self):
-        raw = self.input_search.text().strip()
-        q_name = raw
-        q_code = nd(raw)
+        # نام هنرجو / نام استاد / کد ملی از ایندکس FTS (search_repo)، با سقف نمایش
+        text = self.input_search.text()
+        if text.strip():
+            rows = search_students_with_teachers(text, limit=DISPLAY_LIMIT)
+        else:
+            rows = self.students_data
         self.list_results.clear()
-        filtered = []
-        for sid, national_code, name, teacher in self.students_data:
-            if (
-                contains_fa(name, q_name)
-                or contains_fa(teacher, q_name)
-                or (q_code and q_code in nd(national_code))
-            ):
-                filtered.append((sid, national_code, name, teacher))
-        filtered = sort_records_fa(filtered, name_index=2, tiebreak_index=1)
-        for sid, national_code, name, teacher in filtered:
+        for sid, national_code, name, teacher in rows:
             count = self.session_counts.get(sid, 0)
             count_fa = fa_digits(count) or "۰"  # fa_digits(0) returns '' — show ۰ explicitly
             item = QListWidgetItem(f"{name} (استاد: {teacher}) — {count_fa} ترم فعال")
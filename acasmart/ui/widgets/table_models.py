@@ -0,0 +1,224 @@
+"""
+لایهٔ مدل/نمای مشترک برای جدول‌های بزرگ (حضور و غیاب، گزارش پرداخت‌ها).
+
+به‌جای QTableWidget و ساختنِ QWidget + layout + چند QPushButton برای هر ردیف:
+- RecordTableModel ردیف‌ها را به‌صورت داده (tuple/dict) نگه می‌دارد و data() را فقط برای
+  سلول‌های دیده‌شده صدا می‌زند؛ بارگذاری مجدد یک reset مدل است.
+- CheckBoxDelegate چک‌باکسِ ستون‌های Qt.CheckStateRole را وسط سلول رسم و با کلیک/Space عوض می‌کند.
+- ActionButtonsDelegate دکمه‌های عملیاتِ هر ردیف (ACTIONS_ROLE) را با رنگ‌های تم رسم می‌کند و
+  کلیک را به‌صورت سیگنالِ clicked(row, key) می‌فرستد.
+حافظه و زمانِ رسم به تعداد ردیف‌های قابل‌مشاهده بستگی دارد، نه به کل ردیف‌ها.
+"""
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QRect, QEvent, QSize, Signal
+from PySide6.QtGui import QColor, QPainter, QPen
+from PySide6.QtWidgets import (
+    QApplication, QStyle, QStyledItemDelegate, QStyleOptionButton, QStyleOptionViewItem, QToolTip,
+)
+
+from acasmart.ui.widgets.theme_manager import ThemeManager
+
+# نقشِ ستونِ عملیات: لیست (key, label, variant, enabled, tooltip)
+ACTIONS_ROLE = Qt.UserRole + 1
+
+
+class RecordTableModel(QAbstractTableModel):
+    """مدل جدولیِ فقط‌خواندنی روی لیستی از رکوردها؛ زیرکلاس‌ها column_data را پیاده می‌کنند."""
+
+    headers = ()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._records = []
+
+    # --- Qt API ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._records)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal and 0 <= section < len(self.headers):
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not (0 <= index.row() < len(self._records)):
+            return None
+        return self.column_data(self._records[index.row()], index.column(), role)
+
+    # --- برای زیرکلاس‌ها ---
+    def column_data(self, record, column, role):
+        """مقدارِ سلول (column) از رکورد برای role؛ None یعنی بدون داده."""
+        return None
+
+    # --- داده ---
+    def record(self, row):
+        return self._records[row]
+
+    def records(self):
+        return list(self._records)
+
+    def set_records(self, records):
+        """جایگزینیِ همهٔ ردیف‌ها (یک reset مدل، بدون ساخت/حذف ویجت)."""
+        self.beginResetModel()
+        self._records = list(records)
+        self.endResetModel()
+
+    def append_records(self, records):
+        """افزودن ردیف‌ها به انتها (مثلاً صفحهٔ بعدیِ keyset)."""
+        records = list(records)
+        if not records:
+            return
+        first = len(self._records)
+        self.beginInsertRows(QModelIndex(), first, first + len(records) - 1)
+        self._records.extend(records)
+        self.endInsertRows()
+
+    def refresh_row(self, row):
+        """اعلام تغییرِ رکوردِ row به نماها (بعد از تغییرِ درجا)."""
+        self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+
+
+def _style_of(option):
+    widget = option.widget
+    return widget.style() if widget is not None else QApplication.style()
+
+
+def _draw_cell_panel(delegate, painter, option, index):
+    """پس‌زمینه/انتخابِ سلول بدون متن (زیرِ چک‌باکس یا دکمه‌ها)."""
+    opt = QStyleOptionViewItem(option)
+    delegate.initStyleOption(opt, index)
+    opt.text = ""
+    opt.features &= ~QStyleOptionViewItem.HasCheckIndicator
+    _style_of(option).drawControl(QStyle.CE_ItemViewItem, opt, painter, option.widget)
+
+
+class CheckBoxDelegate(QStyledItemDelegate):
+    """چک‌باکسِ وسط‌چین برای ستونی که Qt.CheckStateRole دارد؛ بدون ویجت به ازای هر ردیف."""
+
+    def _indicator_rect(self, option):
+        style = _style_of(option)
+        w = style.pixelMetric(QStyle.PM_IndicatorWidth, None, option.widget)
+        h = style.pixelMetric(QStyle.PM_IndicatorHeight, None, option.widget)
+        r = option.rect
+        return QRect(r.x() + (r.width() - w) // 2, r.y() + (r.height() - h) // 2, w, h)
+
+    def paint(self, painter, option, index):
+        _draw_cell_panel(self, painter, option, index)
+        state = index.data(Qt.CheckStateRole)
+        if state is None:
+            return
+        opt = QStyleOptionButton()
+        opt.rect = self._indicator_rect(option)
+        checked = Qt.CheckState(state) == Qt.Checked
+        opt.state = QStyle.State_On if checked else QStyle.State_Off
+        if index.flags() & Qt.ItemIsEnabled:
+            opt.state |= QStyle.State_Enabled
+        _style_of(option).drawPrimitive(QStyle.PE_IndicatorCheckBox, opt, painter, option.widget)
+
+    def editorEvent(self, event, model, option, index):
+        flags = index.flags()
+        if not (flags & Qt.ItemIsUserCheckable) or not (flags & Qt.ItemIsEnabled):
+            return False
+        if event.type() == QEvent.MouseButtonRelease:
+            if event.button() != Qt.LeftButton or not option.rect.contains(event.position().toPoint()):
+                return False
+        elif event.type() == QEvent.MouseButtonDblClick:
+            return True  # دوبار کلیک را مصرف کن تا دوبار تغییر نکند
+        elif event.type() == QEvent.KeyPress:
+            if event.key() not in (Qt.Key_Space, Qt.Key_Select):
+                return False
+        else:
+            return False
+        checked = Qt.CheckState(index.data(Qt.CheckStateRole)) == Qt.Checked
+        return model.setData(index, Qt.Unchecked if checked else Qt.Checked, Qt.CheckStateRole)
+
+
+class ActionButtonsDelegate(QStyledItemDelegate):
+    """دکمه‌های عملیاتِ ردیف (از ACTIONS_ROLE) را رسم می‌کند؛ کلیک → clicked(row, key)."""
+
+    clicked = Signal(int, str)
+
+    _SPACING = 6
+    _PADDING = 10
+    _RADIUS = 6
+
+    def _button_rects(self, option, actions):
+        fm = option.fontMetrics
+        height = min(option.rect.height() - 4, fm.height() + 10)
+        widths = [fm.horizontalAdvance(a[1]) + 2 * self._PADDING for a in actions]
+        total = sum(widths) + self._SPACING * max(0, len(widths) - 1)
+        x = option.rect.x() + max(0, (option.rect.width() - total) // 2)
+        y = option.rect.y() + (option.rect.height() - height) // 2
+        rects = []
+        for w in widths:
+            rects.append(QRect(x, y, w, height))
+            x += w + self._SPACING
+        if option.direction == Qt.RightToLeft:
+            rects.reverse()  # اولین دکمه سمت راست
+        return list(zip(rects, actions))
+
+    @staticmethod
+    def _colors(variant, enabled):
+        """(پس‌زمینه, متن, حاشیه) از توکن‌های تم، هم‌خوان با QPushButton[variant=...]."""
+        t = ThemeManager.tokens()
+        if not enabled:
+            return t["border"], t["muted"], None
+        if variant == "primary":
+            return t["primary"], t["onPrimary"], None
+        if variant == "danger":
+            return t["error"], "#FFFFFF", None
+        if variant == "ghost":
+            return None, t["text"], t["border"]
+        return t["surface"], t["text"], t["border"]  # secondary
+
+    def paint(self, painter, option, index):
+        _draw_cell_panel(self, painter, option, index)
+        actions = index.data(ACTIONS_ROLE) or []
+        if not actions:
+            return
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        for rect, (_key, label, variant, enabled, _tip) in self._button_rects(option, actions):
+            bg, fg, border = self._colors(variant, enabled)
+            painter.setPen(QPen(QColor(border)) if border else Qt.NoPen)
+            painter.setBrush(QColor(bg) if bg else Qt.NoBrush)
+            painter.drawRoundedRect(rect.adjusted(0, 0, -1, -1), self._RADIUS, self._RADIUS)
+            painter.setPen(QColor(fg))
+            painter.drawText(rect, Qt.AlignCenter, label)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        actions = index.data(ACTIONS_ROLE) or []
+        fm = option.fontMetrics
+        width = sum(fm.horizontalAdvance(a[1]) + 2 * self._PADDING for a in actions)
+        width += self._SPACING * (max(0, len(actions) - 1) + 2)
+        return QSize(width, fm.height() + 14)
+
+    def _hit(self, option, index, pos):
+        for rect, action in self._button_rects(option, index.data(ACTIONS_ROLE) or []):
+            if rect.contains(pos):
+                return action
+        return None
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() in (QEvent.MouseButtonPress, QEvent.MouseButtonDblClick):
+            # فشردن روی دکمه، ردیف را انتخاب/ویرایش نکند
+            return self._hit(option, index, event.position().toPoint()) is not None
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            action = self._hit(option, index, event.position().toPoint())
+            if action is not None:
+                key, _label, _variant, enabled, _tip = action
+                if enabled:
+                    self.clicked.emit(index.row(), key)
+                return True
+        return False
+
+    def helpEvent(self, event, view, option, index):
+        if event.type() == QEvent.ToolTip:
+            action = self._hit(option, index, event.pos())
+            if action is not None and action[4]:
+                QToolTip.showText(event.globalPos(), action[4], view)
+                return True
+        return super().helpEvent(event, view, option, index)
@@ -2,42 +2,101 @@ from __future__ import annotations
 
 from acasmart.data.repos.attendance_repo import (
     count_attendance,
-    fetch_attendance_status_by_date,
     insert_attendance_with_date,
-    count_attendance_by_term,
     delete_attendance,
     count_present_attendance_for_term,
+    save_attendance_batch,
 )
 from acasmart.data.repos.settings_repo import get_setting_bool
-from acasmart.data.repos.terms_repo import get_term_dates, recalc_term_end_by_id
+from acasmart.data.repos.terms_repo import recalc_term_end_by_id
 from acasmart.data.repos.sessions_repo import (
-    fetch_scheduled_students_for_class_on_date,
+    fetch_attendance_roster,
 )
 from acasmart.data.repos.classes_repo import fetch_classes_on_weekday
 from acasmart.data.repos.notifications_repo import (
-    has_renew_sms_been_sent,
-    mark_renew_sms_sent,
     clear_renew_sms_sent,
 )
-from acasmart.data.repos.reports_repo import get_class_and_teacher_name
-from acasmart.data.repos.profiles_repo import get_term_config
+from acasmart.data.repos.sms_outbox_repo import enqueue_renewal_sms
 from acasmart.data.repos.students_repo import get_student_contact
 
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox,
-    QPushButton, QTableWidget, QTableWidgetItem, QHeaderView,
+    QPushButton, QTableView, QHeaderView,
     QMessageBox, QCheckBox, QDialog, QInputDialog
 )
-from PySide6.QtCore import Qt
-import functools
+from PySide6.QtCore import Qt, QObject, Signal, QTimer
 import sqlite3
 import jdatetime
 
 from acasmart.ui.widgets.shamsi_date_popup import ShamsiDatePopup
-from acasmart.services.sms_notifier import SmsNotifier, SmsStatus
+from acasmart.services.sms_notifier import SmsStatus
+from acasmart.services.sms_dispatcher import get_dispatcher
 
 from acasmart.ui.widgets.theme_manager import ThemeManager
 from acasmart.ui.widgets.base_secondary_window import BaseSecondaryWindow
+from acasmart.ui.widgets.table_models import (
+    ACTIONS_ROLE, RecordTableModel, CheckBoxDelegate, ActionButtonsDelegate,
+)
+
+
+class AttendanceRosterModel(RecordTableModel):
+    """ردیف‌های حضور و غیابِ یک کلاس در یک تاریخ؛ هر رکورد یک dict (از _roster_record).
+
+    ستون‌های «حاضر»/«غائب» دو حالتِ یک فیلد (mark) هستند، پس انحصارِ متقابل در خودِ مدل است.
+    """
+
+    headers = ("نام هنرجو", "ساعت", "حاضر", "غائب", "عملیات")
+    COL_NAME, COL_TIME, COL_PRESENT, COL_ABSENT, COL_ACTIONS = range(5)
+    _MARK_OF_COLUMN = {COL_PRESENT: "present", COL_ABSENT: "absent"}
+
+    def column_data(self, record, column, role):
+        if role == Qt.DisplayRole:
+            if column == self.COL_NAME:
+                return record["display_name"]
+            if column == self.COL_TIME:
+                return record["start_time"]
+        elif role == Qt.ToolTipRole and column == self.COL_NAME:
+            return record["tooltip"]
+        elif role == Qt.CheckStateRole and column in self._MARK_OF_COLUMN:
+            return Qt.Checked if record["mark"] == self._MARK_OF_COLUMN[column] else Qt.Unchecked
+        elif role == ACTIONS_ROLE and column == self.COL_ACTIONS:
+            return record["actions"]
+        elif role == Qt.TextAlignmentRole and column != self.COL_NAME:
+            return int(Qt.AlignCenter)
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        if index.column() in self._MARK_OF_COLUMN:
+            if self.record(index.row())["locked"]:
+                return Qt.NoItemFlags  # جلسهٔ لغوشده / ترمِ پر: قابل علامت‌گذاری نیست
+            return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        mark = self._MARK_OF_COLUMN.get(index.column())
+        if role != Qt.CheckStateRole or mark is None or not (self.flags(index) & Qt.ItemIsUserCheckable):
+            return False
+        record = self.record(index.row())
+        if Qt.CheckState(value) == Qt.Checked:
+            record["mark"] = mark
+        elif record["mark"] == mark:
+            record["mark"] = None
+        self.dataChanged.emit(
+            self.index(index.row(), self.COL_PRESENT), self.index(index.row(), self.COL_ABSENT),
+            [Qt.CheckStateRole],
+        )
+        return True
+
+    def marks(self):
+        """[(student_id, term_id, 'present'/'absent'), ...] برای ردیف‌های علامت‌خورده."""
+        return [(r["student_id"], r["term_id"], r["mark"]) for r in self._records if r["mark"]]
+
+class _SmsEvents(QObject):
+    """پل نتیجه‌های dispatcher (thread پس‌زمینه) به thread رابط کاربری."""
+    finished = Signal(int, int, str)  # student_id, term_id, SmsStatus.value
+
 
 class AttendanceManager(BaseSecondaryWindow):
     def __init__(self, return_target: QWidget | None = None):
@@ -47,7 +106,24 @@ class AttendanceManager(BaseSecondaryWindow):
         self.selected_class_id = None
         self.last_selected_date = jdatetime.date.today().isoformat()  # "1403-02-31"
 
-        self.notifier = SmsNotifier()
+        # پیامک‌ها در sms_outbox صف و در پس‌زمینه ارسال می‌شوند؛ نتیجه با سیگنال برمی‌گردد
+        self.sms_dispatcher = get_dispatcher()
+        self.sms_events = _SmsEvents(self)
+        self.sms_events.finished.connect(self._on_sms_finished)
+        events = self.sms_events
+        # نتیجه‌های یک دسته پشت‌سرهم می‌رسند: یک بازخوانی و یک پیام خلاصه، نه یکی برای هر پیامک
+        self._sms_failed_names = []
+        self._sms_sent_count = 0
+        self._sms_refresh_timer = QTimer(self)
+        self._sms_refresh_timer.setSingleShot(True)
+        self._sms_refresh_timer.setInterval(300)
+        self._sms_refresh_timer.timeout.connect(self._show_sms_results)
+
+        def _listener(_outbox_id, student_id, term_id, status):
+            events.finished.emit(student_id, term_id, status.value)
+
+        self.sms_dispatcher.add_listener(_listener)
+        self.destroyed.connect(lambda *_: self.sms_dispatcher.remove_listener(_listener))
         # Model-B: دیگر رکوردِ جلسه‌ای ساخته نمی‌شود؛ پاک‌سازیِ جلساتِ منقضی لازم نیست.
 
 
@@ -89,13 +165,18 @@ class AttendanceManager(BaseSecondaryWindow):
         layout.addWidget(self.chk_show_completed)
 
         # --------- جدول حضور ----------
-        # جدول حضور: ID مخفی، نام هنرجو، چک‌باکس حاضر، چک‌باکس غائب
-        self.table = QTableWidget()
+        # مدل/نما: شناسه‌ها داخل رکوردها هستند؛ چک‌باکس‌ها و دکمه‌ها را delegate ها رسم می‌کنند
+        self.model = AttendanceRosterModel(self)
+        self.table = QTableView()
         self.table.setObjectName("AttendanceTable")
-        self.table.setColumnCount(7)
-        self.table.setHorizontalHeaderLabels(["ID", "نام هنرجو", "ساعت", "حاضر", "غائب", "term_id", "عملیات"])
-        self.table.setColumnHidden(0, True)
-        self.table.setColumnHidden(5, True)
+        self.table.setModel(self.model)
+        check_delegate = CheckBoxDelegate(self.table)
+        self.table.setItemDelegateForColumn(AttendanceRosterModel.COL_PRESENT, check_delegate)
+        self.table.setItemDelegateForColumn(AttendanceRosterModel.COL_ABSENT, check_delegate)
+        self.actions_delegate = ActionButtonsDelegate(self.table)
+        self.actions_delegate.clicked.connect(self._on_row_action)
+        self.table.setItemDelegateForColumn(AttendanceRosterModel.COL_ACTIONS, self.actions_delegate)
+        self.table.verticalHeader().setDefaultSectionSize(28)
 
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         layout.addWidget(self.table)
@@ -106,6 +187,12 @@ class AttendanceManager(BaseSecondaryWindow):
         self.btn_save.clicked.connect(self.save_attendance)
         layout.addWidget(self.btn_save)
 
+        # وضعیت پیامک‌های یادآوری (ارسال در پس‌زمینه)
+        self.sms_status_label = QLabel("")
+        self.sms_status_label.setProperty("caption", True)
+        self.sms_status_label.setWordWrap(True)
+        layout.addWidget(self.sms_status_label)
+
         self.showMaximized()
 
         # مقداردهی اولیه بر اساس تاریخ آخر استفاده‌شده
@@ -184,210 +271,142 @@ class AttendanceManager(BaseSecondaryWindow):
             return
 
         selected_date = self.selected_shamsi_date
-        self.table.setRowCount(0)
-
-# رنگ‌ها از تم
-        tokens = ThemeManager.tokens()
-        muted = tokens["muted"]
-        danger = tokens["error"]
-        primary = tokens["primary"]
 
         # Model-B: فهرستِ هنرجویانِ این کلاس در این تاریخ از روی برنامهٔ هفتگیِ ترم‌ها محاسبه می‌شود
         # (نه از جدولِ sessions). با تیکِ «نمایش ترم‌های تکمیل‌شده» ترم‌های پایان‌یافته هم می‌آیند.
         show_completed = getattr(self, "chk_show_completed", None) is not None and self.chk_show_completed.isChecked()
-        rows = fetch_scheduled_students_for_class_on_date(
+        # کلِ صفحه (سقف ترم، شمارش، وضعیت امروز، فلگ پیامک) در یک کوئری
+        rows = fetch_attendance_roster(
             self.selected_class_id, selected_date, include_completed=show_completed
         )
-        for sid, name, teacher, session_time, term_id in rows:
-            cfg = get_term_config(term_id)
-            term_limit = int(cfg.get("sessions_limit") or 12)
-            notify_session_number = max(0, term_limit - 1)
-
-            # شمارش کل ثبت‌ها برای همان ترم (حاضر + غایب)
-            done_total = count_attendance_by_term(sid, self.selected_class_id, term_id)
-
-            # وضعیت امروز: None (ثبت‌نشده) / 'present' / 'absent' / 'canceled'
-            record_status = fetch_attendance_status_by_date(sid, self.selected_class_id, selected_date, term_id)
-
-            row = self.table.rowCount()
-            self.table.insertRow(row)
-
-            # ستون مخفی: student_id
-            id_item = QTableWidgetItem(str(sid))
-            id_item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
-            self.table.setItem(row, 0, id_item)
-
-            # ستون مخفی: term_id
-            term_item = QTableWidgetItem(str(term_id))
-            term_item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
-            self.table.setItem(row, 5, term_item)
-
-            # نام + وضعیت SMS
-            display_name = name
-            name_item = QTableWidgetItem()
-            name_item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
-            tooltip = f"جلسات ثبت‌شده (کل): {done_total} از {term_limit} — باقی‌مانده: {max(0, term_limit - done_total)}"
-
-            # وضعیت SMS برای نمایش آیکون/ایموجی کنار نام و tooltip
-            sent_flag = has_renew_sms_been_sent(sid, term_id)
-            sms_enabled = get_setting_bool("sms_enabled", True)
-            if sent_flag:
-                display_name += "  ✅"
-                tooltip += "\nپیامک تمدید ارسال شده است."
-            else:
-                if not sms_enabled:
-                    display_name += "  ⚠️"
-                    tooltip += "\nارسال پیامک غیرفعال است."
-                elif done_total >= notify_session_number:
-                    display_name += "  ❌"
-                    tooltip += "\nارسال پیامک ناموفق/در انتظار"
-
-            if record_status == "canceled":
-                display_name += "  🚫 لغو"
-                tooltip += "\nجلسهٔ لغوشده (در سقف ترم شمرده نمی‌شود)."
-
-            name_item.setText(display_name)
-            name_item.setToolTip(tooltip)
-            self.table.setItem(row, 1, name_item)
-
-            # ساعت جلسه
-            time_item = QTableWidgetItem(session_time)
-            time_item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
-            self.table.setItem(row, 2, time_item)
-
-            # چک‌باکس‌ها
-            present_chk = QCheckBox()
-            absent_chk = QCheckBox()
-
-            is_canceled = (record_status == "canceled")
-
+        sms_enabled = get_setting_bool("sms_enabled", True)
+        # یک reset مدل به‌جای ساختنِ ویجت برای هر ردیف
+        self.model.set_records(self._roster_record(r, sms_enabled) for r in rows)
+
+    def _roster_record(self, r, sms_enabled):
+        """یک ردیفِ fetch_attendance_roster → رکوردِ AttendanceRosterModel."""
+        term_limit = r["term_limit"]
+        notify_session_number = max(0, term_limit - 1)
+
+        # شمارش کل ثبت‌ها برای همان ترم (حاضر + غایب)
+        done_total = r["held_count"]
+
+        # وضعیت امروز: None (ثبت‌نشده) / 'present' / 'absent' / 'canceled'
+        record_status = r["status"]
+        is_canceled = (record_status == "canceled")
+
+        # نام + وضعیت SMS
+        display_name = r["name"]
+        tooltip = f"جلسات ثبت‌شده (کل): {done_total} از {term_limit} — باقی‌مانده: {max(0, term_limit - done_total)}"
+
+        # وضعیت SMS برای نمایش آیکون/ایموجی کنار نام و tooltip
+        if r["renew_sms_sent"]:
+            display_name += "  ✅"
+            tooltip += "\nپیامک تمدید ارسال شده است."
+        else:
+            if not sms_enabled:
+                display_name += "  ⚠️"
+                tooltip += "\nارسال پیامک غیرفعال است."
+            elif done_total >= notify_session_number:
+                display_name += "  ❌"
+                tooltip += "\nارسال پیامک ناموفق/در انتظار"
+
+        if is_canceled:
+            display_name += "  🚫 لغو"
+            tooltip += "\nجلسهٔ لغوشده (در سقف ترم شمرده نمی‌شود)."
+            if r["cancel_reason"]:
+                tooltip += f"\nدلیل لغو: {r['cancel_reason']}"
+
+        # دکمه‌ها: (key, label, variant, enabled, tooltip)
+        # حذف رکورد امروز — اگر رکوردی برای این روز ثبت نشده، غیرفعال
+        actions = [("delete", "❌ حذف", "danger", record_status is not None,
+                    "حذف حضور/غیاب ثبت‌شده در این تاریخ")]
+        # ارسال مجدد پیامک یادآوری (وقتی موعدِ یادآوری رسیده و ارسال فعال است)
+        if sms_enabled and done_total >= notify_session_number:
+            actions.append(("resend", "📩 ارسال مجدد", "primary", True, "ارسال مجدد پیامک یادآوری تمدید"))
+        # «لغو جلسه»: ثبت جلسهٔ لغوشده با دلیل (بدون مصرف جلسه از ترم)
+        if not is_canceled:
+            actions.append(("cancel", "🚫 لغو", "danger", True,
+                            "ثبت این جلسه به‌عنوان «لغو شده» (بدون مصرف جلسه از ترم)"))
+
+        return {
+            "student_id": r["student_id"],
+            "term_id": r["term_id"],
+            "start_time": r["start_time"],
+            "display_name": display_name,
+            "tooltip": tooltip,
+            "mark": record_status if record_status in ("present", "absent") else None,
             # جلسهٔ لغوشده قابل علامت‌گذاری نیست؛ همچنین اگر ترم پر شده و امروز چیزی ثبت نشده
-            if is_canceled or (done_total >= term_limit and record_status is None):
-                present_chk.setEnabled(False)
-                absent_chk.setEnabled(False)
-
-            present_chk.stateChanged.connect(
-                functools.partial(self._on_present_changed, absent_chk)
-            )
-            absent_chk.stateChanged.connect(
-                functools.partial(self._on_absent_changed, present_chk)
-            )
-
-            if record_status == "present":
-                present_chk.setChecked(True)
-            elif record_status == "absent":
-                absent_chk.setChecked(True)
-
-            self.table.setCellWidget(row, 3, present_chk)
-            self.table.setCellWidget(row, 4, absent_chk)
-            self.table.setRowHeight(row, 28)
-
-            # دکمه حذف رکورد امروز
-            btn_delete = QPushButton("❌ حذف")
-            btn_delete.setProperty("variant", "danger")
-            btn_delete.setToolTip("حذف حضور/غیاب ثبت‌شده در این تاریخ")
-            # اگر رکوردی برای این روز ثبت نشده، دکمه را غیرفعال کن
-            btn_delete.setEnabled(record_status is not None)
-
-            btn_delete.clicked.connect(
-                functools.partial(
-                    self.delete_attendance_row,
-                    sid,
-                    self.selected_class_id,
-                    term_id,
-                    selected_date
-                )
-            )
-
-            # چون داخل جدولیم، بعد از setProperty باید repolish کنیم
-            ThemeManager.repolish(btn_delete)
-
-            op_wrap = QWidget()
-            op_layout = QHBoxLayout(op_wrap)
-            op_layout.addWidget(btn_delete)
-            op_layout.setContentsMargins(0, 0, 0, 0)
-            op_layout.setAlignment(Qt.AlignCenter)
-
-            # دکمه ارسال مجدد پیامک یادآوری (وقتی موعدِ یادآوری رسیده و ارسال فعال است)
-            if sms_enabled and done_total >= notify_session_number:
-                btn_resend = QPushButton("📩 ارسال مجدد")
-                btn_resend.setProperty("variant", "primary")
-                btn_resend.setToolTip("ارسال مجدد پیامک یادآوری تمدید")
-                btn_resend.clicked.connect(
-                    functools.partial(self.resend_renewal_sms, sid, term_id)
-                )
-                ThemeManager.repolish(btn_resend)
-                op_layout.addWidget(btn_resend)
-
-            # دکمه «لغو جلسه»: ثبت جلسهٔ لغوشده با دلیل (بدون مصرف جلسه از ترم)
-            if not is_canceled:
-                btn_cancel = QPushButton("🚫 لغو")
-                btn_cancel.setProperty("variant", "danger")
-                btn_cancel.setToolTip("ثبت این جلسه به‌عنوان «لغو شده» (بدون مصرف جلسه از ترم)")
-                btn_cancel.clicked.connect(
-                    functools.partial(
-                        self.cancel_session_row, sid, self.selected_class_id, term_id, selected_date
-                    )
-                )
-                ThemeManager.repolish(btn_cancel)
-                op_layout.addWidget(btn_cancel)
-
-            self.table.setCellWidget(row, 6, op_wrap)
-
-    # ------------------- MUTUAL EXCLUSIVITY -------------------
-
-    def _on_present_changed(self, other_chk, state):
-        if state == Qt.Checked:
-            other_chk.setChecked(False)
-
-    def _on_absent_changed(self, other_chk, state):
-        if state == Qt.Checked:
-            other_chk.setChecked(False)
+            "locked": is_canceled or (done_total >= term_limit and record_status is None),
+            "actions": actions,
+        }
 
+    def _on_row_action(self, row, key):
+        """کلیکِ دکمه‌های ستونِ «عملیات» (ActionButtonsDelegate)."""
+        record = self.model.record(row)
+        sid, term_id = record["student_id"], record["term_id"]
+        if key == "delete":
+            self.delete_attendance_row(sid, self.selected_class_id, term_id, self.selected_shamsi_date)
+        elif key == "resend":
+            self.resend_renewal_sms(sid, term_id)
+        elif key == "cancel":
+            self.cancel_session_row(sid, self.selected_class_id, term_id, self.selected_shamsi_date)
 
     # ------------------- RENEWAL SMS -------------------
 
-    def _send_renewal_sms(self, sid: int, term_id: int):
-        """ارسال پیامک یادآوری تمدید.
+    def _queue_renewal_sms(self, term_keys):
+        """یادآوری‌های تمدید (student_id, term_id) را در sms_outbox صف کن و dispatcher را بیدار کن.
 
-        فلگ «ارسال‌شده» فقط در صورت موفقیت قطعی (SmsStatus.SENT) ثبت می‌شود؛
-        حالت‌های غیرفعال/ناموفق/خطا قابلِ ارسال مجدد باقی می‌مانند.
-        خروجی: SmsStatus یا None (نبودِ شماره یا خطای ارتباطی).
+        ارسال در پس‌زمینه انجام می‌شود؛ فلگ «ارسال‌شده» فقط با SENT ثبت می‌شود.
+        خروجی: مجموعهٔ term_id هایی که در صف قرار گرفتند (بدون شماره → در صف نیست)،
+        یا None اگر ارسال پیامک غیرفعال است.
         """
-        name, phone = get_student_contact(sid)
-        if not phone:
-            return None
-        class_name, _ = get_class_and_teacher_name(self.selected_class_id)
-        try:
-            result = self.notifier.send_renew_term_notification(name, phone, class_name)
-        except Exception as e:
-            print(f"[ERROR] SMS failed for sid={sid}, term_id={term_id}: {e}")
+        if not get_setting_bool("sms_enabled", True):
             return None
-        status = result.get("status") if isinstance(result, dict) else None
-        if status == SmsStatus.SENT:
-            mark_renew_sms_sent(sid, term_id)
-            print(f"[INFO] SMS sent for sid={sid}, term_id={term_id}")
-        elif status == SmsStatus.DISABLED:
-            print(f"[INFO] SMS disabled for sid={sid}, term_id={term_id}")
-        else:
-            print(f"[WARN] SMS not sent (status={status}) for sid={sid}, term_id={term_id}")
-        return status
+        queued = enqueue_renewal_sms(term_keys)
+        if queued:
+            self.sms_dispatcher.wake()
+        return queued
+
+    def _on_sms_finished(self, sid, term_id, status):
+        """نتیجهٔ نهایی یک پیامک صف‌شده (در thread رابط کاربری)."""
+        if not any(r["term_id"] == term_id for r in self.model.records()):
+            return
+        if status == SmsStatus.FAILED.value:
+            name, _ = get_student_contact(sid)
+            self._sms_failed_names.append(name)
+        elif status == SmsStatus.SENT.value:
+            self._sms_sent_count += 1
+        self._sms_refresh_timer.start()
+
+    def _show_sms_results(self):
+        """یک بازخوانی جدول و یک پیام وضعیت برای نتیجه‌هایی که اخیراً رسیده‌اند."""
+        self.load_attendance()
+        failed, self._sms_failed_names = self._sms_failed_names, []
+        sent, self._sms_sent_count = self._sms_sent_count, 0
+        parts = []
+        if sent:
+            parts.append(f"📲 پیامک یادآوری تمدید برای {sent} هنرجو ارسال شد.")
+        if failed:
+            parts.append(
+                f"⚠️ ارسال برای {len(failed)} هنرجو ناموفق بود: {'، '.join(failed)} — "
+                f"از منوی هر ردیف می‌توانید دوباره ارسال کنید."
+            )
+        if parts:
+            self.sms_status_label.setText(" ".join(parts))
 
     def resend_renewal_sms(self, sid: int, term_id: int):
         """ارسال مجدد دستیِ پیامک یادآوری تمدید توسط کاربر."""
         # اگر قبلاً (احتمالاً به‌اشتباهِ باگ قدیمی) ارسال‌شده علامت خورده،
         # ابتدا فلگ را پاک کن تا ارسال مجدد واقعاً انجام شود.
         clear_renew_sms_sent(sid, term_id)
-        status = self._send_renewal_sms(sid, term_id)
-        if status == SmsStatus.SENT:
-            QMessageBox.information(self, "موفق", "پیامک یادآوری تمدید ارسال شد.")
-        elif status == SmsStatus.DISABLED:
+        queued = self._queue_renewal_sms([(sid, term_id)])
+        if queued is None:
             QMessageBox.warning(self, "غیرفعال", "ارسال پیامک در تنظیمات غیرفعال است.")
+        elif term_id in queued:
+            QMessageBox.information(self, "در صف ارسال", "پیامک یادآوری تمدید در صف ارسال قرار گرفت.")
         else:
-            QMessageBox.warning(
-                self, "خطای پیامک",
-                "ارسال مجدد پیامک ناموفق بود. می‌توانید دوباره تلاش کنید."
-            )
+            QMessageBox.warning(self, "خطای پیامک", "برای این هنرجو شماره تلفن ثبت نشده است.")
         self.load_attendance()
 
 
@@ -405,62 +424,27 @@ class AttendanceManager(BaseSecondaryWindow):
         
         selected_date = self.selected_shamsi_date
         failed_sms = []
-        any_saved = False
 
-        for row in range(self.table.rowCount()):
-            sid = int(self.table.item(row, 0).text())
-            present_chk = self.table.cellWidget(row, 3)
-            absent_chk  = self.table.cellWidget(row, 4)
-            present = present_chk.isChecked() if present_chk else False
-            absent  = absent_chk.isChecked()  if absent_chk  else False
+        # کل روزِ این کلاس در یک تراکنش ثبت می‌شود (یک commit)؛ فقط ردیف‌های علامت‌خورده
+        marks = self.model.marks()
 
-            try:
-                term_id_item = self.table.item(row, 5)
-                if term_id_item is None:
-                    continue
-                term_id = int(term_id_item.text())
-
-                # بازه ترم
-                term_dates = get_term_dates(term_id)  # (start_date, end_date)
-                if not term_dates:
-                    continue
-                start_date, end_date = term_dates
-
-                # بیرون از بازه ترم ثبت نکن
-                if selected_date < start_date or (end_date and selected_date > end_date):
-                    continue
-
-                # سقفِ همان ترم
-                cfg = get_term_config(term_id)
-                term_limit = int(cfg.get("sessions_limit") or 12)
-                notify_session_number = max(0, term_limit - 1)
-
-                # فقط اگر یکی از چک‌باکس‌ها زده شده باشد ثبت کن
-                if present or absent:
-                    any_saved = True   # ✅ الان می‌دونیم حداقل یک ردیف ذخیره شد
-                    status = "present" if present else "absent"
-
-                    # --- ثبت واقعی رکورد امروز ---
-                    ended = insert_attendance_with_date(
-                        sid, self.selected_class_id, term_id, selected_date, status
-                    )
-
-                    # شمارش بعد از ثبت (کل: حاضر+غایب)
-                    total_after = count_attendance_by_term(sid, self.selected_class_id, term_id)
-
-                    # اگر حالا «دقیقاً یک جلسه مانده» → SMS (و نه جلسه بعدی)
-                    if (total_after == notify_session_number) and (not has_renew_sms_been_sent(sid, term_id)):
-                        status = self._send_renewal_sms(sid, term_id)
-                        # فقط وقتی ارسال فعال بوده ولی موفق نشد، به کاربر گزارش بده؛
-                        # حالت غیرفعال (DISABLED) خطا نیست و قابل ارسال مجدد می‌ماند.
-                        if status not in (SmsStatus.SENT, SmsStatus.DISABLED):
-                            name, _ = get_student_contact(sid)
-                            failed_sms.append(name)
-
-                    # Model-B: ترم که کامل شد، جلسات آینده محاسبه‌ای‌اند و چیزی برای حذف نیست.
-
-            except sqlite3.IntegrityError as e:
-                QMessageBox.warning(self, "خطا", f"خطا در ذخیره‌سازی: {e}")
+        any_saved = bool(marks)
+        try:
+            outcomes = save_attendance_batch(self.selected_class_id, selected_date, marks) if marks else []
+        except sqlite3.IntegrityError as e:
+            QMessageBox.warning(self, "خطا", f"خطا در ذخیره‌سازی: {e}")
+            self.load_attendance()
+            return
+
+        # اگر حالا «دقیقاً یک جلسه مانده» → یادآوری در صف (بعد از commit؛ ارسال در پس‌زمینه)
+        renewals = [(o["student_id"], o["term_id"]) for o in outcomes if o["needs_renewal_sms"]]
+        queued = self._queue_renewal_sms(renewals) if renewals else set()
+        # حالت غیرفعال (None) خطا نیست و قابل ارسال مجدد می‌ماند؛ فقط نبودِ شماره گزارش می‌شود
+        if queued is not None:
+            for sid, term_id in renewals:
+                if term_id not in queued:
+                    name, _ = get_student_contact(sid)
+                    failed_sms.append(name)
 
         if not any_saved:
             QMessageBox.warning(self, "عدم ثبت", "هیچ هنرجویی انتخاب نشده است. لطفاً حداقل یکی را حاضر یا غایب کنید.")
@@ -469,7 +453,10 @@ class AttendanceManager(BaseSecondaryWindow):
         if failed_sms:
             QMessageBox.warning(self, "خطای پیامک", "ارسال پیام برای هنرجویان زیر انجام نشد:\n" + "\n".join(failed_sms))
         else:
-            QMessageBox.information(self, "موفق", "حضور و غیاب با موفقیت ذخیره شد.")
+            message = "حضور و غیاب با موفقیت ذخیره شد."
+            if queued:
+                message += f"\nپیامک یادآوری تمدید برای {len(queued)} هنرجو در صف ارسال قرار گرفت."
+            QMessageBox.information(self, "موفق", message)
 
         self.load_attendance()
 
@@ -1,9 +1,9 @@
-from acasmart.data.db import get_connection
+from acasmart.data.db import get_connection, close_pool
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QPushButton, QFileDialog, QMessageBox, QLabel,
     QApplication, QMainWindow, QFrame
 )
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QTimer
 import shutil
 from acasmart.core.version import __version__
 from acasmart.paths import DB_PATH
@@ -12,6 +12,8 @@ import sqlite3
 
 from acasmart.ui.widgets.global_toolbar import GlobalToolbar
 from acasmart.ui.widgets.theme_manager import ThemeManager
+from acasmart.ui.widgets.async_loader import AsyncLoader
+from acasmart.services.sms_dispatcher import sweep_renewal_reminders, RENEWAL_SWEEP_INTERVAL_MS
 
 class DashboardWindow(QMainWindow):
     def __init__(self, logged_in_mobile):
@@ -70,6 +72,7 @@ class DashboardWindow(QMainWindow):
             ("📊 گزارش‌گیری", self.open_reports),
             ("📥 بکاپ‌گیری از دیتابیس", self.backup_database),
             ("📤 بازیابی بکاپ", self.restore_database),
+            ("🧭 بررسی تداخل برنامه‌ها", self.audit_schedule_conflicts),
             ("⚙️ تنظیمات آموزشگاه", self.open_setting_manager),
             ("📲 ارسال پیامک به هنرجویان", self.open_sms_notification_manager),
             ("🔑 تغییر رمز عبور", self.open_change_password),
@@ -86,6 +89,22 @@ class DashboardWindow(QMainWindow):
             root.addWidget(btn)
 
 
+        # خلاصهٔ پیمایش یادآوری‌های تمدید (در پس‌زمینه، هنگام شروع و هر RENEWAL_SWEEP_INTERVAL_MS)
+        self.renewal_label = QLabel("")
+        self.renewal_label.setObjectName("MutedCaption")
+        self.renewal_label.setAlignment(Qt.AlignCenter)
+        self.renewal_label.setWordWrap(True)
+        root.addWidget(self.renewal_label)
+
+        self.renewal_loader = AsyncLoader(self)
+        self.renewal_loader.finished.connect(self._on_renewal_sweep_done)
+        self.renewal_loader.failed.connect(self._on_renewal_sweep_failed)
+        self.renewal_timer = QTimer(self)
+        self.renewal_timer.setInterval(RENEWAL_SWEEP_INTERVAL_MS)
+        self.renewal_timer.timeout.connect(self.run_renewal_sweep)
+        self.renewal_timer.start()
+        QTimer.singleShot(0, self.run_renewal_sweep)
+
         version_label = QLabel(f"نسخه نرم‌افزار: {__version__}")
         version_label.setObjectName("MutedCaption")
         version_label.setAlignment(Qt.AlignCenter)
@@ -102,6 +121,39 @@ class DashboardWindow(QMainWindow):
         self.toolbar = GlobalToolbar(self)
         self.addToolBar(Qt.TopToolBarArea, self.toolbar)
 
+    def run_renewal_sweep(self):
+        """صف‌کردنِ یادآوری‌های تمدیدِ جامانده در پس‌زمینه."""
+        if not self.renewal_loader.is_running():
+            self.renewal_loader.load(sweep_renewal_reminders)
+
+    def _on_renewal_sweep_done(self, summary):
+        if summary is None:
+            self.renewal_label.setText("📲 ارسال پیامک غیرفعال است؛ یادآوری‌های تمدید بررسی نشدند.")
+            return
+        failed = summary["failed_recent"]
+        gave_up = summary["gave_up"]
+        if not summary["due"] and not failed and not gave_up:
+            self.renewal_label.setText("📲 یادآوری تمدیدِ جامانده‌ای وجود ندارد.")
+            return
+        text = "📲 یادآوری تمدید:"
+        if summary["due"]:
+            text += (
+                f" {summary['due']} ترم با یک جلسهٔ باقی‌مانده بدون پیامک — "
+                f"{summary['queued']} مورد در صف ارسال قرار گرفت."
+            )
+        if summary["no_phone"]:
+            text += f" بدون شماره تلفن: {'، '.join(summary['no_phone'])}"
+        if failed:
+            # تا ۲۴ ساعت دوباره صف نمی‌شوند؛ ارسال دستی از پنجرهٔ حضور و غیاب
+            text += f" ⚠️ {len(failed)} یادآوری در ۲۴ ساعت گذشته ناموفق بود: {'، '.join(failed)}"
+        if gave_up:
+            # پس از RENEWAL_MAX_FAILURES شکست دیگر خودکار صف نمی‌شوند
+            text += f" ⛔ ارسال خودکار متوقف شد (شکست‌های مکرر): {'، '.join(gave_up)}"
+        self.renewal_label.setText(text)
+
+    def _on_renewal_sweep_failed(self, message):
+        self.renewal_label.setText(f"⚠️ خطا در بررسی یادآوری‌های تمدید: {message}")
+
     def showEvent(self, event):
         super().showEvent(event)
         # گرفتن ابعاد صفحه
@@ -167,6 +219,25 @@ class DashboardWindow(QMainWindow):
         self.pricing_profile_window = PricingProfileManager(return_target=self)
         self.pricing_profile_window.show()
     
+    # ---------- بررسی تداخل ----------
+
+    def audit_schedule_conflicts(self):
+        from acasmart.services.conflict_audit import audit_schedule_conflicts, format_report
+        try:
+            result = audit_schedule_conflicts()
+        except Exception as e:
+            logging.error(f"❌ خطا در بررسی تداخل برنامه‌ها: {e}")
+            QMessageBox.critical(self, "خطا", f"بررسی تداخل انجام نشد:\n{e}")
+            return
+        lines = format_report(result)
+        logging.info(lines[-1])
+        if not result["conflicts"]:
+            QMessageBox.information(self, "بررسی تداخل", "هیچ تداخلی پیدا نشد.\n\n" + lines[-1])
+            return
+        box = QMessageBox(QMessageBox.Warning, "بررسی تداخل", lines[-1], parent=self)
+        box.setDetailedText("\n".join(lines[:-1]))
+        box.exec()
+
     # ---------- بکاپ/ریستور ----------
     
     def backup_database(self):
@@ -195,6 +266,7 @@ class DashboardWindow(QMainWindow):
                                                   "SQLite Files (*.db)", options=options)
         if filename:
             try:
+                close_pool()  # اتصال‌های باز نباید به فایلِ قبلی اشاره کنند
                 shutil.copyfile(filename, self.db_path)
                 QMessageBox.information(self, "بازیابی موفق",
                                         "فایل بکاپ با موفقیت بازیابی شد.\n\nبرای اعمال تغییرات، لطفاً برنامه را ببندید و دوباره اجرا کنید.")
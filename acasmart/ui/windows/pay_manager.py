@@ -16,7 +16,6 @@ from acasmart.ui.widgets.payment_term_picker_popup import PaymentTermPickerPopup
 import jdatetime
 from acasmart.core.utils import format_currency_with_unit, get_currency_unit, format_currency, parse_user_amount_to_toman
 from acasmart.ui.reports.payment_report_window import PaymentReportWindow
-from acasmart.core.fa_collation import sort_records_fa
 from acasmart.core.utils import currency_label, format_currency_with_unit, parse_user_amount_to_toman
 from acasmart.ui.widgets.theme_manager import ThemeManager
 from acasmart.ui.widgets.base_secondary_window import BaseSecondaryWindow
@@ -203,8 +202,7 @@ class PaymentManager(BaseSecondaryWindow):
 
     def load_students(self):
         """بارگذاری لیست هنرجویان برای popup انتخاب هنرجو."""
-        rows = fetch_students_with_teachers()
-        self.students = sort_records_fa(rows, name_index=2, tiebreak_index=1)
+        self.students = fetch_students_with_teachers()  # به ترتیب نام فارسی (COLLATE FA)
 
     def open_student_picker(self):
         """باز کردن popup انتخاب هنرجو؛ بعد از تأیید، هنرجو در ویجت نمایش داده می‌شود."""
@@ -4,7 +4,7 @@ from acasmart.data.repos.classes_repo import get_day_and_time_for_class, get_cla
 from acasmart.data.repos.notifications_repo import get_unnotified_expired_terms, mark_terms_as_notified
 from acasmart.data.repos.payments_repo import delete_term_if_no_history
 from acasmart.data.repos.profiles_repo import list_pricing_profiles
-from acasmart.data.repos.sessions_repo import enroll_student, fetch_enrollments_for_class
+from acasmart.data.repos.sessions_repo import enroll_student, fetch_enrollments_for_class, find_free_slots
 from acasmart.data.repos.settings_repo import get_setting
 from acasmart.data.repos.students_repo import fetch_students_with_teachers
 from acasmart.data.repos.terms_repo import get_last_term_end_date, get_term_id_by_student_and_class, get_active_term_count_per_student
@@ -20,7 +20,7 @@ from acasmart.ui.widgets.student_picker_popup import StudentPickerPopup
 from acasmart.ui.widgets.class_picker_popup import ClassPickerPopup
 import jdatetime
 import sqlite3
-from acasmart.core.fa_collation import sort_records_fa, fa_digits
+from acasmart.core.fa_collation import fa_digits
 from acasmart.core.utils import currency_label, format_currency_with_unit, parse_user_amount_to_toman
 from acasmart.ui.widgets.theme_manager import ThemeManager
 from acasmart.ui.widgets.base_secondary_window import BaseSecondaryWindow
@@ -29,9 +29,14 @@ class TermConfigDialog(QDialog):
     """
     انتخاب پروفایل/ترم سفارشی برای ساخت ترم همراه با جلسهٔ اول.
     خروجی: dict با کلیدهای sessions_limit, tuition_fee, currency_unit, profile_id (همه Optional)
+    و lesson_duration؛ اگر class_id داده شود، start_time هم (فقط از میان زمان‌های آزادِ
+    استاد/هنرجو برای مدتِ انتخاب‌شده).
     """
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, class_id=None, student_id=None, preferred_time=None):
         super().__init__(parent)
+        self.class_id = class_id
+        self.student_id = student_id
+        self.preferred_time = preferred_time
         self.setWindowTitle("تنظیمات ترم")
 
         # حالت‌ها
@@ -102,11 +107,24 @@ class TermConfigDialog(QDialog):
         row3.addWidget(self.combo_duration)
         lay.addLayout(row3)
 
+        # ساعت شروع: فقط زمان‌های آزادِ استاد و هنرجو در روزِ کلاس
+        self.combo_slot = None
+        if self.class_id is not None:
+            self.combo_slot = QComboBox()
+            row4 = QHBoxLayout()
+            row4.addWidget(QLabel("ساعت شروع (زمان‌های آزاد):"))
+            row4.addWidget(self.combo_slot)
+            lay.addLayout(row4)
+
         # دکمه‌ها
         btns = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
         btns.accepted.connect(self.accept)
         btns.rejected.connect(self.reject)
         lay.addWidget(btns)
+        self.btn_ok = btns.button(QDialogButtonBox.Ok)
+        if self.combo_slot is not None:
+            self.combo_duration.currentIndexChanged.connect(self.refresh_free_slots)
+            self.refresh_free_slots()
 
         # Style dialog buttons with theme variants
         try:
@@ -130,8 +148,32 @@ class TermConfigDialog(QDialog):
         self.rb_custom.toggled.connect(sync_enabled)
         sync_enabled()
 
+    def refresh_free_slots(self):
+        """بازخوانی زمان‌های آزاد برای مدتِ جلسهٔ انتخاب‌شده (انتخابِ قبلی در صورت امکان حفظ می‌شود)."""
+        keep = self.combo_slot.currentData() or self.preferred_time
+        duration = int(self.combo_duration.currentData())
+        try:
+            slots = find_free_slots(self.class_id, self.student_id, duration)
+        except Exception:
+            slots = []
+        self.combo_slot.clear()
+        for hhmm in slots:
+            self.combo_slot.addItem(fa_digits(hhmm), hhmm)
+        if slots:
+            idx = self.combo_slot.findData(keep)
+            self.combo_slot.setCurrentIndex(idx if idx >= 0 else 0)
+        else:
+            self.combo_slot.addItem("زمان آزادی در این روز نیست", None)
+        self.combo_slot.setEnabled(bool(slots))
+        if self.btn_ok:
+            self.btn_ok.setEnabled(bool(slots))
+
     def get_config(self):
         duration = int(self.combo_duration.currentData())
+        start_time = self.combo_slot.currentData() if self.combo_slot is not None else None
+        return dict(self._pricing_config(duration), start_time=start_time)
+
+    def _pricing_config(self, duration):
         if self.rb_custom.isChecked():
             # مقدار نمایش‌داده‌شده (ممکن است ریال باشد) → تبدیل به «تومان خام»
             fee_toman = parse_user_amount_to_toman(str(self.spin_fee.value()))
@@ -369,7 +411,7 @@ class SessionManager(BaseSecondaryWindow):
     def load_students(self):
         """بارگذاری لیست هنرجویان برای استفاده در popup انتخاب هنرجو."""
         rows = fetch_students_with_teachers()  # [(sid, national_code, name, teacher), ...]
-        self.students_data = sort_records_fa(rows, name_index=2, tiebreak_index=1)
+        self.students_data = rows  # به ترتیب نام فارسی و کدملی (COLLATE FA)
     def add_session_to_class(self):
         # بررسی انتخاب هنرجو و کلاس
         if not self.selected_class_id or not self.selected_student_id:
@@ -389,11 +431,15 @@ class SessionManager(BaseSecondaryWindow):
 
         # --- دریافت پیکربندی ترم از کاربر ---
         cfg = {}
-        dlg = TermConfigDialog(self)
+        dlg = TermConfigDialog(self, class_id=self.selected_class_id,
+                               student_id=self.selected_student_id, preferred_time=session_time)
         if dlg.exec_() == QDialog.Accepted:
-            cfg = dlg.get_config()  # dict: sessions_limit, tuition_fee, currency_unit, profile_id
+            cfg = dlg.get_config()  # dict: sessions_limit, tuition_fee, currency_unit, profile_id, start_time
         else:
             return  # کاربر لغو کرد
+        if cfg.get("start_time"):
+            # ساعتِ انتخاب‌شده از میان زمان‌های آزاد جایگزینِ ساعتِ فرم می‌شود
+            self.time_session.setTime(QTime.fromString(cfg["start_time"], "HH:mm"))
         
 
         # بررسی اینکه ساعت جلسه قبل از شروع کلاس نباشد
@@ -1,14 +1,16 @@
 from __future__ import annotations
 
 from acasmart.data.repos.students_repo import fetch_students, get_student_contact
+from acasmart.data.repos.search_repo import search_students, DISPLAY_LIMIT
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QLineEdit, QPushButton, QScrollArea,
     QCheckBox, QMessageBox, QHBoxLayout
 )
 from PySide6.QtCore import Qt
-from acasmart.services.sms_notifier import SmsNotifier
+from acasmart.services.sms_notifier import SmsNotifier, SmsStatus
 from acasmart.ui.widgets.theme_manager import ThemeManager
 from acasmart.ui.widgets.base_secondary_window import BaseSecondaryWindow
+from acasmart.ui.widgets.async_loader import AsyncLoader
 
 class SmsNotificationWindow(BaseSecondaryWindow):
     def __init__(self, return_target: QWidget | None = None):
@@ -17,6 +19,14 @@ class SmsNotificationWindow(BaseSecondaryWindow):
         self.students = []
         self.checkboxes = []
         self.notifier = SmsNotifier()
+        # ارسال گروهی در پس‌زمینه؛ نتیجهٔ هر هنرجو به محض رسیدن نمایش داده می‌شود
+        self.sms_results = {}  # student_id → (SmsStatus, پیام)
+        self._sms_total = 0
+        self._sms_sent = 0
+        self.sender = AsyncLoader(self, chunk_size=1)
+        self.sender.chunk_ready.connect(self._on_sms_results)
+        self.sender.finished.connect(self._on_sms_finished)
+        self.sender.failed.connect(self._on_sms_failed)
         self.build_ui()
 
     def build_ui(self):
@@ -52,6 +62,9 @@ class SmsNotificationWindow(BaseSecondaryWindow):
         self.btn_send_sms.setProperty("variant", "primary")
         self.btn_send_sms.clicked.connect(self.send_sms_to_selected)
         layout.addWidget(self.btn_send_sms)
+
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
         # Apply QSS
         for w in (self.search_input, self.btn_send_sms, title):
             try:
@@ -80,34 +93,84 @@ class SmsNotificationWindow(BaseSecondaryWindow):
         for sid, name, gender, birth_date, national_code in data:
             cb = QCheckBox(f"{name} - کدملی: {national_code}")
             cb.setProperty("student_id", sid)
+            cb.setProperty("base_text", cb.text())
+            if sid in self.sms_results:
+                self._show_result(cb, *self.sms_results[sid])
             self.checkboxes.append(cb)
             self.list_layout.addWidget(cb)
 
     def filter_students(self):
-        text = self.search_input.text().strip().lower()
-        if not text:
+        text = self.search_input.text()
+        if not text.strip():
             self.refresh_student_list()
             return
-        filtered = [s for s in self.students if text in s[1].lower()]
-        self.refresh_student_list(filtered)
+        # نتیجهٔ جست‌وجو مستقیم از search_repo (هم‌شکل fetch_students)، با سقف نمایش
+        self.refresh_student_list(search_students(text, limit=DISPLAY_LIMIT))
 
     def send_sms_to_selected(self):
         selected = [cb for cb in self.checkboxes if cb.isChecked()]
         if not selected:
             QMessageBox.warning(self, "هیچ انتخابی", "لطفاً حداقل یک هنرجو را انتخاب کنید.")
             return
+        if self.sender.is_running():
+            return
 
-        count = 0
+        self.sms_results = {}
+        self._sms_total = len(selected)
+        self._sms_sent = 0
+        messages = []
+        no_phone = []
         for cb in selected:
             student_id = cb.property("student_id")
             name, phone = self.get_student_contact(student_id)
             if name and phone:
-                try:
-                    self.notifier.send_renew_term_notification(name, phone, "شما")
-                    count += 1
-                except Exception as e:
-                    print(e)
-        QMessageBox.information(self, "پایان عملیات", f"ارسال پیامک برای {count} هنرجو انجام شد.")
+                messages.append((student_id, phone, {"student_name": name, "class_name": "شما"}))
+            else:
+                no_phone.append(student_id)
+        for student_id in no_phone:
+            self._record_result(student_id, SmsStatus.FAILED, "شماره تلفن ثبت نشده است")
+
+        if not messages:
+            self._on_sms_finished(0)
+            return
+        self.btn_send_sms.setEnabled(False)
+        self._update_status()
+        # هنرجویان با پارامتر یکسان در یک درخواست؛ درخواست‌ها هم‌زمان با محدودیت نرخ
+        self.sender.stream(self.notifier.iter_send_pattern_bulk, messages)
+
+    def _on_sms_results(self, results):
+        for student_id, result in results:
+            self._record_result(student_id, result["status"], result["message"])
+        self._update_status()
+
+    def _record_result(self, student_id, status, message):
+        self.sms_results[student_id] = (status, message)
+        if status == SmsStatus.SENT:
+            self._sms_sent += 1
+        for cb in self.checkboxes:
+            if cb.property("student_id") == student_id:
+                self._show_result(cb, status, message)
+                break
+
+    def _show_result(self, cb, status, message):
+        mark = "✅" if status == SmsStatus.SENT else ("⚠️" if status == SmsStatus.DISABLED else "❌")
+        cb.setText(f"{cb.property('base_text')}  {mark}")
+        cb.setToolTip(message or "")
+
+    def _update_status(self):
+        self.status_label.setText(
+            f"در حال ارسال… {len(self.sms_results)} از {self._sms_total} (موفق: {self._sms_sent})"
+        )
+
+    def _on_sms_finished(self, _count):
+        self.btn_send_sms.setEnabled(True)
+        failed = len(self.sms_results) - self._sms_sent
+        self.status_label.setText(f"ارسال‌شده: {self._sms_sent}   |   ناموفق: {failed}")
+        QMessageBox.information(self, "پایان عملیات", f"ارسال پیامک برای {self._sms_sent} هنرجو انجام شد.")
+
+    def _on_sms_failed(self, message):
+        self.btn_send_sms.setEnabled(True)
+        self.status_label.setText(f"خطا در ارسال پیامک: {message}")
 
     def get_student_contact(self, student_id):
         return get_student_contact(student_id)
@@ -17,7 +17,8 @@ from PySide6.QtCore import Qt
 
 import jdatetime
 from acasmart.ui.widgets.shamsi_date_popup import ShamsiDatePopup
-from acasmart.core.fa_collation import sort_records_fa, contains_fa, nd
+from acasmart.core.fa_collation import nd
+from acasmart.data.repos.search_repo import search_students, DISPLAY_LIMIT
 from acasmart.ui.widgets.theme_manager import ThemeManager
 from acasmart.ui.widgets.base_secondary_window import BaseSecondaryWindow
 
@@ -241,8 +242,8 @@ class StudentManager(BaseSecondaryWindow):
 
         # فرض بر اینه که fetch_students() تابع جدیدی هست که (id, name) برمی‌گردونه
         rows = fetch_students()
-        # name_index=1 (نام)، tiebreak_index=4 (کدملی)
-        self.students_data = sort_records_fa(rows, name_index=1, tiebreak_index=4)
+        # مرتب به ترتیب نام فارسی و سپس کدملی (ORDER BY name COLLATE FA در خودِ SQLite)
+        self.students_data = rows
         
         # مرتب‌سازی بر اساس نام و کد ملی
         # for every student in items create a text like نام هنرجو (استاد: نام استاد)
@@ -270,43 +271,38 @@ class StudentManager(BaseSecondaryWindow):
         query = text.strip()
         selected_gender = self.filter_gender.currentText()
         national_code_query = nd(self.filter_national_code.text().strip())
+        sort_criteria = self.sort_by.currentText()
+        if sort_criteria == "مرتب‌سازی بر اساس سن":
+            order = "age"
+        elif sort_criteria == "مرتب‌سازی بر اساس کد ملی":
+            order = "national_code"
+        else:
+            order = "name"
 
-        filtered_students = []
+        gender = None if selected_gender == "همه" else selected_gender
+        # فیلتر و مرتب‌سازی در SQL (search_repo: ایندکس FTS برای نام/کد ملی/تلفن)؛ نتیجهٔ
+        # جست‌وجو سقف نمایش دارد، بدون فیلتر مثل load_students همهٔ هنرجویان
+        filtering = bool(query or gender or national_code_query)
+        rows = search_students(
+            query, limit=DISPLAY_LIMIT if filtering else None,
+            gender=gender, national_code=national_code_query, order=order,
+        )
 
         self.list_students.clear()
-
-        #از روی self.students_data عبور می‌کنی
-        for student in self.students_data:
-            student_id, name, gender, birth_date, national_code = student
-
+        today_jdate = jdatetime.date.today()
+        for student_id, name, gender, birth_date, national_code in rows:
             birth_jdate = jdatetime.datetime.strptime(birth_date, "%Y-%m-%d").date()
-            today_jdate = jdatetime.date.today()
             age = today_jdate.year - birth_jdate.year - (
                         (today_jdate.month, today_jdate.day) < (birth_jdate.month, birth_jdate.day))
-
-            if (contains_fa(name, query) and
-                    (selected_gender == "همه" or gender == selected_gender) and
-                    national_code_query in nd(national_code)):
-                
-                filtered_students.append((student_id, name, gender, age, national_code))
-
-        # مرتب‌سازی
-        sort_criteria = self.sort_by.currentText()
-        if sort_criteria == "مرتب‌سازی بر اساس حروف الفبا":
-            # filtered_students: (id, name, gender, age, national_code)
-            filtered_students = sort_records_fa(filtered_students, name_index=1, tiebreak_index=4)
-        elif sort_criteria == "مرتب‌سازی بر اساس سن":
-            filtered_students.sort(key=lambda x: x[3])  # سن
-        elif sort_criteria == "مرتب‌سازی بر اساس کد ملی":
-            filtered_students.sort(key=lambda x: x[4])  # کد ملی
-
-        for student_id, name, gender, age, national_code in filtered_students:
             display_text = f"{name} - سن: {age} - کد ملی: {national_code}"
             item = QListWidgetItem(display_text)
             item.setData(Qt.UserRole, student_id)
             self.list_students.addItem(item)
 
         # update student count label
+        if filtering and len(rows) >= DISPLAY_LIMIT:
+            self.lbl_count.setText(f"نمایش {DISPLAY_LIMIT} نتیجهٔ اول؛ جست‌وجو را دقیق‌تر کنید")
+            return
         self.lbl_count.setText(f"تعداد نتایج: {self.list_students.count()} نفر")
 
     def fill_form(self, item):
@@ -10,6 +10,7 @@ from acasmart.data.repos.teachers_repo import (
     get_teacher_id_by_national_code,
 )
 from acasmart.data.repos.students_repo import is_national_code_exists_for_other
+from acasmart.data.repos.search_repo import search_teachers, DISPLAY_LIMIT
 from acasmart.data.repos.teacher_instruments_repo import (
     add_instrument_to_teacher,
     remove_instrument_from_teacher,
@@ -25,8 +26,7 @@ from PySide6.QtCore import Qt
 from acasmart.ui.widgets.shamsi_date_popup import ShamsiDatePopup
 import jdatetime
 import re
-from acasmart.core.fa_collation import sort_records_fa, contains_fa, fa_collator
-from functools import cmp_to_key
+from acasmart.core.fa_collation import fa_collator
 from acasmart.ui.widgets.theme_manager import ThemeManager
 from acasmart.ui.widgets.base_secondary_window import BaseSecondaryWindow
 
@@ -228,15 +228,13 @@ class TeacherManager(BaseSecondaryWindow):
 
     def load_teachers(self):
         self.list_teachers.clear()
-        rows = fetch_teachers()  # [(teacher_id, name), ...]
-        # ← سورت بر اساس نام فارسی؛ در صورت تساوی، بر اساس ID
-        rows = sort_records_fa(rows, name_index=1, tiebreak_index=0)
+        rows = fetch_teachers()  # [(teacher_id, name), ...] به ترتیب نام فارسی و سپس ID (COLLATE FA)
         self.teachers_data = rows
 
         for teacher_id, name in rows:
             instruments = get_instruments_for_teacher(teacher_id) or []
             # سورت فارسی برای سازها (زیبا و یکدست)
-            instruments_sorted = sorted(instruments, key=cmp_to_key(fa_collator.compare))
+            instruments_sorted = fa_collator.sort_strings(instruments)
             instruments_text = "، ".join(instruments_sorted) if instruments_sorted else "بدون ساز"
 
             item = QListWidgetItem(f"{name} - ({instruments_text})")
@@ -246,28 +244,24 @@ class TeacherManager(BaseSecondaryWindow):
         self.lbl_count.setText(f"تعداد اساتید: {len(rows)} نفر")
 
     def search_teachers(self):
-        query = self.search_input.text().strip()  # lower نکن! contains_fa خودش نرمال می‌کند
+        query = self.search_input.text().strip()
         self.list_teachers.clear()
 
-        filtered = []
-        for teacher_id, name in self.teachers_data:
-            instruments = get_instruments_for_teacher(teacher_id) or []
-            # جست‌وجوی فارسی روی نام یا هر یک از سازها
-            if contains_fa(name, query) or any(contains_fa(ins, query) for ins in instruments):
-                filtered.append((teacher_id, name))
-
-        # سورت فارسی نتایج فیلترشده
-        filtered = sort_records_fa(filtered, name_index=1, tiebreak_index=0)
+        # نام/کد ملی/تلفن از ایندکس FTS و نام ساز، در SQL (search_repo) و با سقف نمایش
+        rows = search_teachers(query, limit=DISPLAY_LIMIT if query else None)
 
-        for teacher_id, name in filtered:
+        for teacher_id, name in rows:
             instruments = get_instruments_for_teacher(teacher_id) or []
-            instruments_sorted = sorted(instruments, key=cmp_to_key(fa_collator.compare))
+            instruments_sorted = fa_collator.sort_strings(instruments)
             display_text = f"{name} - ({'، '.join(instruments_sorted) if instruments_sorted else 'بدون ساز'})"
             item = QListWidgetItem(display_text)
             item.setData(1, teacher_id)
             self.list_teachers.addItem(item)
 
-        self.lbl_count.setText(f"تعداد اساتید: {len(filtered)} نفر")
+        if query and len(rows) >= DISPLAY_LIMIT:
+            self.lbl_count.setText(f"نمایش {DISPLAY_LIMIT} نتیجهٔ اول؛ جست‌وجو را دقیق‌تر کنید")
+            return
+        self.lbl_count.setText(f"تعداد اساتید: {len(rows)} نفر")
 
     def fill_form(self, item):
         """Fill form with selected teacher's data including instruments."""
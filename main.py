@@ -242,6 +242,11 @@ if __name__ == "__main__":
         window.show()
         print("✅ GUI started successfully")
 
+        # ارسال پس‌زمینهٔ پیامک‌های صف‌شده (sms_outbox) — باقی‌ماندهٔ اجرای قبلی هم فرستاده می‌شود
+        from acasmart.services.sms_dispatcher import get_dispatcher, stop_dispatcher
+        get_dispatcher()
+        app.aboutToQuit.connect(stop_dispatcher)
+
         # سازگار با PySide6 قدیمی/جدید
         exit_code = app.exec() if hasattr(app, "exec") else app.exec_()
         sys.exit(exit_code)
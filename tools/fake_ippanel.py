@@ -0,0 +1,117 @@
+"""
+سرور HTTP آزمایشیِ محلی به‌جای IPPanel (فقط برای توسعه و آزمون دستی).
+
+    python tools/fake_ippanel.py --port 8765 --fail-rate 0.3 --delay 2
+
+و در .env:
+
+    IPPANEL_API_URL=http://127.0.0.1:8765/v1/api/send
+
+هر POST روی /v1/api/send ثبت می‌شود (requests) و با احتمال fail_rate پاسخ 503 می‌گیرد؛
+delay تأخیر پاسخ (ثانیه) است تا مهلت‌ها و backoff dispatcher دیده شوند. statuses
+(فهرستی از کدهای وضعیت) در صورت وجود به ترتیب مصرف می‌شود و بر fail_rate مقدم است.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SEND_PATH = "/v1/api/send"
+
+
+class FakeIppanelServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, fail_rate=0.0, delay=0.0, statuses=None):
+        super().__init__((host, port), _Handler)
+        self.fail_rate = fail_rate
+        self.delay = delay
+        self.statuses = list(statuses or [])
+        self.requests = []  # بدنهٔ JSON هر درخواست دریافتی
+        self.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{SEND_PATH}"
+
+    def start(self):
+        """اجرا در thread پس‌زمینه (برای استفاده در اسکریپت‌ها)."""
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-ippanel", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def next_status(self):
+        with self.lock:
+            if self.statuses:
+                return self.statuses.pop(0)
+        return 503 if random.random() < self.fail_rate else 200
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        if self.path != SEND_PATH:
+            self._reply(404, {"meta": {"status": False, "message": "not found"}})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._reply(400, {"meta": {"status": False, "message": "invalid json"}})
+            return
+        server = self.server
+        with server.lock:
+            server.requests.append(body)
+        if server.delay:
+            time.sleep(server.delay)
+        if not self.headers.get("Authorization"):
+            self._reply(401, {"meta": {"status": False, "message": "unauthorized"}})
+            return
+        status = server.next_status()
+        if status != 200:
+            self._reply(status, {"meta": {"status": False, "message": "fake failure"}})
+            return
+        recipients = body.get("recipients") or []
+        self._reply(200, {
+            "data": {"message_outbox_ids": [random.randint(10**6, 10**7) for _ in recipients]},
+            "meta": {"status": True, "message": "ok"},
+        })
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, fmt, *args):
+        print(f"[fake-ippanel] {self.address_string()} {fmt % args}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake IPPanel pattern-SMS endpoint")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--delay", type=float, default=0.0)
+    args = parser.parse_args()
+    server = FakeIppanelServer(args.host, args.port, args.fail_rate, args.delay)
+    print(f"Fake IPPanel listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()